@@ -50,6 +50,9 @@ public:
   QVector<double> getBodyContactPoints(const QString& bodyName) const;
 
   bool getLinkToWorld(const QString& linkName, vtkTransform* transform);
+  QVector<double> computeLinkToWorld(const QVector<double>& jointPositions,
+                                     const QList<QString>& jointNames,
+                                     const QList<QString>& linkNames) const;
   QList<QString> getLinkNames();
   QList<QString> getJointNames();
   int findLinkID(const QString& linkName) const;
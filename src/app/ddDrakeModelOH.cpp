@@ -41,6 +41,11 @@
 #include <QFileInfo>
 #include <QTextStream>
 #include <QMap>
+#include <QDateTime>
+#include <QStringList>
+#include <QMutex>
+#include <QMutexLocker>
+#include <QtConcurrentMap>
 #include <QDir>
 
 using std::map;
@@ -331,10 +336,10 @@ vtkSmartPointer<vtkTexture> getTextureForMesh(vtkSmartPointer<vtkPolyData> polyD
   return texture;
 }
 
-ddMeshVisual::Ptr visualFromPolyData(vtkSmartPointer<vtkPolyData> polyData)
+ddMeshVisual::Ptr visualFromPolyData(vtkSmartPointer<vtkPolyData> polyData, bool addNormals=true)
 {
   ddMeshVisual::Ptr visual(new ddMeshVisual);
-  visual->PolyData = computeNormals(polyData);
+  visual->PolyData = addNormals ? computeNormals(polyData) : shallowCopy(polyData);
   visual->Actor = vtkSmartPointer<vtkActor>::New();
   visual->Transform = vtkSmartPointer<vtkTransform>::New();
   visual->Actor->SetUserTransform(visual->Transform);
@@ -369,15 +374,104 @@ ddMeshVisual::Ptr visualFromPolyData(vtkSmartPointer<vtkPolyData> polyData)
   return visual;
 }
 
-std::vector<ddMeshVisual::Ptr> loadMeshVisuals(const QString& filename)
+namespace {
+
+// Scaled mesh geometry with normals, keyed by the file name, modification
+// time and size of the mesh file and the scale.  Entries are evicted in
+// least recently used order.
+typedef std::vector<vtkSmartPointer<vtkPolyData> > PolyDataListType;
+typedef QMap<QString, PolyDataListType> MeshCacheType;
+MeshCacheType MeshCache;
+QStringList MeshCacheOrder;
+QMutex MeshCacheMutex;
+const int MeshCacheMaxSize = 256;
+
+QString getMeshCacheKey(const QString& filename, double scale)
+{
+  QFileInfo fileInfo(filename);
+  return QString("%1|%2|%3|%4").arg(fileInfo.absoluteFilePath())
+    .arg(fileInfo.lastModified().toMSecsSinceEpoch())
+    .arg(fileInfo.size())
+    .arg(scale, 0, 'g', 17);
+}
+
+}
+
+PolyDataListType loadProcessedPolyData(const QString& filename, double scale)
+{
+  QString key = getMeshCacheKey(filename, scale);
+
+  {
+    QMutexLocker locker(&MeshCacheMutex);
+    MeshCacheType::iterator itr = MeshCache.find(key);
+    if (itr != MeshCache.end())
+    {
+      MeshCacheOrder.removeOne(key);
+      MeshCacheOrder.append(key);
+      return itr.value();
+    }
+  }
+
+  // the mesh is processed without holding the lock so that preloadMeshes()
+  // can process several meshes at the same time.
+  PolyDataListType polyDataList = loadPolyData(filename);
+
+  for (size_t i = 0; i < polyDataList.size(); ++i)
+  {
+    vtkSmartPointer<vtkPolyData> polyData = polyDataList[i];
+    if (scale != 1.0)
+    {
+      polyData = scalePolyData(polyData, scale);
+    }
+    polyData = computeNormals(polyData);
+
+    // keep the texture_filename array of the file
+    polyData->GetFieldData()->ShallowCopy(polyDataList[i]->GetFieldData());
+    polyDataList[i] = polyData;
+  }
+
+  QMutexLocker locker(&MeshCacheMutex);
+  if (!MeshCache.contains(key))
+  {
+    MeshCacheOrder.append(key);
+  }
+  MeshCache[key] = polyDataList;
+  while (MeshCacheOrder.size() > MeshCacheMaxSize)
+  {
+    MeshCache.remove(MeshCacheOrder.takeFirst());
+  }
+
+  return polyDataList;
+}
+
+struct MeshRequest
+{
+  QString Filename;
+  double Scale;
+};
+
+void preloadMesh(MeshRequest& request)
+{
+  loadProcessedPolyData(request.Filename, request.Scale);
+}
+
+// Load meshes into the mesh cache with the global thread pool.  VTK readers
+// and filters are safe to use from several threads as long as each thread
+// uses its own instances.
+void preloadMeshes(QList<MeshRequest>& requests)
+{
+  QtConcurrent::blockingMap(requests, preloadMesh);
+}
+
+std::vector<ddMeshVisual::Ptr> loadMeshVisuals(const QString& filename, double scale)
 {
   std::vector<ddMeshVisual::Ptr> visuals;
 
-  std::vector<vtkSmartPointer<vtkPolyData> > polyDataList = loadPolyData(filename);
+  PolyDataListType polyDataList = loadProcessedPolyData(filename, scale);
 
   for (size_t i = 0; i < polyDataList.size(); ++i)
   {
-    ddMeshVisual::Ptr visual = visualFromPolyData(polyDataList[i]);
+    ddMeshVisual::Ptr visual = visualFromPolyData(polyDataList[i], false);
     if (!visual)
     {
       continue;
@@ -590,11 +684,43 @@ public:
   }
 
 
+  void preloadMeshes(const QString& rootDir)
+  {
+    QList<MeshRequest> requests;
+
+    RigidBodyTree* model = this;
+
+    for (size_t bodyIndex = 0; bodyIndex < model->bodies.size(); ++bodyIndex)
+    {
+      std::shared_ptr<RigidBody> body = model->bodies[bodyIndex];
+
+      for (size_t visualIndex = 0 ; visualIndex < body->visual_elements.size(); ++visualIndex)
+      {
+        const DrakeShapes::VisualElement& visual = body->visual_elements[visualIndex];
+        if (visual.getShape() == DrakeShapes::MESH)
+        {
+          const DrakeShapes::Mesh& mesh = static_cast<const DrakeShapes::Mesh&>(visual.getGeometry());
+          MeshRequest request;
+          request.Filename = locateMeshFile(mesh.filename.c_str(), rootDir);
+          request.Scale = mesh.scale;
+          if (request.Filename.size())
+          {
+            requests.append(request);
+          }
+        }
+      }
+    }
+
+    ::preloadMeshes(requests);
+  }
+
   void loadVisuals(const QString& rootDir=".")
   {
 
     RigidBodyTree* model = this;
 
+    this->preloadMeshes(rootDir);
+
     for (size_t bodyIndex = 0; bodyIndex < model->bodies.size(); ++bodyIndex)
     {
 
@@ -615,17 +741,7 @@ public:
           QString filename = locateMeshFile(mesh.filename.c_str(), rootDir);
           if (filename.size())
           {
-            loadedVisuals = loadMeshVisuals(filename);
-          }
-
-          if (mesh.scale != 1.0)
-          {
-
-            for (size_t mvi = 0; mvi < loadedVisuals.size(); ++mvi)
-            {
-              ddMeshVisual::Ptr meshVisual = loadedVisuals[mvi];
-              meshVisual->PolyData->ShallowCopy(scalePolyData(meshVisual->PolyData, mesh.scale));
-            }
+            loadedVisuals = loadMeshVisuals(filename, mesh.scale);
           }
 
         }
@@ -1036,6 +1152,100 @@ bool ddDrakeModel::getLinkToWorld(const QString& linkName, vtkTransform* transfo
   return false;
 }
 
+//-----------------------------------------------------------------------------
+QVector<double> ddDrakeModel::computeLinkToWorld(const QVector<double>& jointPositions,
+                                                 const QList<QString>& jointNames,
+                                                 const QList<QString>& linkNames) const
+{
+  URDFRigidBodyTreeVTK::Ptr model = this->Internal->Model;
+  QVector<double> ret;
+
+  if (!model)
+  {
+    std::cout << "ddDrakeModel::computeLinkToWorld(): model is null" << std::endl;
+    return ret;
+  }
+
+  if (this->Internal->JointPositions.size() != model->num_positions)
+  {
+    std::cout << "Internal joint positions vector has inconsistent size." << std::endl;
+    return ret;
+  }
+
+  const int numberOfJoints = jointNames.size();
+  if (!numberOfJoints || jointPositions.size() % numberOfJoints)
+  {
+    std::cout << "ddDrakeModel::computeLinkToWorld(): input jointPositions size "
+              << jointPositions.size() << " is not a multiple of " << numberOfJoints << std::endl;
+    return ret;
+  }
+
+  // map the input joint order to dof ids, joints that are not named keep
+  // their current positions
+  std::vector<int> dofIds(numberOfJoints, -1);
+  for (int i = 0; i < numberOfJoints; ++i)
+  {
+    std::map<std::string, int>::const_iterator itr = model->dofMap.find(jointNames[i].toAscii().data());
+    if (itr != model->dofMap.end())
+    {
+      dofIds[i] = itr->second;
+    }
+    else if (model->fixedDOFs.find(jointNames[i].toAscii().data()) == model->fixedDOFs.end())
+    {
+      printf("Could not find URDF model dof with name: %s\n", qPrintable(jointNames[i]));
+    }
+  }
+
+  QMap<QString, int> linkIds = model->getLinkIds();
+  std::vector<int> bodyIds;
+  for (int i = 0; i < linkNames.size(); ++i)
+  {
+    if (!linkIds.contains(linkNames[i]))
+    {
+      printf("computeLinkToWorld: cannot find link name: %s\n", qPrintable(linkNames[i]));
+      return ret;
+    }
+    bodyIds.push_back(linkIds.value(linkNames[i]));
+  }
+
+  const int numberOfPoses = jointPositions.size() / numberOfJoints;
+  ret.resize(numberOfPoses * bodyIds.size() * 16);
+  double* output = ret.data();
+
+  // kinematics are computed with a separate cache, so the joint positions
+  // and the link transforms of the displayed model do not change
+  VectorXd q(model->num_positions);
+  for (int i = 0; i < q.size(); ++i)
+  {
+    q(i) = this->Internal->JointPositions[i];
+  }
+
+  KinematicsCache<double> cache(model->bodies);
+
+  for (int poseIndex = 0; poseIndex < numberOfPoses; ++poseIndex)
+  {
+    const double* pose = jointPositions.constData() + poseIndex*numberOfJoints;
+    for (int i = 0; i < numberOfJoints; ++i)
+    {
+      if (dofIds[i] >= 0)
+      {
+        q(dofIds[i]) = pose[i];
+      }
+    }
+
+    cache.initialize(q);
+    model->doKinematics(cache);
+
+    for (size_t i = 0; i < bodyIds.size(); ++i)
+    {
+      Map<Matrix<double, 4, 4, RowMajor> >(output) = model->relativeTransform(cache, 0, bodyIds[i]).matrix();
+      output += 16;
+    }
+  }
+
+  return ret;
+}
+
 //-----------------------------------------------------------------------------
 QList<QString> ddDrakeModel::getLinkNames()
 {
@@ -62,11 +62,13 @@ public:
   ddInternal()
   {
     this->RenderPending = false;
+    this->RenderRequestCount = 0;
+    this->RenderCount = 0;
     this->Connector = vtkSmartPointer<vtkEventQtSlotConnect>::New();
     this->RenderTimer.setSingleShot(false);
 
-    int timerFramesPerSeconds = 60;
-    this->RenderTimer.setInterval(1000/timerFramesPerSeconds);
+    this->TargetFramesPerSecond = 60.0;
+    this->RenderTimer.setInterval(qRound(1000/this->TargetFramesPerSecond));
   }
 
   QVTKWidget* VTKWidget;
@@ -85,6 +87,9 @@ public:
   QList<QList<double> > CustomBounds;
 
   bool RenderPending;
+  double TargetFramesPerSecond;
+  qlonglong RenderRequestCount;
+  qlonglong RenderCount;
 
   ddFPSCounter FPSCounter;
   QTimer RenderTimer;
@@ -200,6 +205,7 @@ QVTKWidget* ddQVTKWidgetView::vtkWidget() const
 //-----------------------------------------------------------------------------
 void ddQVTKWidgetView::render()
 {
+  ++this->Internal->RenderRequestCount;
   if (!this->Internal->RenderPending)
   {
     this->Internal->RenderPending = true;
@@ -222,6 +228,7 @@ void ddQVTKWidgetView::onStartRender()
 //-----------------------------------------------------------------------------
 void ddQVTKWidgetView::onEndRender()
 {
+  ++this->Internal->RenderCount;
   this->Internal->FPSCounter.update();
   //printf("end render: %.2f fps\n", this->Internal->FPSCounter.averageFPS());
 }
@@ -241,6 +248,43 @@ double ddQVTKWidgetView::getAverageFramesPerSecond()
   return this->Internal->FPSCounter.averageFPS();
 }
 
+//-----------------------------------------------------------------------------
+double ddQVTKWidgetView::targetFramesPerSecond() const
+{
+  return this->Internal->TargetFramesPerSecond;
+}
+
+//-----------------------------------------------------------------------------
+void ddQVTKWidgetView::setTargetFramesPerSecond(double framesPerSecond)
+{
+  if (framesPerSecond <= 0)
+  {
+    return;
+  }
+
+  this->Internal->TargetFramesPerSecond = framesPerSecond;
+  this->Internal->RenderTimer.setInterval(qMax(1, qRound(1000/framesPerSecond)));
+}
+
+//-----------------------------------------------------------------------------
+qlonglong ddQVTKWidgetView::renderRequestCount() const
+{
+  return this->Internal->RenderRequestCount;
+}
+
+//-----------------------------------------------------------------------------
+qlonglong ddQVTKWidgetView::renderCount() const
+{
+  return this->Internal->RenderCount;
+}
+
+//-----------------------------------------------------------------------------
+void ddQVTKWidgetView::resetRenderStatistics()
+{
+  this->Internal->RenderRequestCount = 0;
+  this->Internal->RenderCount = 0;
+}
+
 //-----------------------------------------------------------------------------
 void ddQVTKWidgetView::addCustomBounds(const QList<double>& bounds)
 {
@@ -50,6 +50,17 @@ public slots:
   void forceRender();
   void resetCamera();
 
+  // The maximum rate at which pending render requests are performed.
+  double targetFramesPerSecond() const;
+  void setTargetFramesPerSecond(double framesPerSecond);
+
+  // Number of calls to render() and number of renders performed since
+  // the last call to resetRenderStatistics().  A burst of render requests
+  // between two frames is coalesced into a single render.
+  qlonglong renderRequestCount() const;
+  qlonglong renderCount() const;
+  void resetRenderStatistics();
+
   void setActorManipulationStyle();
   void setCameraManipulationStyle();
 
@@ -120,6 +120,32 @@ def setBackgroundColor(color, color2=None, view=None):
     ren.SetBackground2(color2)
 
 
+def getRenderStatistics(view=None):
+    '''
+    Returns a dict with the number of render requests and performed renders
+    of the view since the statistics were last reset.  Render requests are
+    coalesced so that a view renders at most once per frame.
+    '''
+    view = view or getCurrentRenderView()
+    assert(view)
+
+    return dict(requested=view.renderRequestCount(),
+                performed=view.renderCount(),
+                targetFps=view.targetFramesPerSecond())
+
+
+def resetRenderStatistics(view=None):
+    view = view or getCurrentRenderView()
+    assert(view)
+    view.resetRenderStatistics()
+
+
+def setRenderTargetFps(targetFps, view=None):
+    view = view or getCurrentRenderView()
+    assert(view)
+    view.setTargetFramesPerSecond(targetFps)
+
+
 def displaySnoptInfo(info):
     if getMainWindow() is not None:
         getMainWindow().statusBar().showMessage('Info: %d' % info)
@@ -1,5 +1,6 @@
 from weakref import ref
 import new
+import time
 
 '''
 CallbackRegistry is a class taken from matplotlib.cbook.
@@ -46,12 +47,24 @@ class CallbackRegistry:
     functions).  This technique was shared by Peter Parente on his
     `"Mindtrove" blog
     <http://mindtrove.info/articles/python-weak-references/>`_.
+
+    The callbacks of each signal are kept in a dispatch list that is only
+    rebuilt when a callback is connected or disconnected, so process() does
+    not copy the registry on every emission.  Call enableStatistics() to
+    count the emissions of each signal and accumulate the time spent in
+    each callback::
+
+       callbacks.enableStatistics()
+       ...
+       callbacks.printStatistics()
     """
 
     def __init__(self, signals):
         '*signals* is a sequence of valid signals'
         self.signals = set()
         self.callbacks = dict()
+        self._dispatch = dict()
+        self.statistics = None
         for s in signals:
             self.addSignal(s)
         self._cid = 0
@@ -67,6 +80,19 @@ class CallbackRegistry:
         if sig not in self.signals:
             self.signals.add(sig)
             self.callbacks[sig] = dict()
+            self._dispatch[sig] = ()
+
+    def _updateDispatch(self, s):
+        'rebuild the dispatch list of signal *s* in connection order'
+        self._dispatch[s] = tuple(sorted(self.callbacks[s].items()))
+
+    def _removeCallback(self, s, cid):
+        try:
+            del self.callbacks[s][cid]
+        except KeyError:
+            return False
+        self._updateDispatch(s)
+        return True
 
     def connect(self, s, func):
         """
@@ -83,18 +109,15 @@ class CallbackRegistry:
                 return cid
         self._cid += 1
         self.callbacks[s][self._cid] = proxy
+        self._updateDispatch(s)
         return self._cid
 
     def disconnect(self, cid):
         """
         disconnect the callback registered with callback id *cid*
         """
-        for eventname, callbackd in self.callbacks.items():
-            try:
-                del callbackd[cid]
-            except KeyError:
-                continue
-            else:
+        for eventname in self.callbacks:
+            if self._removeCallback(eventname, cid):
                 return
 
     def process(self, s, *args, **kwargs):
@@ -102,13 +125,77 @@ class CallbackRegistry:
         process signal *s*.  All of the functions registered to receive
         callbacks on *s* will be called with *\*args* and *\*\*kwargs*
         """
-        self._check_signal(s)
-        for cid, proxy in self.callbacks[s].items():
-            # Clean out dead references
-            if proxy.inst is not None and proxy.inst() is None:
-                del self.callbacks[s][cid]
+        try:
+            dispatch = self._dispatch[s]
+        except KeyError:
+            # raises ValueError for an unknown signal
+            self._check_signal(s)
+
+        if self.statistics is not None:
+            self._processWithStatistics(s, dispatch, args, kwargs)
+            return
+
+        for cid, proxy in dispatch:
+            inst = proxy.inst
+            if inst is None:
+                proxy.func(*args, **kwargs)
+                continue
+
+            inst = inst()
+            if inst is None:
+                # Clean out dead references
+                self._removeCallback(s, cid)
             else:
-                proxy(*args, **kwargs)
+                proxy.func(inst, *args, **kwargs)
+
+    def _processWithStatistics(self, s, dispatch, args, kwargs):
+
+        signalStats = self.statistics.setdefault(s, dict(count=0, time=0.0, callbacks={}))
+        signalStats['count'] += 1
+        callbackStats = signalStats['callbacks']
+
+        for cid, proxy in dispatch:
+            if proxy.inst is not None and proxy.inst() is None:
+                self._removeCallback(s, cid)
+                continue
+
+            startTime = time.time()
+            proxy(*args, **kwargs)
+            elapsed = time.time() - startTime
+
+            signalStats['time'] += elapsed
+            stats = callbackStats.setdefault(proxy.getName(), [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+
+    def enableStatistics(self, enabled=True):
+        """
+        Enable or disable collection of per signal emission counts and
+        cumulative callback times.  Enabling resets the statistics.
+        """
+        self.statistics = dict() if enabled else None
+
+    def resetStatistics(self):
+        if self.statistics is not None:
+            self.statistics = dict()
+
+    def getStatistics(self):
+        """
+        return a list of dicts with the keys signal, callback, count and
+        time (seconds), sorted by decreasing cumulative time.
+        """
+        result = []
+        for s, signalStats in (self.statistics or {}).iteritems():
+            for name, (count, elapsed) in signalStats['callbacks'].iteritems():
+                result.append(dict(signal=s, callback=name, count=count, time=elapsed))
+        result.sort(key=lambda x: x['time'], reverse=True)
+        return result
+
+    def printStatistics(self):
+        for s, signalStats in sorted((self.statistics or {}).iteritems()):
+            print '%s: %d emissions, %.3f seconds' % (s, signalStats['count'], signalStats['time'])
+        for stats in self.getStatistics():
+            print '  %.3f seconds  %6d calls  %s  %s' % (stats['time'], stats['count'], stats['signal'], stats['callback'])
 
     def getCallbacks(self, s):
         """
@@ -116,13 +203,13 @@ class CallbackRegistry:
         """
         self._check_signal(s)
         callbacks = []
-        for cid, proxy in self.callbacks[s].items():
+        for cid, proxy in self._dispatch[s]:
             # Clean out dead references
             if proxy.inst is not None and proxy.inst() is None:
-                del self.callbacks[s][cid]
+                self._removeCallback(s, cid)
             else:
                 callbacks.append(proxy)
-            return callbacks
+        return callbacks
 
 
 class BoundMethodProxy(object):
@@ -151,6 +238,18 @@ class BoundMethodProxy(object):
             self.func = cb
             self.klass = None
 
+    def getName(self):
+        '''
+        Returns a readable name of the callable for statistics.
+        '''
+        name = getattr(self.func, '__name__', None) or repr(self.func)
+        if self.klass is not None:
+            name = '%s.%s' % (self.klass.__name__, name)
+        module = getattr(self.func, '__module__', None)
+        if module:
+            name = '%s.%s' % (module, name)
+        return name
+
     def __call__(self, *args, **kwargs):
         '''
         Proxy for a call to the weak referenced object. Take
@@ -482,9 +482,7 @@ class ContinousWalkingDemo(object):
         if r is not None:
             # draw step
             d = DebugData()
-            for p1, p2 in zip(step, step[1:]):
-                d.addLine(p1, p2)
-            d.addLine(step[-1], step[0])
+            d.addPolyLine(step, closed=True)
 
             folder = om.getOrCreateContainer('Safe terrain regions')
             obj = vis.showPolyData(d.getPolyData(), 'step region %d' % len(folder.children()), parent=folder)
@@ -1,8 +1,63 @@
 import vtkAll as vtk
-from vtkNumpy import addNumpyToVtk
+from vtkNumpy import addNumpyToVtk, getVtkPointsFromNumpy, getNumpyFromVtk, numpy_support
 from shallowCopy import shallowCopy
 import numpy as np
 
+
+def _getCellIdMask(connectivity):
+    '''
+    Given a vtkCellArray connectivity array [n, id_1, ..., id_n, n, ...]
+    returns a mask that is True for the point ids and False for the counts.
+    '''
+    mask = np.ones(len(connectivity), dtype=bool)
+    i = 0
+    while i < len(connectivity):
+        mask[i] = False
+        i += connectivity[i] + 1
+    return mask
+
+
+def _tileCells(connectivity, numberOfCopies, pointsPerCopy):
+    '''
+    Repeat the connectivity of one primitive numberOfCopies times, offsetting
+    the point ids of each copy by pointsPerCopy.  Returns a vtkCellArray.
+    '''
+    connectivity = np.asarray(connectivity, dtype=numpy_support.ID_TYPE_CODE)
+    cellsPerCopy = np.count_nonzero(~_getCellIdMask(connectivity))
+    offsets = np.arange(numberOfCopies, dtype=connectivity.dtype)*pointsPerCopy
+    cells = connectivity[None,:] + offsets[:,None]*_getCellIdMask(connectivity)[None,:]
+
+    cellArray = vtk.vtkCellArray()
+    cellArray.SetCells(numberOfCopies*cellsPerCopy, numpy_support.numpy_to_vtkIdTypeArray(cells.ravel(), deep=True))
+    return cellArray
+
+
+def _getPrimitiveColors(color, numberOfPrimitives, pointsPerPrimitive):
+    '''
+    Returns a uint8 RGB255 array for the points of numberOfPrimitives
+    primitives given a single color or one color per primitive.
+    '''
+    colors = (np.asarray(color, dtype=float).reshape(-1, 3)*255).astype(np.uint8)
+    if len(colors) == 1:
+        colors = np.repeat(colors, numberOfPrimitives, axis=0)
+    assert len(colors) == numberOfPrimitives
+    return np.repeat(colors, pointsPerPrimitive, axis=0)
+
+
+def _getPerpendicularAxes(directions):
+    '''
+    Returns two arrays of unit vectors that are perpendicular to each other
+    and to the given unit directions.
+    '''
+    reference = np.zeros_like(directions)
+    useY = np.abs(directions[:,0]) > 0.9
+    reference[~useY, 0] = 1.0
+    reference[useY, 1] = 1.0
+    u = np.cross(directions, reference)
+    u /= np.linalg.norm(u, axis=1)[:,None]
+    v = np.cross(directions, u)
+    return u, v
+
 class DebugData(object):
 
     def __init__(self):
@@ -40,6 +95,124 @@ class DebugData(object):
         self.append.AddInput(polyData)
 
 
+    def _addPrimitives(self, points, normals, verts=None, lines=None, polys=None, color=[1,1,1], numberOfPrimitives=1):
+        polyData = vtk.vtkPolyData()
+        polyData.SetPoints(getVtkPointsFromNumpy(np.ascontiguousarray(points, dtype=float)))
+        if normals is not None:
+            addNumpyToVtk(polyData, np.ascontiguousarray(normals, dtype=np.float32), 'Normals')
+            polyData.GetPointData().SetActiveNormals('Normals')
+        if verts is not None:
+            polyData.SetVerts(verts)
+        if lines is not None:
+            polyData.SetLines(lines)
+        if polys is not None:
+            polyData.SetPolys(polys)
+
+        colors = _getPrimitiveColors(color, numberOfPrimitives, len(points) / numberOfPrimitives)
+        addNumpyToVtk(polyData, colors, 'RGB255')
+        self.append.AddInput(polyData)
+
+    def addLines(self, starts, ends, radius=0.0, color=[1,1,1], numberOfSides=24):
+        '''
+        Add a line from each row of starts to the same row of ends, both Nx3
+        arrays.  color is a single color or an Nx3 array of colors.  If
+        radius is not zero the lines are drawn as capped tubes, like
+        addLine().  The geometry of all lines is generated with numpy.
+        '''
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        assert starts.shape == ends.shape
+        numberOfLines = len(starts)
+        if not numberOfLines:
+            return
+
+        if radius == 0.0:
+            points = np.hstack([starts, ends]).reshape(-1, 3)
+            lines = _tileCells([2, 0, 1], numberOfLines, 2)
+            self._addPrimitives(points, None, lines=lines, color=color, numberOfPrimitives=numberOfLines)
+            return
+
+        directions = ends - starts
+        lengths = np.linalg.norm(directions, axis=1)
+        directions[lengths > 0] /= lengths[lengths > 0][:,None]
+        directions[lengths == 0] = [0.0, 0.0, 1.0]
+        u, v = _getPerpendicularAxes(directions)
+
+        sides = numberOfSides
+        angles = np.linspace(0, 2*np.pi, sides, endpoint=False)
+        radial = np.cos(angles)[None,:,None]*u[:,None,:] + np.sin(angles)[None,:,None]*v[:,None,:]
+
+        # the points of each tube are the two rings of the side, then the
+        # same rings again for the caps so that they have their own normals
+        ring1 = starts[:,None,:] + radius*radial
+        ring2 = ends[:,None,:] + radius*radial
+        points = np.concatenate([ring1, ring2, ring1, ring2], axis=1)
+        normals = np.concatenate([radial, radial,
+                                  np.repeat(-directions[:,None,:], sides, axis=1),
+                                  np.repeat(directions[:,None,:], sides, axis=1)], axis=1)
+
+        k = np.arange(sides)
+        quads = np.column_stack([np.full(sides, 4), k, (k+1) % sides, sides + (k+1) % sides, sides + k])
+        cap1 = np.hstack([[sides], 2*sides + k[::-1]])
+        cap2 = np.hstack([[sides], 3*sides + k])
+        connectivity = np.hstack([quads.ravel(), cap1, cap2])
+
+        polys = _tileCells(connectivity, numberOfLines, 4*sides)
+        self._addPrimitives(points.reshape(-1, 3), normals.reshape(-1, 3), polys=polys, color=color, numberOfPrimitives=numberOfLines)
+
+    def addPolyLine(self, points, radius=0.0, color=[1,1,1], closed=False):
+        '''
+        Add lines connecting consecutive rows of the Nx3 points array.
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        ends = np.roll(points, -1, axis=0) if closed else points[1:]
+        self.addLines(points[:len(ends)], ends, radius=radius, color=color)
+
+    def addSpheres(self, centers, radii=0.05, color=[1,1,1], resolution=12):
+        '''
+        Add a sphere at each row of the Nx3 centers array.  radii is a
+        single radius or one radius per sphere, color is a single color or
+        an Nx3 array of colors.  A unit sphere is tessellated once and
+        copied to all centers with numpy.
+        '''
+        centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+        numberOfSpheres = len(centers)
+        if not numberOfSpheres:
+            return
+
+        radii = np.asarray(radii, dtype=float)*np.ones(numberOfSpheres)
+
+        sphere = vtk.vtkSphereSource()
+        sphere.SetThetaResolution(resolution)
+        sphere.SetPhiResolution(resolution)
+        sphere.SetRadius(1.0)
+        sphere.Update()
+        unitSphere = sphere.GetOutput()
+
+        unitPoints = getNumpyFromVtk(unitSphere, 'Points')
+        unitNormals = unitPoints / np.linalg.norm(unitPoints, axis=1)[:,None]
+        connectivity = numpy_support.vtk_to_numpy(unitSphere.GetPolys().GetData())
+
+        points = centers[:,None,:] + radii[:,None,None]*unitPoints[None,:,:]
+        normals = np.repeat(unitNormals[None,:,:], numberOfSpheres, axis=0)
+
+        polys = _tileCells(connectivity, numberOfSpheres, len(unitPoints))
+        self._addPrimitives(points.reshape(-1, 3), normals.reshape(-1, 3), polys=polys, color=color, numberOfPrimitives=numberOfSpheres)
+
+    def addFrames(self, frames, scale, tubeRadius=0.0):
+        '''
+        Add the axes of many frames, given as vtkTransforms or an Nx4x4
+        array of matrices, with a single call to addLines().
+        '''
+        if len(frames) and hasattr(frames[0], 'GetMatrix'):
+            frames = [[[f.GetMatrix().GetElement(r, c) for c in xrange(4)] for r in xrange(4)] for f in frames]
+        frames = np.asarray(frames, dtype=float).reshape(-1, 4, 4)
+
+        origins = np.repeat(frames[:,:3,3], 3, axis=0)
+        axes = frames[:,:3,:3].transpose(0, 2, 1).reshape(-1, 3)*scale
+        colors = np.tile(np.eye(3), (len(frames), 1))
+        self.addLines(origins, origins + axes, radius=tubeRadius, color=colors)
+
     def addLine(self, p1, p2, radius=0.0, color=[1,1,1]):
 
         line = vtk.vtkLineSource()
@@ -11,8 +11,11 @@ from director import filterUtils
 from director.shallowCopy import shallowCopy
 from director import vtkAll as vtk
 from director import vtkNumpy as vnp
+from director.vtkNumpy import numpy_support
 from director import visualization as vis
 from director import packagepath
+from director import meshcache
+from director.timercallback import TimerCallback
 
 import bot_core as lcmbot
 
@@ -30,7 +33,6 @@ USE_SHADOWS = False
 
 class Geometry(object):
 
-    TextureCache = {}
     MeshToTexture = {}
 
     PackageMap = None
@@ -109,23 +111,10 @@ class Geometry(object):
         return pd
 
     @staticmethod
-    def scaleGeometry(polyDataList, geom):
-        if len(geom.float_data) == 1:
-            scale_x = scale_y = scale_z = geom.float_data[0]
-        elif len(geom.float_data) == 3:
-            scale_x = geom.float_data[0]
-            scale_y = geom.float_data[1]
-            scale_z = geom.float_data[2]
-        else:
-            scale_x = scale_y = scale_z = 1.0
-
-        if scale_x != 1.0 or scale_y != 1.0 or scale_z != 1.0:
-            t = vtk.vtkTransform()
-            t.Scale(scale_x, scale_y, scale_z)
-            polyDataList = [filterUtils.transformPolyData(polyData, t) for polyData in polyDataList]
-
-        return polyDataList
-
+    def getScale(geom):
+        if len(geom.float_data) in (1, 3):
+            return list(geom.float_data)
+        return None
 
     @staticmethod
     def transformGeometry(polyDataList, geom):
@@ -152,10 +141,21 @@ class Geometry(object):
         return textureArray.GetValue(0)
 
     @staticmethod
-    def loadTextureForMesh(polyData, meshFileName):
+    def getTextureFile(polyData):
+        textureArray = vtk.vtkStringArray.SafeDownCast(polyData.GetFieldData().GetAbstractArray('texture_file'))
+        if not textureArray:
+            return None
+        return textureArray.GetValue(0)
 
+    @staticmethod
+    def resolveTextureFile(polyData, meshFileName):
+        '''
+        Resolves the texture_filename of a mesh relative to the mesh file and
+        stores the path in the texture_file field of polyData.  The texture
+        is loaded through meshcache when the geometry item is created.
+        '''
         textureFileName = Geometry.getTextureFileName(polyData)
-        if textureFileName in Geometry.TextureCache or textureFileName is None:
+        if textureFileName is None:
             return
 
         if not os.path.isabs(textureFileName):
@@ -168,17 +168,21 @@ class Geometry(object):
             print 'cannot find texture file:', textureFileName
             return
 
-        image = ioUtils.readImage(imageFile)
-        if not image:
-            print 'failed to load image file:', imageFile
-            return
+        textureArray = vtk.vtkStringArray()
+        textureArray.SetName('texture_file')
+        textureArray.InsertNextValue(os.path.abspath(imageFile))
+        polyData.GetFieldData().AddArray(textureArray)
 
-        texture = vtk.vtkTexture()
-        texture.SetInput(image)
-        texture.EdgeClampOn()
-        texture.RepeatOn()
+    @staticmethod
+    def loadTexture(polyData):
+        imageFile = Geometry.getTextureFile(polyData)
+        if imageFile is None:
+            return None
 
-        Geometry.TextureCache[textureFileName] = texture
+        texture = meshcache.loadTexture(imageFile)
+        if not texture:
+            print 'failed to load image file:', imageFile
+        return texture
 
     @staticmethod
     def resolvePackageFilename(filename):
@@ -196,8 +200,11 @@ class Geometry(object):
         return Geometry.PackageMap.resolveFilename(filename) or filename
 
     @staticmethod
-    def loadPolyDataMeshes(geom):
-
+    def findMeshFile(geom):
+        '''
+        Returns the mesh file to load for a MESH geometry, or None if the
+        file is not found.
+        '''
         filename = Geometry.resolvePackageFilename(geom.string_data)
         basename, ext = os.path.splitext(filename)
 
@@ -209,18 +216,38 @@ class Geometry(object):
                 break
 
         if not os.path.isfile(filename):
-            print 'warning, cannot find file:', filename
+            return None
+
+        return filename
+
+    @staticmethod
+    def getMeshRequests(load_msg):
+        '''
+        Returns the list of (filename, scale) mesh files referenced by a
+        viewer_load_robot_t message.
+        '''
+        requests = []
+        for link in load_msg.link:
+            for geom in link.geom:
+                if geom.type == lcmrl.viewer_geometry_data_t.MESH and geom.string_data:
+                    filename = Geometry.findMeshFile(geom)
+                    if filename is not None:
+                        requests.append((filename, Geometry.getScale(geom)))
+        return requests
+
+    @staticmethod
+    def loadPolyDataMeshes(geom):
+
+        filename = Geometry.findMeshFile(geom)
+        if filename is None:
+            print 'warning, cannot find file:', Geometry.resolvePackageFilename(geom.string_data)
             return []
 
-        if filename.endswith('vtm'):
-            polyDataList = ioUtils.readMultiBlock(filename)
-        else:
-            polyDataList = [ioUtils.readPolyData(filename)]
+        polyDataList = meshcache.loadMeshes(filename, Geometry.getScale(geom))
 
         if USE_TEXTURE_MESHES:
             for polyData in polyDataList:
-                Geometry.loadTextureForMesh(polyData, filename)
-
+                Geometry.resolveTextureFile(polyData, filename)
 
         return polyDataList
 
@@ -238,7 +265,6 @@ class Geometry(object):
                 polyDataList = [Geometry.createPolyDataFromMeshMessage(geom)]
             else:
                 polyDataList = Geometry.loadPolyDataMeshes(geom)
-                polyDataList = Geometry.scaleGeometry(polyDataList, geom)
 
         polyDataList = Geometry.transformGeometry(polyDataList, geom)
         polyDataList = Geometry.computeNormals(polyDataList)
@@ -259,7 +285,7 @@ class Geometry(object):
     def __init__(self, name, geom, polyData, parentTransform):
         self.polyDataItem = vis.PolyDataItem(name, polyData, view=None)
         self.polyDataItem.setProperty('Alpha', geom.color[3])
-        self.polyDataItem.actor.SetTexture(Geometry.TextureCache.get( Geometry.getTextureFileName(polyData) ))
+        self.polyDataItem.actor.SetTexture(Geometry.loadTexture(polyData))
 
         if self.polyDataItem.actor.GetTexture():
             self.polyDataItem.setProperty('Color', QtGui.QColor(255, 255, 255))
@@ -275,6 +301,7 @@ class Link(object):
 
     def __init__(self, link):
         self.transform = vtk.vtkTransform()
+        self.matrix = np.eye(4)
 
         self.geometry = []
         for g in link.geom:
@@ -282,15 +309,118 @@ class Link(object):
 
 
     def setTransform(self, pos, quat):
-        self.transform = transformUtils.transformFromPose(pos, quat)
+        self.setMatrix(transformUtils.matricesFromPoses(pos, quat)[0])
+
+    def setMatrix(self, mat):
+        '''
+        Set the link pose from a 4x4 matrix.  The link transform is updated
+        in place, so geometry actors keep using the same vtkTransform.
+        '''
+        self.matrix = mat
+        elements = mat.ravel().tolist()
+        self.transform.SetMatrix(elements)
         for g in self.geometry:
             childFrame = g.polyDataItem.getChildFrame()
             if childFrame:
-                childFrame.copyFrame(self.transform)
-            else:
+                childFrame.copyFrame(elements)
+            elif g.polyDataItem.actor.GetUserTransform() is not self.transform:
                 g.polyDataItem.actor.SetUserTransform(self.transform)
 
 
+class PlanarLidarHistory(object):
+    '''
+    Keeps the points of the last numberOfScans planar lidar scans in one
+    preallocated point cloud.  Scans are written into a ring buffer of
+    points in world coordinates, so earlier scans stay where they were
+    measured when the sensor moves.  The numpy arrays are shared with the
+    vtk arrays of polyData and are updated in place.
+
+    Rays with a negative range and scans more than decayTime seconds older
+    than the newest scan are left out of the vertex cells.  The point data
+    array 'age' holds the age in seconds of the scan of each point.
+    '''
+
+    def __init__(self, numberOfScans=1, decayTime=None):
+        self.numberOfScans = max(int(numberOfScans), 1)
+        self.decayTime = decayTime
+        self.numberOfRays = 0
+        self.polyData = vtk.vtkPolyData()
+        self._angles = None
+        self._allocate(0)
+
+    def _allocate(self, numberOfRays):
+        self.numberOfRays = numberOfRays
+        numberOfPoints = self.numberOfScans*numberOfRays
+        self._points = np.zeros((numberOfPoints, 3))
+        self._age = np.zeros(numberOfPoints)
+        self._valid = np.zeros((self.numberOfScans, numberOfRays), dtype=bool)
+        self._utimes = np.zeros(self.numberOfScans, dtype=np.int64)
+        self._numberOfStoredScans = 0
+        self._nextScan = 0
+
+        self.polyData.Initialize()
+        self.polyData.SetPoints(vnp.getVtkPointsFromNumpy(self._points))
+        self.polyData.SetVerts(vtk.vtkCellArray())
+        vnp.addNumpyToVtk(self.polyData, self._age, 'age')
+
+    def setNumberOfScans(self, numberOfScans, decayTime=None):
+        '''
+        Change the size of the history.  Stored scans are cleared.
+        '''
+        self.numberOfScans = max(int(numberOfScans), 1)
+        self.decayTime = decayTime
+        self._allocate(self.numberOfRays)
+
+    def _getAngles(self, numberOfRays, rad0, radstep):
+        key = (numberOfRays, rad0, radstep)
+        if self._angles is None or self._angles[0] != key:
+            angles = rad0 + radstep*np.arange(numberOfRays)
+            self._angles = (key, np.column_stack((np.cos(angles), np.sin(angles))))
+        return self._angles[1]
+
+    def addScan(self, ranges, rad0, radstep, utime, matrix):
+        '''
+        Add a scan measured by a sensor with the 4x4 pose matrix.
+        '''
+        ranges = np.asarray(ranges, dtype=float)
+        numberOfRays = len(ranges)
+        if numberOfRays != self.numberOfRays:
+            self._allocate(numberOfRays)
+
+        directions = self._getAngles(numberOfRays, rad0, radstep)
+        scan = self._nextScan
+        points = self._points[scan*numberOfRays:(scan+1)*numberOfRays]
+        points[:] = matrix[:3,3]
+        points += (ranges[:,np.newaxis]*directions).dot(matrix[:3,:2].T)
+
+        self._valid[scan] = ranges >= 0
+        self._utimes[scan] = utime
+        self._nextScan = (scan + 1) % self.numberOfScans
+        self._numberOfStoredScans = min(self._numberOfStoredScans + 1, self.numberOfScans)
+
+        self.polyData.GetPoints().Modified()
+        self._updateCells(utime)
+
+    def _updateCells(self, utime):
+        age = (utime - self._utimes)*1e-6
+        shown = np.arange(self.numberOfScans) < self._numberOfStoredScans
+        if self.decayTime is not None:
+            shown &= age <= self.decayTime
+
+        self._age.reshape(self.numberOfScans, self.numberOfRays)[:] = age[:,np.newaxis]
+        self.polyData.GetPointData().GetArray('age').Modified()
+
+        # the shown points are drawn as a single poly vertex cell
+        pointIds = np.flatnonzero(self._valid & shown[:,np.newaxis])
+        verts = vtk.vtkCellArray()
+        if len(pointIds):
+            cells = np.empty(len(pointIds) + 1, dtype=numpy_support.ID_TYPE_CODE)
+            cells[0] = len(pointIds)
+            cells[1:] = pointIds
+            verts.SetCells(1, numpy_support.numpy_to_vtkIdTypeArray(cells, deep=True))
+        self.polyData.SetVerts(verts)
+
+
 class DrakeVisualizer(object):
     name = 'Drake Visualizer'
 
@@ -300,6 +430,15 @@ class DrakeVisualizer(object):
         self.view = view
         self.robots = {}
         self.linkWarnings = set()
+        self._drawLinksKey = None
+        self._drawLinks = []
+        self._drawPoses = None
+        self._pendingLoads = []
+        self._pendingDraw = None
+        self.planarLidarHistories = {}
+        self.planarLidarNumberOfScans = 1
+        self.planarLidarDecayTime = None
+        self._loadTimer = TimerCallback(targetFps=10, callback=self._onLoadTimer)
         self.enable()
         self.sendStatusMessage('loaded')
 
@@ -323,6 +462,7 @@ class DrakeVisualizer(object):
             self._addSubscribers()
         elif not enabled and self.isEnabled():
             self._removeSubscribers()
+            self.cancelLoads()
 
     def enable(self):
         self.setEnabled(True)
@@ -331,17 +471,91 @@ class DrakeVisualizer(object):
         self.setEnabled(False)
 
     def onViewerLoadRobot(self, msg):
-        self.removeAllRobots()
+        self.startLoad(msg, self._finishLoadRobot)
+
+    def onViewerAddRobot(self, msg):
+        self.startLoad(msg, self._finishAddRobot)
+
+    def _finishLoadRobot(self, msg):
+        # later loads that are still pending are kept
+        self._removeAllRobots()
         self.addLinksFromLCM(msg)
         self.sendStatusMessage('successfully loaded robot')
 
-    def onViewerAddRobot(self, msg):
+    def _finishAddRobot(self, msg):
         robotNumsToReplace = set(link.robot_num for link in msg.link)
         for robotNum in robotNumsToReplace:
             self.removeRobot(robotNum)
         self.addLinksFromLCM(msg)
         self.sendStatusMessage('successfully added robot')
 
+    def startLoad(self, msg, onFinished):
+        '''
+        Load the link meshes of a viewer_load_robot_t message with a
+        meshcache.MeshLoader and call onFinished(msg) on the GUI thread when
+        they are loaded.  Loads finish in the order they are started, and
+        draw messages received while a load is pending are applied after
+        it finishes.
+        '''
+        loader = meshcache.MeshLoader(Geometry.getMeshRequests(msg))
+        if loader.isFinished() and not self._pendingLoads:
+            self._reportLoadErrors(loader)
+            with om.bulkUpdate():
+                onFinished(msg)
+            return
+
+        self._pendingLoads.append((loader, msg, onFinished))
+        if not self._loadTimer.isActive():
+            self._loadTimer.start()
+
+    def isLoading(self):
+        return bool(self._pendingLoads)
+
+    def cancelLoads(self):
+        '''
+        Drop the pending loads and the draw message waiting for them.  The
+        worker threads of a cancelled load still finish, and the meshes
+        they load stay in the mesh cache.
+        '''
+        if not self._pendingLoads:
+            return
+        self._pendingLoads = []
+        self._pendingDraw = None
+        if self._loadTimer.isActive():
+            self._loadTimer.stop()
+        self._showLoadProgress(None)
+
+    @staticmethod
+    def _reportLoadErrors(loader):
+        for (filename, scale), error in sorted(loader.errors.items()):
+            print 'warning, failed to load mesh %s: %s' % (filename, error)
+
+    def _onLoadTimer(self):
+        while self._pendingLoads:
+            loader, msg, onFinished = self._pendingLoads[0]
+            if not loader.isFinished():
+                self._showLoadProgress(loader)
+                return
+            self._pendingLoads.pop(0)
+            self._reportLoadErrors(loader)
+            with om.bulkUpdate():
+                onFinished(msg)
+
+        self._showLoadProgress(None)
+        if self._pendingDraw is not None:
+            msg, self._pendingDraw = self._pendingDraw, None
+            self.onViewerDraw(msg)
+        return False
+
+    def _showLoadProgress(self, loader):
+        mainWindow = app.getMainWindow()
+        if not mainWindow:
+            return
+        if loader is None:
+            mainWindow.statusBar().clearMessage()
+        else:
+            mainWindow.statusBar().showMessage('Loading robot meshes: %d/%d' % loader.getProgress())
+
     def getRootFolder(self):
         return om.getOrCreateContainer(self.name.lower(), parentObj=om.findObjectByName('scene'))
 
@@ -360,6 +574,7 @@ class DrakeVisualizer(object):
 
     def addLink(self, link, robotNum, linkName):
         self.robots.setdefault(robotNum, {})[linkName] = link
+        self._drawLinksKey = None
         linkFolder = self.getLinkFolder(robotNum, linkName)
         for geom in link.geometry:
             self.addLinkGeometry(geom, linkName, linkFolder)
@@ -380,15 +595,24 @@ class DrakeVisualizer(object):
         return self.robots[robotNum][linkName]
 
     def removeAllRobots(self):
-        for child in self.getRootFolder().children():
-            if child.getProperty('Name') != "pointclouds":
-                om.removeFromObjectModel(child)
+        self.cancelLoads()
+        self._removeAllRobots()
+
+    def _removeAllRobots(self):
+        om.removeObjects([child for child in self.getRootFolder().children()
+                            if child.getProperty('Name') != "pointclouds"])
         self.robots = {}
+        self.planarLidarHistories = {}
+        self._drawLinksKey = None
 
     def removeRobot(self, robotNum):
         if robotNum in self.robots:
             om.removeFromObjectModel(self.getRobotFolder(robotNum))
             del self.robots[robotNum]
+            self._drawLinksKey = None
+            for key in self.planarLidarHistories.keys():
+                if key[0] == robotNum:
+                    del self.planarLidarHistories[key]
 
     def sendStatusMessage(self, message):
         msg = lcmrl.viewer_command_t()
@@ -396,26 +620,91 @@ class DrakeVisualizer(object):
         msg.command_data = message
         lcmUtils.publish('DRAKE_VIEWER_STATUS', msg)
 
-    def onViewerDraw(self, msg):
-
-        for i in xrange(msg.num_links):
-
-            pos = msg.position[i]
-            quat = msg.quaternion[i]
-            robotNum = msg.robot_num[i]
-            linkName = msg.link_name[i]
-
+    def _getDrawLinks(self, msg):
+        '''
+        Returns the list of links named by a viewer_draw_t message, with None
+        for links that are not found.  The list is cached and looked up again
+        only when the link names of the message or the loaded robots change.
+        '''
+        key = (tuple(msg.robot_num), tuple(msg.link_name))
+        if key == self._drawLinksKey:
+            return self._drawLinks
+
+        links = []
+        for robotNum, linkName in zip(*key):
             try:
-                link = self.getLink(robotNum, linkName)
+                links.append(self.getLink(robotNum, linkName))
             except KeyError:
+                links.append(None)
                 if linkName not in self.linkWarnings:
                     print 'Error locating link name:', linkName
                     self.linkWarnings.add(linkName)
-            else:
-                link.setTransform(pos, quat)
+
+        self._drawLinksKey = key
+        self._drawLinks = links
+        self._drawPoses = None
+        return links
+
+    def onViewerDraw(self, msg):
+
+        if self._pendingLoads:
+            self._pendingDraw = msg
+            return
+
+        links = self._getDrawLinks(msg)
+
+        poses = np.empty((msg.num_links, 7))
+        poses[:,:3] = np.asarray(msg.position, dtype=float).reshape(-1, 3)
+        poses[:,3:] = np.asarray(msg.quaternion, dtype=float).reshape(-1, 4)
+
+        # only update the links whose pose changed since the last message
+        if self._drawPoses is None:
+            changed = np.arange(msg.num_links)
+        else:
+            changed = np.flatnonzero((poses != self._drawPoses).any(axis=1))
+        self._drawPoses = poses
+
+        if not len(changed):
+            return
+
+        matrices = transformUtils.matricesFromPoses(poses[changed,:3], poses[changed,3:])
+        for i, mat in zip(changed, matrices):
+            link = links[i]
+            if link is not None:
+                link.setMatrix(mat)
 
         self.view.render()
 
+    def setPlanarLidarHistory(self, numberOfScans, decayTime=None):
+        '''
+        Set the number of planar lidar scans that are drawn for each sensor
+        link.  If decayTime is given, scans more than decayTime seconds older
+        than the newest scan are hidden.
+        '''
+        self.planarLidarNumberOfScans = numberOfScans
+        self.planarLidarDecayTime = decayTime
+        for history, item in self.planarLidarHistories.values():
+            history.setNumberOfScans(numberOfScans, decayTime)
+            item._renderAllViews()
+
+    def getPlanarLidarHistory(self, robotNum, linkName):
+        key = (robotNum, linkName)
+        name = linkName + ' planar lidar'
+        folder = self.getLinkFolder(robotNum, linkName)
+
+        # a new history is created if the item was removed by the user
+        history, item = self.planarLidarHistories.get(key, (None, None))
+        if item is not None and folder.findChild(name) is item:
+            return history, item
+
+        history = PlanarLidarHistory(self.planarLidarNumberOfScans, self.planarLidarDecayTime)
+        item = vis.PolyDataItem(name, history.polyData, view=None)
+        item.setProperty('Color', [1.0, 0.0, 0.0])
+        item.addToView(self.view)
+        om.addToObjectModel(item, parentObj=folder)
+        self.planarLidarHistories[key] = (history, item)
+        return history, item
+
     def onPlanarLidar(self, msg, channel):
 
         linkName = channel.replace('DRAKE_PLANAR_LIDAR_', '', 1)
@@ -429,39 +718,9 @@ class DrakeVisualizer(object):
                 print 'Error locating link name:', linkName
                 self.linkWarnings.add(linkName)
         else:
-            if len(link.geometry):
-                polyData = link.geometry[0].polyDataItem
-            else:
-                polyData = vtk.vtkPolyData()
-
-                name = linkName + ' geometry data'
-                geom = type('', (), {})
-                geom.color = [1.0,0.0,0.0,1.0]
-                g = Geometry(name, geom, polyData, link.transform)
-                link.geometry.append(g)
-
-                linkFolder = self.getLinkFolder(robotNum, linkName)
-                self.addLinkGeometry(g, linkName, linkFolder)
-                g.polyDataItem.actor.SetUserTransform(link.transform)
-
-            points = vtk.vtkPoints()
-            verts = vtk.vtkCellArray()
-
-            t = msg.rad0
-            for r in msg.ranges:
-                if r >= 0:
-                    x = r * math.cos(t)
-                    y = r * math.sin(t)
-
-                    pointId = points.InsertNextPoint([x,y,0])
-                    verts.InsertNextCell(1)
-                    verts.InsertCellPoint(pointId)
-
-                t += msg.radstep
-
-            polyData.SetPoints(points)
-            polyData.SetVerts(verts)
-
+            history, item = self.getPlanarLidarHistory(robotNum, linkName)
+            history.addScan(msg.ranges, msg.rad0, msg.radstep, msg.utime, link.matrix)
+            item._renderAllViews()
 
     def onPointCloud(self, msg, channel):
         pointcloudName = channel.replace('DRAKE_POINTCLOUD_', '', 1)
@@ -451,13 +451,16 @@ class FootstepsDriver(object):
         om.removeFromObjectModel(getFootstepsFolder())
 
     def drawFootstepPlan(self, msg, folder, left_color=None, right_color=None, alpha=1.0):
-        for step in folder.children():
-            om.removeFromObjectModel(step)
+        with om.bulkUpdate():
+            self._drawFootstepPlan(msg, folder, left_color, right_color, alpha)
+
+    def _drawFootstepPlan(self, msg, folder, left_color, right_color, alpha):
+        om.removeChildren(folder)
         allTransforms = []
         volFolder = getWalkingVolumesFolder()
-        map(om.removeFromObjectModel, volFolder.children())
+        om.removeChildren(volFolder)
         slicesFolder = getTerrainSlicesFolder()
-        map(om.removeFromObjectModel, slicesFolder.children())
+        om.removeChildren(slicesFolder)
 
 
         for i, footstep in enumerate(msg.footsteps):
@@ -518,8 +521,7 @@ class FootstepsDriver(object):
             # if np.any(height >= trans[2]):
             terrain_pts_in_local = np.vstack((path_dist, np.zeros(len(footstep.terrain_path_dist)), height))
             d = DebugData()
-            for j in range(terrain_pts_in_local.shape[1]-1):
-                d.addLine(terrain_pts_in_local[:,j], terrain_pts_in_local[:,j+1], radius=0.01)
+            d.addPolyLine(terrain_pts_in_local.T, radius=0.01)
             obj = vis.showPolyData(d.getPolyData(), 'terrain slice', parent=slicesFolder, visible=slicesFolder.getProperty('Visible'), color=[.8,.8,.3])
             obj.actor.SetUserTransform(T_terrain_to_world)
 
@@ -795,10 +795,8 @@ class IKPlanner(object):
 
     def getLinkFrameAtPose(self, linkName, pose):
         if isinstance(pose, str):
-            self.jointController.setPose(pose)
-        else:
-            self.jointController.setPose('user_pose', pose)
-        return self.robotModel.getLinkFrame(linkName)
+            pose = self.jointController.getPose(pose)
+        return self.robotModel.getLinkFrameAtPose(linkName, pose, self.jointController.jointNames)
 
 
     def getRobotModelAtPose(self, pose):
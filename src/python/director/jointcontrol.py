@@ -5,6 +5,7 @@ from director.simpletimer import SimpleTimer
 from director import robotstate
 from director import getDRCBaseDir
 from director import lcmUtils
+from director import statehistory
 import bot_core
 import numpy as np
 
@@ -20,6 +21,7 @@ class JointController(object):
         self.currentPoseName = None
         self.lastRobotStateMessage = None
         self.ignoreOldStateMessages = False
+        self.stateHistory = None
         self.setPose('q_zero', np.zeros(self.numberOfJoints))
 
     def setJointPosition(self, jointId, position):
@@ -71,6 +73,18 @@ class JointController(object):
         assert pose.shape[0] == self.numberOfJoints
         return pose
 
+    def enableStateHistory(self, maxSamples=36000):
+        '''
+        Record the poses received by the lcm updater in a StateHistory with
+        room for maxSamples samples.  Returns the history.
+        '''
+        if self.stateHistory is None or self.stateHistory.maxSamples != maxSamples:
+            self.stateHistory = statehistory.StateHistory(self.numberOfJoints, maxSamples)
+        return self.stateHistory
+
+    def disableStateHistory(self):
+        self.stateHistory = None
+
     def addLCMUpdater(self, channelName):
         '''
         adds an lcm subscriber to update the joint positions from
@@ -83,6 +97,8 @@ class JointController(object):
             poseName = channelName
             pose = robotstate.convertStateMessageToDrakePose(msg)
             self.lastRobotStateMessage = msg
+            if self.stateHistory is not None:
+                self.stateHistory.addSample(msg.utime, pose)
 
             # use joint name/positions from robot_state_t and append base_{x,y,z,roll,pitch,yaw}
             jointPositions = np.hstack((msg.joint_position, pose[:6]))
@@ -0,0 +1,267 @@
+'''
+A pure python reader for LCM log files.  The log file is memory mapped and
+event headers are parsed in place, so reading an event does not copy its
+payload.  Event data is returned as a read-only buffer into the mapped file.
+
+The LCM log file format is a sequence of events, each with the header:
+
+    uint32  sync word (0xEDA1DA01)
+    int64   event number
+    int64   timestamp (utime)
+    int32   channel length
+    int32   data length
+
+followed by the channel name and the message data.  All fields are big endian.
+'''
+
+import os
+import mmap
+import struct
+import bisect
+
+
+SYNC_WORD = 0xEDA1DA01
+SYNC_BYTES = struct.pack('>I', SYNC_WORD)
+
+_headerStruct = struct.Struct('>Iqqii')
+HEADER_SIZE = _headerStruct.size
+
+
+class LogEvent(object):
+    '''
+    A single event read from a log file.  The attribute names match those
+    of lcm.Event so that a LogEvent can be used in place of one.  The data
+    attribute is a buffer that references the memory mapped file.
+    '''
+
+    __slots__ = ['eventnum', 'timestamp', 'channel', 'data', 'offset', 'size']
+
+    def __init__(self, eventnum, timestamp, channel, data, offset, size):
+        self.eventnum = eventnum
+        self.timestamp = timestamp
+        self.channel = channel
+        self.data = data
+        self.offset = offset
+        self.size = size
+
+    @property
+    def nextOffset(self):
+        return self.offset + self.size
+
+    def __repr__(self):
+        return 'LogEvent(eventnum=%d, timestamp=%d, channel=%r, offset=%d, dataSize=%d)' % (
+            self.eventnum, self.timestamp, self.channel, self.offset, len(self.data))
+
+
+def encodeEvent(eventnum, timestamp, channel, data):
+    '''
+    Returns the bytes for a single log event.  This is useful for writing
+    small logs for testing.
+    '''
+    return _headerStruct.pack(SYNC_WORD, eventnum, timestamp, len(channel), len(data)) + channel + data
+
+
+def readEvent(f, offset):
+    '''
+    Read the event at offset from a file object using regular file reads.
+    The payload is copied, but unlike a page fault on a memory mapped file,
+    a file read releases the GIL, so this is the better choice for reading
+    from a background thread.  Returns None if there is no complete event
+    at offset and raises ValueError if offset is not the start of an event.
+    '''
+    f.seek(offset)
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+
+    sync, eventnum, timestamp, channelLength, dataLength = _headerStruct.unpack(header)
+    if sync != SYNC_WORD:
+        raise ValueError('no event found at offset %d' % offset)
+
+    channel = f.read(channelLength)
+    data = f.read(dataLength)
+    if len(data) < dataLength:
+        return None
+
+    return LogEvent(eventnum, timestamp, channel, data, offset, HEADER_SIZE + channelLength + dataLength)
+
+
+class MappedEventLog(object):
+    '''
+    Random access reader for LCM log files.
+
+    Usage:
+
+        log = MappedEventLog(filename)
+
+        for event in log:
+            print event.timestamp, event.channel
+
+        log.seek(log.findOffsetByUtime(utime))
+        event = log.readNextEvent()
+
+    The utime index used by findOffsetByUtime() is built on first use and
+    extended incrementally when refresh() detects that the file has grown.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._mmap = None
+        self._size = 0
+        self._position = 0
+        self._indexOffsets = []
+        self._indexUtimes = []
+        self._indexEnd = 0
+        self._map()
+
+    def _map(self):
+        # the previous map is not closed explicitly because event buffers
+        # may still reference it, it is released when they are.
+        self._mmap = None
+        self._size = os.fstat(self._file.fileno()).st_size
+        if self._size:
+            self._mmap = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._size = 0
+
+    def size(self):
+        return self._size
+
+    def refresh(self):
+        '''
+        Remap the file if it has grown since it was opened.  Returns True
+        if the file size changed.
+        '''
+        newSize = os.fstat(self._file.fileno()).st_size
+        if newSize == self._size:
+            return False
+        self._map()
+        return True
+
+    def seek(self, offset):
+        self._position = offset
+
+    def tell(self):
+        return self._position
+
+    def _findSync(self, offset):
+        if self._mmap is None:
+            return -1
+        return self._mmap.find(SYNC_BYTES, offset)
+
+    def readEventAt(self, offset):
+        '''
+        Parse the event starting at the given file offset.  If the offset
+        does not point to a sync word then the next sync word is searched
+        for.  Returns None if there is no complete event at or after offset.
+        '''
+        while True:
+
+            if offset + HEADER_SIZE > self._size:
+                return None
+
+            sync, eventnum, timestamp, channelLength, dataLength = _headerStruct.unpack_from(self._mmap, offset)
+
+            if sync != SYNC_WORD or channelLength < 0 or dataLength < 0:
+                offset = self._findSync(offset + 1)
+                if offset < 0:
+                    return None
+                continue
+
+            channelStart = offset + HEADER_SIZE
+            dataStart = channelStart + channelLength
+            eventEnd = dataStart + dataLength
+
+            # the event is incomplete, it may still be getting written
+            if eventEnd > self._size:
+                return None
+
+            channel = self._mmap[channelStart:dataStart]
+            data = buffer(self._mmap, dataStart, dataLength)
+            return LogEvent(eventnum, timestamp, channel, data, offset, eventEnd - offset)
+
+    def readNextEvent(self):
+        '''
+        Read the event at the current position and advance past it.
+        Returns None at the end of the log.
+        '''
+        event = self.readEventAt(self._position)
+        if event is not None:
+            self._position = event.nextOffset
+        return event
+
+    def iterEvents(self, offset=0, channels=None):
+        '''
+        Generator of events starting at the given offset.  If channels is
+        given, only events on those channels are yielded.
+        '''
+        if channels is not None:
+            channels = set(channels)
+
+        while True:
+            event = self.readEventAt(offset)
+            if event is None:
+                break
+            offset = event.nextOffset
+            if channels is None or event.channel in channels:
+                yield event
+
+    def __iter__(self):
+        return self.iterEvents()
+
+    def buildIndex(self):
+        '''
+        Scan new events and append their offsets and timestamps to the index.
+        Only the part of the file that has not been indexed yet is scanned.
+        '''
+        self.refresh()
+        for event in self.iterEvents(self._indexEnd):
+            self._indexOffsets.append(event.offset)
+            self._indexUtimes.append(event.timestamp)
+            self._indexEnd = event.nextOffset
+
+    def getIndex(self):
+        '''
+        Returns the (offsets, utimes) lists of the index.
+        '''
+        self.buildIndex()
+        return self._indexOffsets, self._indexUtimes
+
+    def getNumberOfEvents(self):
+        self.buildIndex()
+        return len(self._indexOffsets)
+
+    def getUtimeRange(self):
+        self.buildIndex()
+        if not self._indexUtimes:
+            return None
+        return self._indexUtimes[0], self._indexUtimes[-1]
+
+    def findOffsetByUtime(self, utime):
+        '''
+        Returns the offset of the first event with a timestamp greater than
+        or equal to utime, or None if there is no such event.  Event
+        timestamps are assumed to be non-decreasing in the log.
+        '''
+        self.buildIndex()
+        index = bisect.bisect_left(self._indexUtimes, utime)
+        if index == len(self._indexUtimes):
+            return None
+        return self._indexOffsets[index]
+
+    def seekToUtime(self, utime):
+        '''
+        Seek to the first event with timestamp >= utime.  Returns False if
+        there is no such event.
+        '''
+        offset = self.findOffsetByUtime(utime)
+        if offset is None:
+            return False
+        self.seek(offset)
+        return True
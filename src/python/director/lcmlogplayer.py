@@ -0,0 +1,233 @@
+'''
+An in-process LCM log player.
+
+Unlike lcmUtils.LogPlayerCommander, which sends UDP commands to an external
+lcm-logplayer process, LogPlayer reads the log with lcmlog.MappedEventLog and
+publishes events from a background thread on an LCM handle owned by this
+process.  The utime index of the log is used to seek, so playback can be
+started from any utime, and events are paced against the wall clock at a
+configurable playback speed.
+
+Usage:
+
+    player = LogPlayer(filename)
+    player.setChannelFilter('EST_ROBOT_STATE|CAMERA.*')
+    player.setChannelRemap({'CAMERA': 'CAMERA_REPLAY'})
+    player.seekToUtime(utime)
+    player.setSpeed(0.5)
+    player.play()
+'''
+
+import re
+import bisect
+import time
+import threading
+
+from director import lcmlog
+
+
+class LogPlayer(object):
+
+    def __init__(self, filename, lcmHandle=None):
+        self.log = lcmlog.MappedEventLog(filename)
+        if lcmHandle is None:
+            # imported here so that the player can be used with another
+            # handle in a build without lcm
+            from director import lcmUtils
+            lcmHandle = lcmUtils.getGlobalLCM()
+        self.lc = lcmHandle
+        self.offsets, self.utimes = self.log.getIndex()
+
+        # speed is the playback rate relative to real time.  A speed <= 0
+        # publishes events as fast as possible.
+        self.speed = 1.0
+        self.loop = False
+
+        # if not None, gaps between events longer than this many seconds of
+        # log time are skipped instead of waited for.
+        self.maxGap = None
+
+        self.channelRegex = None
+        self.channelRemap = {}
+        self._channelCache = {}
+
+        self.thread = None
+        self.shouldStop = False
+        self.lock = threading.Lock()
+        self._index = 0
+        self._clockReset = True
+        self._clockUtime = 0
+        self._clockTime = 0.0
+
+        self.publishedCount = 0
+        self.maxLateness = 0.0
+
+    def close(self):
+        self.pause()
+        self.log.close()
+
+    def getUtimeRange(self):
+        if not self.utimes:
+            return None
+        return self.utimes[0], self.utimes[-1]
+
+    def getCurrentUtime(self):
+        index = min(self._index, len(self.utimes) - 1)
+        return self.utimes[index] if index >= 0 else None
+
+    def updateIndex(self):
+        '''
+        Extend the index if the log file has grown.
+        '''
+        with self.lock:
+            self.offsets, self.utimes = self.log.getIndex()
+
+    def setChannelFilter(self, channelRegex):
+        '''
+        Only publish channels that fully match the regular expression.  Pass
+        None to publish all channels.
+        '''
+        with self.lock:
+            self.channelRegex = re.compile('(?:%s)$' % channelRegex) if channelRegex else None
+            self._channelCache = {}
+
+    def setChannelRemap(self, channelRemap):
+        '''
+        Set a dict of {logChannel: publishChannel} used to rename channels
+        when they are published.
+        '''
+        with self.lock:
+            self.channelRemap = dict(channelRemap)
+            self._channelCache = {}
+
+    def _getPublishChannel(self, channel):
+        '''
+        Returns the channel name to publish on, or None if the channel is
+        filtered.  Results are cached per channel.
+        '''
+        try:
+            return self._channelCache[channel]
+        except KeyError:
+            if self.channelRegex and not self.channelRegex.match(channel):
+                publishChannel = None
+            else:
+                publishChannel = self.channelRemap.get(channel, channel)
+            self._channelCache[channel] = publishChannel
+            return publishChannel
+
+    def setSpeed(self, speed):
+        with self.lock:
+            self.speed = speed
+            self._clockReset = True
+
+    def seekToUtime(self, utime):
+        with self.lock:
+            self._index = bisect.bisect_left(self.utimes, utime)
+            self._clockReset = True
+
+    def seekToIndex(self, index):
+        with self.lock:
+            self._index = max(0, min(index, len(self.utimes)))
+            self._clockReset = True
+
+    def isPlaying(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def play(self):
+        if self.isPlaying():
+            return
+        self.shouldStop = False
+        self._clockReset = True
+        self.thread = threading.Thread(target=self.mainLoop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def pause(self):
+        if self.thread is None:
+            return
+        self.shouldStop = True
+        self.thread.join()
+        self.thread = None
+
+    def togglePlay(self):
+        if self.isPlaying():
+            self.pause()
+        else:
+            self.play()
+
+    def step(self):
+        '''
+        Publish the next event that passes the channel filter.  Returns the
+        event, or None at the end of the log.
+        '''
+        with self.lock:
+            while self._index < len(self.offsets):
+                event = self.log.readEventAt(self.offsets[self._index])
+                self._index += 1
+                if self._publish(event):
+                    return event
+        return None
+
+    def resetStatistics(self):
+        self.publishedCount = 0
+        self.maxLateness = 0.0
+
+    def _publish(self, event):
+        channel = self._getPublishChannel(event.channel)
+        if channel is None:
+            return False
+        self.lc.publish(channel, str(event.data))
+        self.publishedCount += 1
+        return True
+
+    def _resetClock(self, utime):
+        self._clockUtime = utime
+        self._clockTime = time.time()
+        self._clockReset = False
+
+    def _getWaitTime(self, utime):
+        '''
+        Returns the number of seconds to wait before publishing an event
+        with the given utime.
+        '''
+        if self.speed <= 0:
+            return 0.0
+
+        if self.maxGap is not None and self._index > 0:
+            gap = (utime - self.utimes[self._index - 1])*1e-6
+            if gap > self.maxGap:
+                self._resetClock(utime)
+
+        logElapsed = (utime - self._clockUtime)*1e-6
+        return self._clockTime + logElapsed/self.speed - time.time()
+
+    def mainLoop(self):
+
+        while not self.shouldStop:
+
+            with self.lock:
+
+                if self._index >= len(self.offsets):
+                    if self.loop and self.offsets:
+                        self._index = 0
+                        self._clockReset = True
+                        continue
+                    break
+
+                utime = self.utimes[self._index]
+                if self._clockReset:
+                    self._resetClock(utime)
+
+                waitTime = self._getWaitTime(utime)
+
+                if waitTime <= 0:
+                    self.maxLateness = max(self.maxLateness, -waitTime)
+                    event = self.log.readEventAt(self.offsets[self._index])
+                    self._index += 1
+                    self._publish(event)
+                    continue
+
+            # sleep in short steps so that pause, seek and speed changes
+            # are handled promptly. time.sleep is used rather than waiting
+            # on a threading.Event because it is more accurate.
+            time.sleep(min(waitTime, 0.01))
@@ -6,6 +6,8 @@ import time
 import math
 import random
 
+from director import lcmlog
+
 
 messageTypes = {}
 messageTypeToModule = {}
@@ -161,13 +163,14 @@ def printLCMCatalog():
 
 def printLogFileDescription(filename):
 
-    log = lcm.EventLog(filename, 'r')
+    log = lcmlog.MappedEventLog(filename)
 
     print 'reading %s' % filename
     print 'log file size: %.2f MB' % (log.size()/(1024.0**2))
 
     for event in log:
-        onLCMMessage(event.channel, event.data)
+        if event.channel not in lcmCatalog:
+            onLCMMessage(event.channel, str(event.data))
 
     log.close()
 
@@ -0,0 +1,424 @@
+'''
+Live per-channel LCM traffic statistics.
+
+TrafficMonitor subscribes to all channels on its own LCM handle and handles
+messages in a background thread.  For each channel it keeps the receive
+times, message sizes and utime latencies that fall inside a sliding time
+window and computes the message rate, bandwidth, size distribution,
+inter-arrival jitter and latency from them.
+
+The statistics can be printed as a console table, shown in a dock panel
+with TrafficMonitorPanel, or exported to csv or json.
+
+Run as a script to print the table to the console:
+
+    directorPython -m director.lcmtrafficmonitor [channel regex]
+'''
+
+import sys
+import time
+import json
+import select
+import threading
+from collections import deque, OrderedDict
+
+import lcm
+import numpy as np
+
+from director import lcmspy
+
+try:
+    from PythonQt import QtGui
+    from director import applogic as app
+    from director.timercallback import TimerCallback
+    USE_QT = True
+except ImportError:
+    USE_QT = False
+
+
+summaryFields = OrderedDict([
+    ('channel', 'channel'),
+    ('type', 'type'),
+    ('count', 'count'),
+    ('rate', 'rate (Hz)'),
+    ('bandwidth', 'bandwidth (kB/s)'),
+    ('sizeMin', 'size min'),
+    ('sizeMean', 'size mean'),
+    ('sizeMax', 'size max'),
+    ('jitter', 'jitter (ms)'),
+    ('latencyMean', 'latency mean (ms)'),
+    ('latencyMax', 'latency max (ms)'),
+    ])
+
+
+class ChannelStatistics(object):
+    '''
+    Sliding window statistics for a single channel.  Times are in seconds.
+    '''
+
+    def __init__(self, channel, windowDuration):
+        self.channel = channel
+        self.messageType = None
+        self.windowDuration = windowDuration
+        self.totalMessages = 0
+        self.totalBytes = 0
+        self.firstReceiveTime = None
+        self.lastLatencySampleTime = 0.0
+        self.receiveTimes = deque()
+        self.sizes = deque()
+        self.latencyTimes = deque()
+        self.latencies = deque()
+
+    def addMessage(self, receiveTime, size):
+        if self.firstReceiveTime is None:
+            self.firstReceiveTime = receiveTime
+        self.totalMessages += 1
+        self.totalBytes += size
+        self.receiveTimes.append(receiveTime)
+        self.sizes.append(size)
+
+    def addLatency(self, receiveTime, latency):
+        self.lastLatencySampleTime = receiveTime
+        self.latencyTimes.append(receiveTime)
+        self.latencies.append(latency)
+
+    def prune(self, now):
+        startTime = now - self.windowDuration
+
+        receiveTimes = self.receiveTimes
+        sizes = self.sizes
+        while receiveTimes and receiveTimes[0] < startTime:
+            receiveTimes.popleft()
+            sizes.popleft()
+
+        latencyTimes = self.latencyTimes
+        latencies = self.latencies
+        while latencyTimes and latencyTimes[0] < startTime:
+            latencyTimes.popleft()
+            latencies.popleft()
+
+    def getSummary(self, now):
+
+        self.prune(now)
+
+        summary = dict.fromkeys(summaryFields.keys(), None)
+        summary['channel'] = self.channel
+        summary['type'] = self.messageType or '<unknown msg type>'
+        summary['count'] = len(self.receiveTimes)
+        summary['totalMessages'] = self.totalMessages
+        summary['totalBytes'] = self.totalBytes
+
+        if not self.receiveTimes:
+            summary['rate'] = 0.0
+            summary['bandwidth'] = 0.0
+            return summary
+
+        sizes = np.array(self.sizes, dtype=float)
+
+        # until the window has filled, rates are computed over the time
+        # since the first message so that they are not underestimated
+        duration = min(self.windowDuration, now - self.firstReceiveTime)
+        if duration > 0:
+            summary['rate'] = len(sizes) / duration
+            summary['bandwidth'] = sizes.sum() / duration / 1024.0
+        summary['sizeMin'] = int(sizes.min())
+        summary['sizeMean'] = sizes.mean()
+        summary['sizeMax'] = int(sizes.max())
+
+        if len(self.receiveTimes) > 2:
+            intervals = np.diff(np.array(self.receiveTimes))
+            summary['jitter'] = intervals.std() * 1e3
+
+        if self.latencies:
+            latencies = np.array(self.latencies)
+            summary['latencyMean'] = latencies.mean() * 1e3
+            summary['latencyMax'] = latencies.max() * 1e3
+
+        return summary
+
+
+class TrafficMonitor(object):
+    '''
+    Collects ChannelStatistics for all channels matching channelRegex.
+
+    Latency is measured as the receive time minus the utime field of the
+    decoded message.  Decoding is only done for messages whose type is known
+    to lcmspy and at most once per latencySampleInterval per channel, so the
+    cost of monitoring high rate channels stays low.  Latency is only
+    meaningful when the publisher and the monitor share a clock.
+    '''
+
+    def __init__(self, channelRegex='.*', windowDuration=5.0, lcmUrl=None):
+        self.channelRegex = channelRegex
+        self.windowDuration = windowDuration
+        self.latencyEnabled = True
+        self.latencySampleInterval = 0.1
+        self.lc = lcm.LCM(lcmUrl) if lcmUrl else lcm.LCM()
+        self.subscription = None
+        self.thread = None
+        self.shouldStop = False
+        self.lock = threading.Lock()
+        self.channels = {}
+
+    def start(self):
+        if self.thread:
+            return
+        self.shouldStop = False
+        self.subscription = self.lc.subscribe(self.channelRegex, self.onMessage)
+        self.thread = threading.Thread(target=self.mainLoop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        if not self.thread:
+            return
+        self.shouldStop = True
+        self.thread.join()
+        self.thread = None
+        self.lc.unsubscribe(self.subscription)
+        self.subscription = None
+
+    def isRunning(self):
+        return self.thread is not None
+
+    def mainLoop(self):
+        poll = select.poll()
+        poll.register(self.lc.fileno())
+        while not self.shouldStop:
+            if poll.poll(100):
+                self.lc.handle()
+
+    def reset(self):
+        with self.lock:
+            self.channels = {}
+
+    def setWindowDuration(self, windowDuration):
+        with self.lock:
+            self.windowDuration = windowDuration
+            for stats in self.channels.itervalues():
+                stats.windowDuration = windowDuration
+
+    def _getChannelStatistics(self, channel, messageData):
+        stats = self.channels.get(channel)
+        if stats is None:
+            stats = ChannelStatistics(channel, self.windowDuration)
+            messageClass = lcmspy.getMessageClass(messageData)
+            if messageClass is not None:
+                stats.messageType = lcmspy.getMessageTypeFullName(messageClass)
+            self.channels[channel] = stats
+        return stats
+
+    def onMessage(self, channel, messageData):
+
+        receiveTime = time.time()
+
+        with self.lock:
+            stats = self._getChannelStatistics(channel, messageData)
+            stats.addMessage(receiveTime, len(messageData))
+
+            if (self.latencyEnabled and stats.messageType is not None
+                and receiveTime - stats.lastLatencySampleTime > self.latencySampleInterval):
+                latency = self._computeLatency(receiveTime, messageData)
+                if latency is not None:
+                    stats.addLatency(receiveTime, latency)
+                else:
+                    stats.lastLatencySampleTime = receiveTime
+
+    @staticmethod
+    def _computeLatency(receiveTime, messageData):
+        try:
+            msg = lcmspy.decodeMessage(messageData)
+        except Exception:
+            return None
+        utime = getattr(msg, 'utime', None)
+        if not isinstance(utime, (int, long)) or utime <= 0:
+            return None
+        return receiveTime - utime*1e-6
+
+    def getStatistics(self, sortBy='bandwidth'):
+        '''
+        Returns a list of summary dicts, one per channel, sorted in
+        decreasing order of the sortBy field.
+        '''
+        now = time.time()
+        with self.lock:
+            summaries = [stats.getSummary(now) for stats in self.channels.values()]
+        summaries.sort(key=lambda x: x[sortBy], reverse=True)
+        return summaries
+
+    @staticmethod
+    def formatValue(value):
+        if value is None:
+            return '-'
+        elif isinstance(value, float):
+            return '%.2f' % value
+        return str(value)
+
+    def formatTable(self, summaries=None):
+        if summaries is None:
+            summaries = self.getStatistics()
+
+        rows = [summaryFields.values()]
+        for summary in summaries:
+            rows.append([self.formatValue(summary[field]) for field in summaryFields.keys()])
+
+        widths = [max(len(row[i]) for row in rows) for i in xrange(len(summaryFields))]
+        lines = ['  '.join(value.ljust(width) for value, width in zip(row, widths)) for row in rows]
+        lines.insert(1, '  '.join('-'*width for width in widths))
+        return '\n'.join(lines)
+
+    def printTable(self):
+        print self.formatTable()
+
+    def exportCSV(self, filename):
+        fields = summaryFields.keys() + ['totalMessages', 'totalBytes']
+        with open(filename, 'w') as f:
+            f.write(','.join(fields) + '\n')
+            for summary in self.getStatistics():
+                f.write(','.join(['' if summary[field] is None else str(summary[field]) for field in fields]) + '\n')
+
+    def exportJSON(self, filename):
+        data = dict(utime=int(time.time()*1e6), windowDuration=self.windowDuration, channels=self.getStatistics())
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def export(self, filename):
+        if filename.endswith('.json'):
+            self.exportJSON(filename)
+        else:
+            self.exportCSV(filename)
+
+
+class TrafficMonitorPanel(object):
+    '''
+    A table widget that shows the statistics of a TrafficMonitor.  The table
+    is refreshed from the GUI thread by a timer, the monitor continues to
+    collect statistics in its own thread.
+
+    If monitor is None, the LCM types are searched for and the monitor is
+    created the first time the panel is started, so that a panel that is
+    never shown costs no LCM handle or module scan.
+    '''
+
+    def __init__(self, monitor=None):
+
+        self.monitor = monitor
+        self.items = {}
+
+        self.widget = QtGui.QWidget()
+        self.widget.setWindowTitle('LCM Traffic')
+
+        self.table = QtGui.QTableWidget()
+        self.table.setColumnCount(len(summaryFields))
+        self.table.setHorizontalHeaderLabels(summaryFields.values())
+        self.table.verticalHeader().setVisible(False)
+
+        self.startButton = QtGui.QPushButton('Pause' if self.isRunning() else 'Start')
+        self.startButton.connect('clicked()', self.onStartStop)
+        self.resetButton = QtGui.QPushButton('Reset')
+        self.resetButton.connect('clicked()', self.onReset)
+        self.exportButton = QtGui.QPushButton('Export...')
+        self.exportButton.connect('clicked()', self.onExport)
+
+        buttons = QtGui.QHBoxLayout()
+        buttons.addWidget(self.startButton)
+        buttons.addWidget(self.resetButton)
+        buttons.addWidget(self.exportButton)
+        buttons.addStretch()
+
+        layout = QtGui.QVBoxLayout(self.widget)
+        layout.addLayout(buttons)
+        layout.addWidget(self.table)
+
+        self.timer = TimerCallback(targetFps=1)
+        self.timer.callback = self.updateTable
+        self.timer.start()
+
+    def item(self, row, column):
+        rowDict = self.items.setdefault(row, {})
+        try:
+            return rowDict[column]
+        except KeyError:
+            i = QtGui.QTableWidgetItem('')
+            self.table.setItem(row, column, i)
+            rowDict[column] = i
+            return i
+
+    def updateTable(self):
+        if self.monitor is None:
+            return
+        summaries = self.monitor.getStatistics()
+        self.table.setRowCount(len(summaries))
+        for row, summary in enumerate(summaries):
+            for column, field in enumerate(summaryFields.keys()):
+                self.item(row, column).setText(self.monitor.formatValue(summary[field]))
+
+    def createMonitor(self):
+        lcmspy.findLCMModulesInSysPath()
+        self.monitor = TrafficMonitor()
+
+    def isRunning(self):
+        return self.monitor is not None and self.monitor.isRunning()
+
+    def setRunning(self, running):
+        if running:
+            if self.monitor is None:
+                self.createMonitor()
+            self.monitor.start()
+        elif self.monitor is not None:
+            self.monitor.stop()
+        self.startButton.text = 'Pause' if running else 'Start'
+
+    def onStartStop(self):
+        self.setRunning(not self.isRunning())
+
+    def onReset(self):
+        if self.monitor is not None:
+            self.monitor.reset()
+
+    def onExport(self):
+        if self.monitor is None:
+            return
+        filename = QtGui.QFileDialog.getSaveFileName(app.getMainWindow(), 'Export LCM Traffic Statistics...', '', 'CSV (*.csv);;JSON (*.json)')
+        if filename:
+            self.monitor.export(filename)
+
+
+def init():
+
+    global panel
+    global dock
+
+    panel = TrafficMonitorPanel()
+
+    # the monitor subscribes to every channel, so it is created the first
+    # time the panel is shown and only runs while the panel is shown
+    dock = app.addWidgetToDock(panel.widget, action=None)
+    dock.connect('visibilityChanged(bool)', panel.setRunning)
+    dock.hide()
+
+    return panel
+
+
+def main():
+
+    channelRegex = sys.argv[1] if len(sys.argv) > 1 else '.*'
+
+    lcmspy.findLCMModulesInSysPath()
+
+    monitor = TrafficMonitor(channelRegex)
+    monitor.start()
+
+    try:
+        while True:
+            time.sleep(1.0)
+            print
+            monitor.printTable()
+    except KeyboardInterrupt:
+        pass
+
+    monitor.stop()
+
+
+if __name__ == '__main__':
+    main()
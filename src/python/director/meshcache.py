@@ -0,0 +1,351 @@
+'''
+A cache of processed mesh geometry and textures.
+
+Loading a mesh file for display means reading it from disk, applying the
+mesh scale and computing normals.  loadMeshes() caches the result of these
+steps in memory, keyed by the absolute file name, the modification time and
+size of the file and the scale, so a mesh is only processed again when its
+file changes.  Returned polyData objects are shallow copies of the cached
+data and may be transformed or modified without affecting the cache, but
+their arrays are shared and must not be modified in place.
+
+The memory cache evicts the least recently used meshes when it grows past
+maxSize entries.  If a cache directory is set, with setCacheDirectory() or
+the DIRECTOR_MESH_CACHE_DIR environment variable, processed meshes are also
+written to that directory as binary vtp files, so they survive restarts of
+the application.
+
+loadTexture() caches vtkTexture objects in the same way.
+
+MeshLoader loads a list of meshes into the cache with a pool of worker
+threads, so that the meshes of a robot model can be read and processed
+before the model is assembled on the GUI thread.
+'''
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import director.vtkAll as vtk
+from director import ioUtils
+from director import filterUtils
+from director.shallowCopy import shallowCopy
+
+
+class LRUCache(object):
+    '''
+    A dict-like container that holds at most maxSize items.  When a new
+    item is added to a full cache the least recently used item is removed.
+    Lookups with get() or [] mark an item as recently used.
+    '''
+
+    def __init__(self, maxSize=128):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getitem__(self, key):
+        value = self._items.pop(key)
+        self._items[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+        while len(self._items) > max(self.maxSize, 0):
+            self._items.popitem(last=False)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def pop(self, key, default=None):
+        return self._items.pop(key, default)
+
+    def keys(self):
+        return self._items.keys()
+
+    def clear(self):
+        self._items.clear()
+
+    def setMaxSize(self, maxSize):
+        self.maxSize = maxSize
+        while len(self._items) > max(self.maxSize, 0):
+            self._items.popitem(last=False)
+
+    def getStatistics(self):
+        return dict(size=len(self._items), maxSize=self.maxSize, hits=self.hits, misses=self.misses)
+
+
+_meshes = LRUCache(maxSize=256)
+_textures = LRUCache(maxSize=64)
+_lock = threading.RLock()
+_cacheDirectory = os.environ.get('DIRECTOR_MESH_CACHE_DIR') or None
+
+
+def setCacheDirectory(directory):
+    '''
+    Set the directory of the on-disk mesh store, or None to disable it.
+    '''
+    global _cacheDirectory
+    _cacheDirectory = directory
+
+
+def getCacheDirectory():
+    return _cacheDirectory
+
+
+def setMaxSize(maxMeshes, maxTextures=None):
+    _meshes.setMaxSize(maxMeshes)
+    if maxTextures is not None:
+        _textures.setMaxSize(maxTextures)
+
+
+def clear():
+    '''
+    Clear the memory caches.  Files in the cache directory are kept.
+    '''
+    _meshes.clear()
+    _textures.clear()
+
+
+def getStatistics():
+    return dict(meshes=_meshes.getStatistics(), textures=_textures.getStatistics())
+
+
+def normalizeScale(scale):
+    '''
+    Returns scale as a tuple of three floats.  scale may be None, a number,
+    or a sequence of one or three numbers.
+    '''
+    if scale is None:
+        return (1.0, 1.0, 1.0)
+    if isinstance(scale, (int, float)):
+        return (float(scale),)*3
+    scale = [float(x) for x in scale]
+    if len(scale) == 1:
+        return (scale[0],)*3
+    if len(scale) == 3:
+        return tuple(scale)
+    return (1.0, 1.0, 1.0)
+
+
+def getFileKey(filename):
+    '''
+    Returns a key that identifies the current contents of a file, or None if
+    the file does not exist.
+    '''
+    filename = os.path.abspath(filename)
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (filename, stat.st_mtime, stat.st_size)
+
+
+def _getDiskFileName(key, index=None):
+    digest = hashlib.sha1(repr(key)).hexdigest()
+    if index is None:
+        return os.path.join(_cacheDirectory, digest + '.txt')
+    return os.path.join(_cacheDirectory, '%s_%d.vtp' % (digest, index))
+
+
+def _readFromDisk(key):
+    '''
+    Returns the list of cached polyData for key, or None if the disk store
+    is disabled or does not have the key.  The manifest file lists the
+    number of blocks and is written after the blocks, so a partially
+    written entry is never read.
+    '''
+    if not _cacheDirectory:
+        return None
+
+    manifest = _getDiskFileName(key)
+    try:
+        with open(manifest) as f:
+            numberOfBlocks = int(f.read())
+    except (IOError, ValueError):
+        return None
+
+    polyDataList = []
+    for i in xrange(numberOfBlocks):
+        blockFile = _getDiskFileName(key, i)
+        if not os.path.isfile(blockFile):
+            return None
+        polyDataList.append(ioUtils.readPolyData(blockFile))
+    return polyDataList
+
+
+def _writeToDisk(key, polyDataList):
+    if not _cacheDirectory:
+        return
+
+    try:
+        if not os.path.isdir(_cacheDirectory):
+            os.makedirs(_cacheDirectory)
+
+        for i, polyData in enumerate(polyDataList):
+            writer = vtk.vtkXMLPolyDataWriter()
+            writer.SetDataModeToAppended()
+            writer.EncodeAppendedDataOff()
+            writer.SetCompressor(None)
+            writer.SetFileName(_getDiskFileName(key, i))
+            writer.SetInput(polyData)
+            writer.Write()
+
+        manifest = _getDiskFileName(key)
+        with open(manifest + '.tmp', 'w') as f:
+            f.write(str(len(polyDataList)))
+        os.rename(manifest + '.tmp', manifest)
+
+    except (IOError, OSError) as e:
+        print 'failed to write mesh cache entry to %s: %s' % (_cacheDirectory, e)
+
+
+def _processMeshes(filename, scale):
+    if filename.endswith('vtm'):
+        polyDataList = ioUtils.readMultiBlock(filename)
+    else:
+        polyDataList = [ioUtils.readPolyData(filename)]
+
+    if scale != (1.0, 1.0, 1.0):
+        t = vtk.vtkTransform()
+        t.Scale(scale)
+        polyDataList = [filterUtils.transformPolyData(polyData, t) for polyData in polyDataList]
+
+    return [polyData if polyData.GetPointData().GetNormals() else filterUtils.computeNormals(polyData)
+                for polyData in polyDataList]
+
+
+def isCached(filename, scale=None):
+    '''
+    Returns True if the mesh is in the memory cache.
+    '''
+    fileKey = getFileKey(filename)
+    if fileKey is None:
+        return False
+    with _lock:
+        return fileKey + (normalizeScale(scale),) in _meshes
+
+
+def loadMeshes(filename, scale=None):
+    '''
+    Returns a list of polyData for the mesh file, scaled by scale and with
+    point normals.  A .vtm file may contain several meshes, other file types
+    contain a single mesh.
+    '''
+    scale = normalizeScale(scale)
+    fileKey = getFileKey(filename)
+    if fileKey is None:
+        raise IOError('mesh file not found: %s' % filename)
+
+    key = fileKey + (scale,)
+    with _lock:
+        polyDataList = _meshes.get(key)
+
+    # meshes are processed without holding the lock so that worker threads
+    # of a MeshLoader can process different meshes at the same time.
+    if polyDataList is None:
+        polyDataList = _readFromDisk(key)
+        if polyDataList is None:
+            polyDataList = _processMeshes(filename, scale)
+            _writeToDisk(key, polyDataList)
+        with _lock:
+            _meshes[key] = polyDataList
+
+    return [shallowCopy(polyData) for polyData in polyDataList]
+
+
+def loadTexture(imageFile):
+    '''
+    Returns a vtkTexture for the image file, or None if the image cannot be
+    read.
+    '''
+    key = getFileKey(imageFile)
+    if key is None:
+        return None
+
+    with _lock:
+        texture = _textures.get(key)
+    if texture is not None:
+        return texture
+
+    image = ioUtils.readImage(imageFile)
+    if not image or not image.GetNumberOfPoints():
+        return None
+
+    texture = vtk.vtkTexture()
+    texture.SetInput(image)
+    texture.EdgeClampOn()
+    texture.RepeatOn()
+
+    with _lock:
+        _textures[key] = texture
+    return texture
+
+
+class MeshLoader(object):
+    '''
+    Loads meshes into the cache with a pool of worker threads.  requests is
+    a list of (filename, scale) pairs, requests for meshes that are already
+    in the memory cache are skipped.  Loading starts when the MeshLoader
+    is constructed, use isFinished() or wait() to find out when it is done.
+    After that, loadMeshes() returns the loaded meshes from the cache.
+
+    Whether the workers process meshes in parallel depends on the VTK
+    build, the VTK Python wrappers must release the GIL during VTK calls.
+    '''
+
+    def __init__(self, requests, numberOfThreads=4):
+        self.requests = []
+        for filename, scale in requests:
+            request = (filename, normalizeScale(scale))
+            if request not in self.requests and not isCached(*request):
+                self.requests.append(request)
+
+        self.completed = 0
+        self.errors = {}
+        self._pool = None
+        self._result = None
+
+        if self.requests:
+            self._pool = ThreadPool(min(numberOfThreads, len(self.requests)))
+            self._result = self._pool.map_async(self._load, self.requests)
+            self._pool.close()
+
+    def _load(self, request):
+        try:
+            loadMeshes(*request)
+        except Exception as e:
+            self.errors[request] = e
+        finally:
+            with _lock:
+                self.completed += 1
+
+    def getProgress(self):
+        '''
+        Returns the number of completed requests and the total number of
+        requests.
+        '''
+        return self.completed, len(self.requests)
+
+    def isFinished(self):
+        return self._result is None or self._result.ready()
+
+    def wait(self):
+        if self._pool is not None:
+            self._pool.join()
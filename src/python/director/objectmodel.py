@@ -1,4 +1,5 @@
 import os
+from contextlib import contextmanager
 import PythonQt
 from PythonQt import QtCore, QtGui
 from director.propertyset import PropertySet, PropertyAttributes, PropertyPanelHelper
@@ -81,6 +82,14 @@ class ObjectModelItem(object):
     def setProperty(self, propertyName, propertyValue):
         self.properties.setProperty(propertyName, propertyValue)
 
+    def batchChanges(self):
+        '''
+        Returns a context manager that defers the property changed
+        notifications of this object and the view renders requested with
+        renderViews() until the end of the block.  See batchChanges().
+        '''
+        return batchChanges([self])
+
     def getPropertyAttribute(self, propertyName, propertyAttribute):
         return self.properties.getPropertyAttribute(propertyName, propertyAttribute)
 
@@ -180,7 +189,12 @@ class ObjectModelTree(object):
         self._treeWidget = None
         self._propertiesPanel = None
         self._objects = {}
+        self._itemsByObject = {}
+        self._objectNames = {}
+        self._objectsByName = {}
         self._blockSignals = False
+        self._bulkUpdateDepth = 0
+        self._pendingAddedObjects = []
         self.actions = []
         self.callbacks = callbacks.CallbackRegistry([
                             self.ACTION_SELECTED,
@@ -227,29 +241,69 @@ class ObjectModelTree(object):
     def getObjects(self):
         return self._objects.values()
 
+    def hasObject(self, obj):
+        return obj in self._itemsByObject
+
     def _getSelectedItem(self):
         items = self.getTreeWidget().selectedItems()
         return items[0] if len(items) == 1 else None
 
     def _getItemForObject(self, obj):
-        for item, itemObj in self._objects.iteritems():
-            if itemObj == obj:
-                return item
+        return self._itemsByObject.get(obj)
 
     def _getObjectForItem(self, item):
         return self._objects[item]
 
+    def _addObjectIndex(self, obj, item):
+        name = obj.getProperty('Name')
+        self._objects[item] = obj
+        self._itemsByObject[obj] = item
+        self._objectNames[obj] = name
+        self._objectsByName.setdefault(name, []).append(obj)
+
+    def _removeObjectIndex(self, obj, item):
+        del self._objects[item]
+        del self._itemsByObject[obj]
+        self._removeObjectName(obj, self._objectNames.pop(obj))
+
+    def _removeObjectName(self, obj, name):
+        objs = self._objectsByName[name]
+        objs.remove(obj)
+        if not objs:
+            del self._objectsByName[name]
+
+    def _updateObjectNameIndex(self, obj):
+        name = obj.getProperty('Name')
+        oldName = self._objectNames[obj]
+        if name != oldName:
+            self._removeObjectName(obj, oldName)
+            self._objectNames[obj] = name
+            self._objectsByName.setdefault(name, []).append(obj)
+
     def findObjectByName(self, name, parent=None):
         if parent:
             return self.findChildByName(parent, name)
-        for obj in self._objects.values():
-            if obj.getProperty('Name') == name:
-                return obj
+        objs = self._objectsByName.get(name)
+        if objs:
+            return objs[0]
+
+    def findObjectsByName(self, name):
+        return list(self._objectsByName.get(name, []))
 
     def findChildByName(self, parent, name):
-        for child in self.getObjectChildren(parent):
-            if child.getProperty('Name') == name:
-                return child
+        objs = self._objectsByName.get(name, [])
+        item = self._getItemForObject(parent)
+
+        # walk whichever is shorter, the objects with this name or the
+        # children of the parent
+        if item is None or len(objs) < item.childCount():
+            for obj in objs:
+                if self.getObjectParent(obj) is parent:
+                    return obj
+        else:
+            for child in self.getObjectChildren(parent):
+                if child.getProperty('Name') == name:
+                    return child
 
     def onPropertyChanged(self, prop):
 
@@ -292,6 +346,7 @@ class ObjectModelTree(object):
 
     def updateObjectName(self, obj):
         item = self._getItemForObject(obj)
+        self._updateObjectNameIndex(obj)
         item.setText(0, obj.getProperty('Name'))
 
     def _onPropertyValueChanged(self, obj, propertyName):
@@ -336,7 +391,7 @@ class ObjectModelTree(object):
             tree = self.getTreeWidget()
             tree.takeTopLevelItem(tree.indexOfTopLevelItem(item))
 
-        del self._objects[item]
+        self._removeObjectIndex(obj, item)
 
 
     def removeFromObjectModel(self, obj):
@@ -345,7 +400,63 @@ class ObjectModelTree(object):
 
         item = self._getItemForObject(obj)
         if item:
-            self._removeItemFromObjectModel(item)
+            if item.childCount():
+                with self.bulkUpdate():
+                    self._removeItemFromObjectModel(item)
+            else:
+                self._removeItemFromObjectModel(item)
+
+    def removeObjects(self, objs):
+        '''
+        Remove many objects with a single tree widget update.
+        '''
+        with self.bulkUpdate():
+            for obj in objs:
+                self.removeFromObjectModel(obj)
+
+    def removeChildren(self, obj):
+        self.removeObjects(self.getObjectChildren(obj))
+
+    @contextmanager
+    def bulkUpdate(self):
+        '''
+        Context manager for adding or removing many objects.  Inside the
+        block the tree widget does not repaint or emit signals, the
+        OBJECT_ADDED signal is deferred and view renders requested through
+        renderViews() are coalesced.  When the outermost block exits the
+        tree widget is refreshed once, OBJECT_ADDED is emitted for each
+        added object that is still in the model, and SELECTION_CHANGED is
+        emitted if the active object was removed.
+        '''
+        if self._bulkUpdateDepth:
+            self._bulkUpdateDepth += 1
+            try:
+                yield
+            finally:
+                self._bulkUpdateDepth -= 1
+            return
+
+        tree = self.getTreeWidget()
+        activeObj = self.getActiveObject()
+        tree.setUpdatesEnabled(False)
+        signalsBlocked = tree.blockSignals(True)
+        self._bulkUpdateDepth = 1
+
+        with batchChanges():
+            try:
+                yield
+            finally:
+                self._bulkUpdateDepth = 0
+                tree.blockSignals(signalsBlocked)
+                tree.setUpdatesEnabled(True)
+
+                addedObjects, self._pendingAddedObjects = self._pendingAddedObjects, []
+                for obj in addedObjects:
+                    if obj._tree is self:
+                        self.callbacks.process(self.OBJECT_ADDED, self, obj)
+
+                if self.getActiveObject() is not activeObj:
+                    self._onTreeSelectionChanged()
 
 
     def addToObjectModel(self, obj, parentObj=None):
@@ -359,7 +470,7 @@ class ObjectModelTree(object):
 
         obj._tree = self
 
-        self._objects[item] = obj
+        self._addObjectIndex(obj, item)
         self.updateVisIcon(obj)
 
         if parentItem is None:
@@ -367,7 +478,10 @@ class ObjectModelTree(object):
             tree.addTopLevelItem(item)
             tree.expandItem(item)
 
-        self.callbacks.process(self.OBJECT_ADDED, self, obj)
+        if self._bulkUpdateDepth:
+            self._pendingAddedObjects.append(obj)
+        else:
+            self.callbacks.process(self.OBJECT_ADDED, self, obj)
 
 
     def collapse(self, obj):
@@ -454,10 +568,11 @@ class ObjectModelTree(object):
 
 
     def removeSelectedItems(self):
-        for item in self.getTreeWidget().selectedItems():
-            obj = self._getObjectForItem(item)
-            if (not obj.hasProperty('Deletable')) or obj.getProperty('Deletable'):
-                self._removeItemFromObjectModel(item)
+        with self.bulkUpdate():
+            for item in self.getTreeWidget().selectedItems():
+                obj = self._getObjectForItem(item)
+                if (not obj.hasProperty('Deletable')) or obj.getProperty('Deletable'):
+                    self._removeItemFromObjectModel(item)
 
 
     def _filterEvent(self, obj, event):
@@ -516,6 +631,62 @@ class ObjectModelTree(object):
 
 _t = ObjectModelTree()
 
+# views that requested a render inside a batchChanges() block
+_pendingRenderViews = None
+
+
+def renderViews(views):
+    '''
+    Render the given views, or defer the render to the end of the enclosing
+    batchChanges() block.  Objects should call this rather than view.render()
+    when they are modified so that batched changes render each view once.
+    '''
+    if _pendingRenderViews is not None:
+        for view in views:
+            if view not in _pendingRenderViews:
+                _pendingRenderViews.append(view)
+    else:
+        for view in views:
+            view.render()
+
+
+@contextmanager
+def batchChanges(objs=()):
+    '''
+    Context manager that defers the property changed notifications of objs
+    and any renderViews() call until the end of the block.  Each changed
+    property is notified once with its final value, and each view that
+    requested a render is rendered once after all notifications are sent:
+
+        with om.batchChanges([obj, otherObj]):
+            obj.setProperty('Color', [1, 0, 0])
+            obj.setProperty('Alpha', 0.5)
+            otherObj.setProperty('Visible', False)
+
+    Blocks may be nested, the renders are done by the outermost block.
+    '''
+    global _pendingRenderViews
+
+    outermost = _pendingRenderViews is None
+    if outermost:
+        _pendingRenderViews = []
+
+    propertySets = [obj.properties for obj in objs]
+    for properties in propertySets:
+        properties.beginChanges()
+
+    try:
+        yield
+    finally:
+        try:
+            for properties in propertySets:
+                properties.endChanges()
+        finally:
+            if outermost:
+                views, _pendingRenderViews = _pendingRenderViews, None
+                renderViews(views)
+
+
 def getDefaultObjectModel():
     return _t
 
@@ -531,12 +702,27 @@ def clearSelection():
 def getObjects():
     return _t.getObjects()
 
+def hasObject(obj):
+    return _t.hasObject(obj)
+
 def findObjectByName(name, parent=None):
     return _t.findObjectByName(name, parent)
 
+def findObjectsByName(name):
+    return _t.findObjectsByName(name)
+
 def removeFromObjectModel(obj):
     _t.removeFromObjectModel(obj)
 
+def removeObjects(objs):
+    _t.removeObjects(objs)
+
+def removeChildren(obj):
+    _t.removeChildren(obj)
+
+def bulkUpdate():
+    return _t.bulkUpdate()
+
 def addToObjectModel(obj, parentObj=None):
     _t.addToObjectModel(obj, parentObj)
 
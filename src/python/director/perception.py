@@ -725,7 +725,7 @@ class MapServerSource(TimerCallback):
     def updatePolyData(self, viewId, polyData):
 
         obj = self.polyDataObjects.get(viewId)
-        if obj not in om.getObjects():
+        if not om.hasObject(obj):
             obj = None
         if not obj:
             hiddenMapIds = [9999]
@@ -736,6 +736,7 @@ class MapServerSource(TimerCallback):
             if obj._isPointCloud():
                 obj.setProperty('Color', [1, 1, 1])
                 obj.setProperty('Alpha', 0.5)
+                obj.setLevelOfDetailEnabled(True)
             else:
                 obj.setProperty('Color', [0, 0.68, 1])
 
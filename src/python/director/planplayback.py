@@ -31,6 +31,126 @@ def asRobotPlan(msg):
     return msg
 
 
+def createPoseInterpolator(poseTimes, poses, method='slinear', unwrap_rpy=True):
+    '''
+    Returns a function of time that interpolates the rows of the poses
+    array.  method is one of 'slinear', 'quadratic', 'cubic' or 'pchip'.
+    '''
+    poses = np.array(poses, dtype=float)
+    if unwrap_rpy:
+        poses[:,3:6] = np.unwrap(poses[:,3:6],axis=0)
+
+    if method in ['slinear', 'quadratic', 'cubic']:
+        return scipy.interpolate.interp1d(poseTimes, poses, axis=0, kind=method)
+    elif method == 'pchip':
+        return scipy.interpolate.pchip(poseTimes, poses, axis=0)
+    raise ValueError('unknown interpolation method: %s' % method)
+
+
+class PlanTrajectory(object):
+    '''
+    The pose times and poses of a robot plan, or of a list of plans played
+    back to back.  Plan states are converted to drake poses once, when the
+    trajectory is created, and interpolators are built on first use and
+    cached for each interpolation method.
+
+    poseTimes is an array of N times in seconds and poses is an N x M array
+    of drake poses.  Neither should be modified.
+    '''
+
+    def __init__(self, poseTimes, poses):
+        self.poseTimes = np.array(poseTimes, dtype=float)
+        self.poses = np.array(poses, dtype=float)
+        self._interpolators = {}
+
+    @classmethod
+    def fromPlan(cls, msgOrList):
+        messages = msgOrList if isinstance(msgOrList, list) else [msgOrList]
+
+        allPoseTimes = []
+        allPoses = []
+        for msg in messages:
+            plan = asRobotPlan(msg).plan
+            poseTimes = np.array([state.utime for state in plan]) / 1e6
+            poses = np.array([robotstate.convertStateMessageToDrakePose(state) for state in plan])
+
+            # plans after the first one start at the last pose of the
+            # previous plan
+            if allPoseTimes:
+                poseTimes = poseTimes[1:] + allPoseTimes[-1][-1]
+                poses = poses[1:]
+
+            allPoseTimes.append(poseTimes)
+            allPoses.append(poses)
+
+        return cls(np.hstack(allPoseTimes), np.vstack(allPoses))
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        return cls(data['poseTimes'], data['poses'])
+
+    def save(self, filename):
+        '''
+        Save the pose times, poses and drake pose joint names to a numpy
+        .npz file.
+        '''
+        np.savez(filename, poseTimes=self.poseTimes, poses=self.poses,
+                 jointNames=np.array(robotstate.getDrakePoseJointNames()))
+
+    def getStartTime(self):
+        return self.poseTimes[0]
+
+    def getEndTime(self):
+        return self.poseTimes[-1]
+
+    def getElapsedTime(self):
+        return self.poseTimes[-1] - self.poseTimes[0]
+
+    def getInterpolator(self, method='slinear', unwrap_rpy=True):
+        key = (method, unwrap_rpy)
+        f = self._interpolators.get(key)
+        if f is None:
+            f = createPoseInterpolator(self.poseTimes, self.poses, method, unwrap_rpy)
+            self._interpolators[key] = f
+        return f
+
+    def sample(self, sampleTimes, method='slinear'):
+        '''
+        Returns an array with the interpolated pose at each of the sample
+        times.  Times outside of the trajectory are clamped to its ends.
+        '''
+        sampleTimes = np.clip(sampleTimes, self.poseTimes[0], self.poseTimes[-1])
+        return self.getInterpolator(method)(sampleTimes)
+
+    def getMovingJointIds(self):
+        return np.unique(np.where(np.diff(self.poses, axis=0) != 0.0)[1])
+
+
+_planTrajectories = []
+_maxPlanTrajectories = 8
+
+
+def getPlanTrajectory(msgOrList):
+    '''
+    Returns a PlanTrajectory for the plan message or list of plan messages.
+    The trajectories of the most recently used plans are cached, keyed by
+    the identity of the messages, so plan messages must not be modified
+    after they are played back.
+    '''
+    messages = tuple(msgOrList) if isinstance(msgOrList, list) else (msgOrList,)
+
+    for i, (cachedMessages, trajectory) in enumerate(_planTrajectories):
+        if len(cachedMessages) == len(messages) and all(a is b for a, b in zip(cachedMessages, messages)):
+            _planTrajectories.append(_planTrajectories.pop(i))
+            return trajectory
+
+    trajectory = PlanTrajectory.fromPlan(list(messages))
+    _planTrajectories.append((messages, trajectory))
+    del _planTrajectories[:-_maxPlanTrajectories]
+    return trajectory
+
+
 class PlanPlayback(object):
 
     def __init__(self):
@@ -41,29 +161,13 @@ class PlanPlayback(object):
         self.jointNameRegex = ''
 
     @staticmethod
-    def getPlanPoses(msgOrList):
-
-        if isinstance(msgOrList, list):
-            messages = msgOrList
-            allPoseTimes, allPoses = PlanPlayback.getPlanPoses(messages[0])
-
-            for msg in messages[1:]:
-                poseTimes, poses = PlanPlayback.getPlanPoses(msg)
-                poseTimes += allPoseTimes[-1]
-                allPoseTimes = np.hstack((allPoseTimes, poseTimes[1:]))
-                allPoses += poses[1:]
-            return allPoseTimes, allPoses
-
-        else:
-            msg = asRobotPlan(msgOrList)
+    def getPlanTrajectory(msgOrList):
+        return getPlanTrajectory(msgOrList)
 
-            poses = []
-            poseTimes = []
-            for plan in msg.plan:
-                pose = robotstate.convertStateMessageToDrakePose(plan)
-                poseTimes.append(plan.utime / 1e6)
-                poses.append(pose)
-            return np.array(poseTimes), poses
+    @staticmethod
+    def getPlanPoses(msgOrList):
+        trajectory = getPlanTrajectory(msgOrList)
+        return trajectory.poseTimes.copy(), list(trajectory.poses.copy())
 
     @staticmethod
     def getPlanElapsedTime(msg):
@@ -78,7 +182,7 @@ class PlanPlayback(object):
             self.animationTimer.stop()
 
 
-    def setInterpolationMethod(method):
+    def setInterpolationMethod(self, method):
         self.interpolationMethod = method
 
 
@@ -90,37 +194,25 @@ class PlanPlayback(object):
 
         assert len(messages)
 
-        poseTimes, poses = self.getPlanPoses(messages)
-        self.playPoses(poseTimes, poses, jointController)
+        self.playTrajectory(getPlanTrajectory(messages), jointController)
 
 
     def getPoseInterpolatorFromPlan(self, message):
-        poseTimes, poses = self.getPlanPoses(message)
-        return self.getPoseInterpolator(poseTimes, poses)
+        return getPlanTrajectory(message).getInterpolator(self.interpolationMethod)
 
 
     def getPoseInterpolator(self, poseTimes, poses, unwrap_rpy=True):
-        if unwrap_rpy:
-            poses = np.array(poses, copy=True)
-            poses[:,3:6] = np.unwrap(poses[:,3:6],axis=0)
-
-        if self.interpolationMethod in ['slinear', 'quadratic', 'cubic']:
-            f = scipy.interpolate.interp1d(poseTimes, poses, axis=0, kind=self.interpolationMethod)
-        elif self.interpolationMethod == 'pchip':
-            f = scipy.interpolate.pchip(poseTimes, poses, axis=0)
-        return f
+        return createPoseInterpolator(poseTimes, poses, self.interpolationMethod, unwrap_rpy)
 
 
     def getPlanPoseMeshes(self, messages, jointController, robotModel, numberOfSamples):
 
-        poseTimes, poses = self.getPlanPoses(messages)
-        f = self.getPoseInterpolator(poseTimes, poses)
-        sampleTimes = np.linspace(poseTimes[0], poseTimes[-1], numberOfSamples)
+        trajectory = getPlanTrajectory(messages)
+        sampleTimes = np.linspace(trajectory.getStartTime(), trajectory.getEndTime(), numberOfSamples)
         meshes = []
 
-        for sampleTime in sampleTimes:
+        for pose in trajectory.sample(sampleTimes, self.interpolationMethod):
 
-            pose = f(sampleTime)
             jointController.setPose('plan_playback', pose)
             polyData = vtk.vtkPolyData()
             robotModel.model.getModelMesh(polyData)
@@ -135,8 +227,14 @@ class PlanPlayback(object):
 
 
     def playPoses(self, poseTimes, poses, jointController):
+        self.playTrajectory(PlanTrajectory(poseTimes, poses), jointController)
+
+
+    def playTrajectory(self, trajectory, jointController):
 
-        f = self.getPoseInterpolator(poseTimes, poses)
+        f = trajectory.getInterpolator(self.interpolationMethod)
+        poseTimes = trajectory.poseTimes
+        poses = trajectory.poses
 
         timer = SimpleTimer()
 
@@ -145,7 +243,7 @@ class PlanPlayback(object):
             tNow = timer.elapsed() * self.playbackSpeed
 
             if tNow > poseTimes[-1]:
-                pose = poses[-1]
+                pose = poses[-1].copy()
                 jointController.setPose('plan_playback', pose)
 
                 if self.animationCallback:
@@ -171,64 +269,58 @@ class PlanPlayback(object):
         pickle.dump((poseTimes, poses), open(filename, 'w'))
 
 
+    def savePlan(self, filename, msg):
+        getPlanTrajectory(msg).save(filename)
+
+
     def getMovingJointNames(self, msg):
-        poseTimes, poses = self.getPlanPoses(msg)
-        diffs = np.diff(poses, axis=0)
-        jointIds =  np.unique(np.where(diffs != 0.0)[1])
+        jointIds = getPlanTrajectory(msg).getMovingJointIds()
         jointNames = [robotstate.getDrakePoseJointNames()[jointId] for jointId in jointIds]
         return jointNames
 
 
     def plotPlan(self, msg):
-
-        poseTimes, poses = self.getPlanPoses(msg)
-        self.plotPoses(poseTimes, poses)
+        self.plotTrajectory(getPlanTrajectory(msg))
 
 
     def plotPoses(self, poseTimes, poses):
+        self.plotTrajectory(PlanTrajectory(poseTimes, poses))
+
+
+    def plotTrajectory(self, trajectory):
 
         import matplotlib.pyplot as plt
 
-        poses = np.array(poses)
+        poseTimes = trajectory.poseTimes
+        poses = trajectory.poses
 
         if self.jointNameRegex:
             jointIds = range(poses.shape[1])
         else:
-            diffs = np.diff(poses, axis=0)
-            jointIds = np.unique(np.where(diffs != 0.0)[1])
+            jointIds = trajectory.getMovingJointIds()
 
         jointNames = [robotstate.getDrakePoseJointNames()[jointId] for jointId in jointIds]
-        jointTrajectories = [poses[:,jointId] for jointId in jointIds]
 
         seriesNames = []
 
         sampleResolutionInSeconds = 0.01
         numberOfSamples = (poseTimes[-1] - poseTimes[0]) / sampleResolutionInSeconds
         xnew = np.linspace(poseTimes[0], poseTimes[-1], numberOfSamples)
+        ynew = np.rad2deg(trajectory.getInterpolator(self.interpolationMethod, unwrap_rpy=False)(xnew))
 
         fig = plt.figure()
         ax = fig.add_subplot(111)
 
 
-        for jointId, jointName, jointTrajectory in zip(jointIds, jointNames, jointTrajectories):
+        for jointId, jointName in zip(jointIds, jointNames):
 
             if self.jointNameRegex and not re.match(self.jointNameRegex, jointName):
                 continue
 
-            x = poseTimes
-            y = jointTrajectory
-
-            y = np.rad2deg(y)
-
-            if self.interpolationMethod in ['slinear', 'quadratic', 'cubic']:
-                f = scipy.interpolate.interp1d(x, y, kind=self.interpolationMethod)
-            elif self.interpolationMethod == 'pchip':
-                f = scipy.interpolate.pchip(x, y)
-
-            ax.plot(x, y, 'ko')
+            ax.plot(poseTimes, np.rad2deg(poses[:,jointId]), 'ko')
             seriesNames.append(jointName + ' points')
 
-            ax.plot(xnew, f(xnew), '-')
+            ax.plot(xnew, ynew[:,jointId], '-')
             seriesNames.append(jointName + ' ' + self.interpolationMethod)
 
 
@@ -0,0 +1,273 @@
+'''
+Distance based level of detail for large point clouds.
+
+buildVoxelPyramid() decimates a point cloud into levels whose voxel size
+doubles from one level to the next.  PointCloudLOD keeps a mapper for each
+level of a PolyDataItem and, just before a view renders, selects the level
+drawn by the item's actor.  The coarsest level whose voxels project to less
+than pixelSize pixels at the distance of the camera focal point is used,
+and the selection is biased towards coarser levels while the renders of the
+view take longer than 1/targetFps seconds.
+
+Picking always uses the full resolution data, see fullResolution().
+'''
+
+import math
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+import director.vtkAll as vtk
+import director.vtkNumpy as vnp
+from director.vtkNumpy import numpy_support
+
+
+_lodInstances = weakref.WeakSet()
+_fullResolution = False
+
+
+def getVoxelIndices(points, leafSize):
+    '''
+    Returns the sorted indices of the first point in each occupied voxel of
+    a grid with the given leaf size.  Points that are not finite are
+    dropped.
+    '''
+    indices = np.flatnonzero(np.isfinite(points).all(axis=1))
+    if not len(indices):
+        return indices
+
+    voxels = np.floor((points[indices] - points[indices].min(axis=0)) / leafSize).astype(np.int64)
+    dims = voxels.max(axis=0) + 1
+    keys = voxels[:,0] + dims[0]*(voxels[:,1] + dims[1]*voxels[:,2])
+
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+    return indices[first]
+
+
+def createVertexCells(numberOfPoints):
+    cells = np.empty((numberOfPoints, 2), dtype=numpy_support.ID_TYPE_CODE)
+    cells[:,0] = 1
+    cells[:,1] = np.arange(numberOfPoints)
+
+    cellArray = vtk.vtkCellArray()
+    cellArray.SetCells(numberOfPoints, numpy_support.numpy_to_vtkIdTypeArray(cells.ravel(), deep=True))
+    return cellArray
+
+
+def extractPoints(polyData, indices):
+    '''
+    Returns a new point cloud with the points and the named point data
+    arrays of polyData at the given indices.
+    '''
+    points = vnp.getNumpyFromVtk(polyData, 'Points')[indices]
+
+    newPolyData = vtk.vtkPolyData()
+    newPolyData.SetPoints(vnp.getVtkPointsFromNumpy(points.copy()))
+
+    pointData = polyData.GetPointData()
+    for i in xrange(pointData.GetNumberOfArrays()):
+        arrayName = pointData.GetArrayName(i)
+        if arrayName and pointData.GetArray(i):
+            vnp.addNumpyToVtk(newPolyData, vnp.getNumpyFromVtk(polyData, arrayName)[indices].copy(), arrayName)
+
+    newPolyData.SetVerts(createVertexCells(len(indices)))
+    return newPolyData
+
+
+def buildVoxelPyramid(polyData, minPoints=20000, maxLevels=5):
+    '''
+    Returns a list of (leafSize, polyData) pairs ordered from fine to
+    coarse.  The first level is the input polyData with a leaf size of 0.
+    Each following level has at most half the points of the previous level
+    and levels stop below minPoints points.
+    '''
+    levels = [(0.0, polyData)]
+    numberOfPoints = polyData.GetNumberOfPoints()
+    if numberOfPoints <= minPoints:
+        return levels
+
+    points = vnp.getNumpyFromVtk(polyData, 'Points')
+    bounds = np.array(polyData.GetBounds()).reshape(3, 2)
+    diagonal = np.linalg.norm(bounds[:,1] - bounds[:,0])
+    if not diagonal > 0:
+        return levels
+
+    # start from a voxel size on the order of the mean point spacing of a
+    # surface sampled by this many points, and double it until a level
+    # removes at least half of the points of the previous one.
+    leafSize = diagonal / math.sqrt(numberOfPoints)
+
+    while len(levels) < maxLevels and numberOfPoints > minPoints and leafSize < diagonal:
+        indices = getVoxelIndices(points, leafSize)
+        if len(indices) <= numberOfPoints / 2:
+            levels.append((leafSize, extractPoints(polyData, indices)))
+            numberOfPoints = len(indices)
+        leafSize *= 2.0
+
+    return levels
+
+
+@contextmanager
+def fullResolution():
+    '''
+    Context manager that draws every PointCloudLOD at full resolution, for
+    example while picking.
+    '''
+    global _fullResolution
+    previous = _fullResolution
+    _fullResolution = True
+    for lod in list(_lodInstances):
+        lod.setLevel(0)
+    try:
+        yield
+    finally:
+        _fullResolution = previous
+
+
+class PointCloudLOD(object):
+    '''
+    Selects the level of detail drawn by the actor of a PolyDataItem.  The
+    pyramid is built on the first render that needs it and rebuilt when the
+    points or the point data arrays of the item's polyData change.  The
+    full resolution mapper of the item is never replaced, settings such as
+    the color map are copied from it to the mappers of the coarser levels.
+    '''
+
+    def __init__(self, item, minPoints=20000, maxLevels=5):
+        self.item = item
+        self.minPoints = minPoints
+        self.maxLevels = maxLevels
+        self.pixelSize = 2.0
+        self.targetFps = 30.0
+        self.level = 0
+        self.levels = []
+        self._mappers = []
+        self._pyramidKey = None
+        self._mapperKeys = {}
+        self._loadBias = 0
+        self._observers = {}
+        _lodInstances.add(self)
+
+    def addView(self, view):
+        if view in self._observers:
+            return
+        renderer = view.renderer()
+        tag = renderer.AddObserver('StartEvent', lambda caller, event: self.onStartRender(caller))
+        self._observers[view] = (renderer, tag)
+
+    def removeView(self, view):
+        renderer, tag = self._observers.pop(view, (None, None))
+        if renderer is not None:
+            renderer.RemoveObserver(tag)
+
+    def close(self):
+        for view in self._observers.keys():
+            self.removeView(view)
+        self.setLevel(0)
+        self.levels = []
+        self._mappers = []
+        _lodInstances.discard(self)
+
+    def _getPyramidKey(self):
+        polyData = self.item.polyData
+        points = polyData.GetPoints()
+        pointData = polyData.GetPointData()
+        arrayNames = tuple(pointData.GetArrayName(i) for i in xrange(pointData.GetNumberOfArrays()))
+        return (polyData, points.GetMTime() if points else 0, polyData.GetNumberOfPoints(), arrayNames)
+
+    def _updatePyramid(self):
+        key = self._getPyramidKey()
+        if key == self._pyramidKey:
+            return
+
+        self._pyramidKey = key
+        self.setLevel(0)
+        self._mapperKeys = {}
+
+        if self.item._isPointCloud():
+            self.levels = buildVoxelPyramid(self.item.polyData, self.minPoints, self.maxLevels)
+        else:
+            self.levels = [(0.0, self.item.polyData)]
+
+        self._mappers = [self.item.mapper]
+        for leafSize, polyData in self.levels[1:]:
+            mapper = vtk.vtkPolyDataMapper()
+            mapper.SetInput(polyData)
+            self._mappers.append(mapper)
+
+    def _updateMapper(self, level):
+        '''
+        Copy the settings of the full resolution mapper to the mapper of the
+        given level when they have changed.
+        '''
+        fullMapper = self.item.mapper
+        activeScalars = self.item.polyData.GetPointData().GetScalars()
+        activeScalarsName = activeScalars.GetName() if activeScalars else None
+        key = (fullMapper.GetMTime(), activeScalarsName)
+        if self._mapperKeys.get(level) == key:
+            return
+
+        mapper = self._mappers[level]
+        polyData = self.levels[level][1]
+        mapper.ShallowCopy(fullMapper)
+        mapper.SetInput(polyData)
+        polyData.GetPointData().SetActiveScalars(activeScalarsName)
+        self._mapperKeys[level] = key
+
+    def setLevel(self, level):
+        if level == self.level:
+            return
+        self.level = level
+        if level:
+            self._updateMapper(level)
+        self.item.actor.SetMapper(self._mappers[level] if level else self.item.mapper)
+
+    def _updateLoadBias(self, renderer):
+        if not self.targetFps:
+            self._loadBias = 0
+            return
+        renderTime = renderer.GetLastRenderTimeInSeconds()
+        if renderTime > 1.0/self.targetFps:
+            self._loadBias = min(self._loadBias + 1, len(self.levels) - 1)
+        elif renderTime < 0.5/self.targetFps:
+            self._loadBias = max(self._loadBias - 1, 0)
+
+    def computeLevel(self, renderer):
+        '''
+        Returns the coarsest level whose leaf size projects to at most
+        pixelSize pixels, plus the current load bias.
+        '''
+        camera = renderer.GetActiveCamera()
+        height = max(renderer.GetSize()[1], 1)
+
+        if camera.GetParallelProjection():
+            worldPerPixel = 2.0*camera.GetParallelScale() / height
+        else:
+            # distance from the camera to the focal point, clamped to the
+            # bounds.  The nearest point of the bounds is not used because
+            # its distance is 0 when the camera is inside the cloud.
+            bounds = np.array(self.item.actor.GetBounds()).reshape(3, 2)
+            position = np.array(camera.GetPosition())
+            focalPoint = np.clip(camera.GetFocalPoint(), bounds[:,0], bounds[:,1])
+            distance = np.linalg.norm(position - focalPoint)
+            worldPerPixel = 2.0*distance*math.tan(math.radians(camera.GetViewAngle())/2.0) / height
+
+        maxLeafSize = self.pixelSize*worldPerPixel
+        level = 0
+        for i, (leafSize, polyData) in enumerate(self.levels):
+            if leafSize <= maxLeafSize:
+                level = i
+
+        return min(level + self._loadBias, len(self.levels) - 1)
+
+    def onStartRender(self, renderer):
+        if _fullResolution or not self.item.actor.GetVisibility():
+            return
+
+        self._updatePyramid()
+        if len(self.levels) < 2:
+            return
+
+        self._updateLoadBias(renderer)
+        self.setLevel(self.computeLevel(renderer))
@@ -5,6 +5,7 @@ from director.timercallback import TimerCallback
 import re
 import numpy as np
 from collections import OrderedDict
+from contextlib import contextmanager
 
 
 def cleanPropertyName(s):
@@ -75,6 +76,8 @@ class PropertySet(object):
         self._properties = OrderedDict()
         self._attributes = {}
         self._alternateNames = {}
+        self._batchDepth = 0
+        self._pendingChanges = OrderedDict()
 
     def propertyNames(self):
         return self._properties.keys()
@@ -151,7 +154,50 @@ class PropertySet(object):
         self.oldPropertyValue = (propertyName, self.getProperty(propertyName))
         self._properties[propertyName] = propertyValue
         self.oldPropertyValue = None
-        self.callbacks.process(self.PROPERTY_CHANGED_SIGNAL, self, propertyName)
+
+        if self._batchDepth:
+            self._pendingChanges[propertyName] = True
+        else:
+            self.callbacks.process(self.PROPERTY_CHANGED_SIGNAL, self, propertyName)
+
+    def beginChanges(self):
+        '''
+        Start deferring property changed notifications.  Calls may be
+        nested, notifications are sent by the matching outermost call to
+        endChanges().
+        '''
+        self._batchDepth += 1
+
+    def endChanges(self):
+        '''
+        Send the property changed notifications deferred since
+        beginChanges().  A property that was set several times is notified
+        once, in the order it was first changed.
+        '''
+        assert self._batchDepth > 0
+        self._batchDepth -= 1
+        if self._batchDepth:
+            return
+
+        while self._pendingChanges:
+            propertyName, _ = self._pendingChanges.popitem(last=False)
+            if propertyName in self._properties:
+                self.callbacks.process(self.PROPERTY_CHANGED_SIGNAL, self, propertyName)
+
+    @contextmanager
+    def batchChanges(self):
+        '''
+        Context manager that wraps beginChanges() and endChanges():
+
+            with properties.batchChanges():
+                properties.setProperty('Color', [1, 0, 0])
+                properties.setProperty('Alpha', 0.5)
+        '''
+        self.beginChanges()
+        try:
+            yield self
+        finally:
+            self.endChanges()
 
     def getPropertyAttribute(self, propertyName, propertyAttribute):
         self.assertProperty(propertyName)
@@ -164,15 +210,13 @@ class PropertySet(object):
         setattr(attributes, propertyAttribute, value)
         self.callbacks.process(self.PROPERTY_ATTRIBUTE_CHANGED_SIGNAL, self, propertyName, propertyAttribute)
 
-    def __getattribute__(self, name):
-        try:
-            alternateNames = object.__getattribute__(self, '_alternateNames')
-            if name in alternateNames:
-                return object.__getattribute__(self, 'getProperty')(alternateNames[name])
-            else:
-                raise AttributeError()
-        except AttributeError:
-            return object.__getattribute__(self, name)
+    def __getattr__(self, name):
+        # only called when normal attribute lookup fails, so access to the
+        # methods and members of PropertySet does not pay for this lookup
+        alternateNames = self.__dict__.get('_alternateNames')
+        if alternateNames and name in alternateNames:
+            return self._properties[alternateNames[name]]
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
 
 
 class PropertyPanelHelper(object):
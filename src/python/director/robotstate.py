@@ -7,6 +7,8 @@ from director import transformUtils
 
 _robotStateToDrakePoseJointMap = None
 _drakePoseToRobotStateJointMap = None
+_robotStateToDrakePoseIndices = None
+_stateMessageJointIndices = {}
 _drakePoseJointNames = None
 _robotStateJointNames = None
 _numPositions = None
@@ -49,6 +51,59 @@ def getDrakePoseToRobotStateJointMap():
     return _drakePoseToRobotStateJointMap
 
 
+def getRobotStateToDrakePoseIndices():
+    '''
+    Returns an integer array with the drake pose index of each robot state
+    joint, so that drakePose[indices] = robotStateJointPositions.
+    '''
+    global _robotStateToDrakePoseIndices
+
+    if _robotStateToDrakePoseIndices is None:
+        jointMap = getRobotStateToDrakePoseJointMap()
+        _robotStateToDrakePoseIndices = np.array([jointMap[i] for i in xrange(len(jointMap))], dtype=int)
+
+    return _robotStateToDrakePoseIndices
+
+
+def getStateMessageJointIndices(jointNames):
+    '''
+    Returns (drakeIndices, messageIndices, missingJointNames) for a state
+    message with the given joint name ordering.  The index arrays map the
+    joint positions of the message into a drake pose:
+
+        drakePose[drakeIndices] = jointPosition[messageIndices]
+
+    missingJointNames lists the drake pose joints that are not in the
+    message.  The result is cached for each joint name ordering, since
+    messages from the same publisher always use the same ordering.
+    '''
+    key = tuple(jointNames)
+    try:
+        return _stateMessageJointIndices[key]
+    except KeyError:
+        pass
+
+    messageIndex = dict((name, i) for i, name in enumerate(jointNames))
+
+    drakeIndices = []
+    messageIndices = []
+    missingJointNames = []
+    for drakeIndex, name in enumerate(getDrakePoseJointNames()[6:], 6):
+        if name in messageIndex:
+            drakeIndices.append(drakeIndex)
+            messageIndices.append(messageIndex[name])
+        else:
+            missingJointNames.append(name)
+
+    # a handful of orderings are expected, bound the cache in case of many
+    if len(_stateMessageJointIndices) >= 32:
+        _stateMessageJointIndices.clear()
+
+    indices = (np.array(drakeIndices, dtype=int), np.array(messageIndices, dtype=int), missingJointNames)
+    _stateMessageJointIndices[key] = indices
+    return indices
+
+
 def convertStateMessageToDrakePose(msg, strict=True):
     '''
     If strict is true, then the state message must contain a joint_position
@@ -57,58 +112,43 @@ def convertStateMessageToDrakePose(msg, strict=True):
     not specified in the robot state msg argument.
     '''
 
-    jointMap = {}
-    for name, position in zip(msg.joint_name, msg.joint_position):
-        jointMap[name] = position
+    drakeIndices, messageIndices, missingJointNames = getStateMessageJointIndices(msg.joint_name)
+    if strict and missingJointNames:
+        raise KeyError(missingJointNames[0])
 
-    jointPositions = []
-    for name in getDrakePoseJointNames()[6:]:
-        if strict:
-            jointPositions.append(jointMap[name])
-        else:
-            jointPositions.append(jointMap.get(name, 0.0))
+    pose = np.zeros(getNumPositions())
+    pose[drakeIndices] = np.asarray(msg.joint_position, dtype=float)[messageIndices]
 
     trans = msg.pose.translation
     quat = msg.pose.rotation
-    trans = [trans.x, trans.y, trans.z]
-    quat = [quat.w, quat.x, quat.y, quat.z]
-    rpy = transformUtils.quaternionToRollPitchYaw(quat)
-
-    pose = np.hstack((trans, rpy, jointPositions))
-    assert len(pose) == getNumPositions()
+    pose[:3] = [trans.x, trans.y, trans.z]
+    pose[3:6] = transformUtils.quaternionToRollPitchYaw([quat.w, quat.x, quat.y, quat.z])
     return pose
 
 def atlasCommandToDrakePose(msg):
-    jointIndexMap = getRobotStateToDrakePoseJointMap()
+    indices = getRobotStateToDrakePoseIndices()
     drakePose = np.zeros(len(getDrakePoseJointNames()))
-    for jointIdx, drakeIdx in jointIndexMap.iteritems():
-        drakePose[drakeIdx] = msg.position[jointIdx]
+    drakePose[indices] = np.asarray(msg.position, dtype=float)[:len(indices)]
     return drakePose.tolist()
 
 
 def robotStateToDrakePose(robotState):
 
-    drakePose = range(getNumPositions())
-    jointIndexMap = getRobotStateToDrakePoseJointMap()
+    indices = getRobotStateToDrakePoseIndices()
 
     pos = getPositionFromRobotState(robotState)
     rpy = getRollPitchYawFromRobotState(robotState)
-    robotState = robotState[7:]
-
-    assert len(jointIndexMap) == getNumJoints()
-    assert len(robotState) >= len(jointIndexMap)
+    robotState = np.asarray(robotState[7:], dtype=float)
 
-    for jointIdx in xrange(len(jointIndexMap)):
-        drakePose[jointIndexMap[jointIdx]] = robotState[jointIdx]
+    assert len(indices) == getNumJoints()
+    assert len(robotState) >= len(indices)
 
-    drakePose[0] = pos[0]
-    drakePose[1] = pos[1]
-    drakePose[2] = pos[2]
-    drakePose[3] = rpy[0]
-    drakePose[4] = rpy[1]
-    drakePose[5] = rpy[2]
+    drakePose = np.zeros(getNumPositions())
+    drakePose[indices] = robotState[:len(indices)]
+    drakePose[:3] = pos[:3]
+    drakePose[3:6] = rpy
 
-    return drakePose
+    return drakePose.tolist()
 
 
 def getPoseLCMFromXYZRPY(xyz, rpy):
@@ -130,13 +170,7 @@ def getPoseLCMFromXYZRPY(xyz, rpy):
 
 def drakePoseToRobotState(drakePose):
 
-    robotState = range(getNumJoints())
-    jointIndexMap = getDrakePoseToRobotStateJointMap()
-
-    for jointIdx, jointAngle in enumerate(drakePose):
-        jointIdx =jointIndexMap.get(jointIdx)
-        if jointIdx is not None:
-            robotState[jointIdx] = jointAngle
+    robotState = np.asarray(drakePose, dtype=float)[getRobotStateToDrakePoseIndices()].tolist()
 
     xyz = drakePose[:3]
     rpy = drakePose[3:6]
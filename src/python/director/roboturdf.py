@@ -13,6 +13,7 @@ from director import lcmUtils
 from director import filterUtils
 from director import packagepath
 from director import transformUtils
+from director import robotstate
 
 
 import bot_core
@@ -95,8 +96,7 @@ class RobotModelItem(om.ObjectModelItem):
             self._renderAllViews()
 
     def _renderAllViews(self):
-        for view in self.views:
-            view.render()
+        om.renderViews(self.views)
 
     def getLinkFrame(self, linkName):
         t = vtk.vtkTransform()
@@ -106,6 +106,37 @@ class RobotModelItem(om.ObjectModelItem):
         else:
             return None
 
+    def getLinkFramesAtPoses(self, poses, linkNames, jointNames=None):
+        '''
+        Returns an array of shape (M, K, 4, 4) with the link to world
+        matrices of K links at each of M poses, or None if a link name is
+        not found.  poses is an array of shape (M, N) of joint positions in
+        the order of jointNames, which defaults to the drake pose joint
+        names.  Forward kinematics are computed with a separate cache, the
+        joint positions and the display of the model are not changed.
+        '''
+        jointNames = jointNames or robotstate.getDrakePoseJointNames()
+        poses = np.asarray(poses, dtype=float)
+        poses = poses.reshape(-1, len(jointNames))
+        linkNames = list(linkNames)
+
+        matrices = self.model.computeLinkToWorld(poses.ravel(), jointNames, linkNames)
+        if len(matrices) != len(poses)*len(linkNames)*16:
+            return None
+        return np.array(matrices).reshape(len(poses), len(linkNames), 4, 4)
+
+    def getLinkFrameAtPose(self, linkName, pose, jointNames=None):
+        '''
+        Returns the link to world transform at the given pose without
+        changing the joint positions of the model.
+        '''
+        matrices = self.getLinkFramesAtPoses([pose], [linkName], jointNames)
+        if matrices is None:
+            return None
+        t = transformUtils.getTransformFromNumpy(matrices[0,0])
+        t.PostMultiply()
+        return t
+
     def getHeadLink(self):
         headLink = drcargs.getDirectorConfig().get('headLink')
         if not headLink:
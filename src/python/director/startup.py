@@ -56,6 +56,7 @@ from director import footstepsdriver
 from director import footstepsdriverpanel
 from director import framevisualization
 from director import lcmloggerwidget
+from director import lcmtrafficmonitor
 from director import lcmgl
 from director import lcmoctomap
 from director import lcmcollections
@@ -77,6 +78,7 @@ from director import robotplanlistener
 from director import handdriver
 from director import planplayback
 from director import playbackpanel
+from director import statehistorypanel
 from director import screengrabberpanel
 from director import splinewidget
 from director import teleoppanel
@@ -762,6 +764,9 @@ camerabookmarks.init(view)
 cameraControlPanel = cameracontrolpanel.CameraControlPanel(view)
 app.addWidgetToDock(cameraControlPanel.widget, action=None).hide()
 
+stateHistoryPanel = statehistorypanel.init(robotSystem)
+lcmTrafficMonitorPanel = lcmtrafficmonitor.init()
+
 
 def getLinkFrame(linkName, model=None):
     model = model or robotStateModel
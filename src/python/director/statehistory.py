@@ -0,0 +1,135 @@
+'''
+A fixed size history of robot poses indexed by time.
+
+StateHistory stores (utime, pose) samples in preallocated numpy arrays used
+as a ring buffer.  When the buffer is full the oldest sample is replaced, so
+the memory use is fixed by maxSamples and does not grow while the
+application runs.  Poses at any time in the stored range are looked up with
+a binary search and linear interpolation.
+
+JointController.enableStateHistory() adds a StateHistory that is fed by the
+robot state messages of addLCMUpdater().
+'''
+
+import numpy as np
+
+
+class StateHistory(object):
+
+    def __init__(self, numberOfPositions, maxSamples=36000):
+        '''
+        The default of 36000 samples holds 10 minutes of robot state at
+        the 60 Hz rate of JointController.addLCMUpdater().
+        '''
+        self.numberOfPositions = numberOfPositions
+        self.maxSamples = max(int(maxSamples), 1)
+        self.utimes = np.zeros(self.maxSamples, dtype=np.int64)
+        self.poses = np.zeros((self.maxSamples, numberOfPositions))
+        self._start = 0
+        self._count = 0
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+
+    def getNumberOfSamples(self):
+        return self._count
+
+    def getMemoryUsage(self):
+        '''
+        Returns the size in bytes of the preallocated sample arrays.
+        '''
+        return self.utimes.nbytes + self.poses.nbytes
+
+    def _getIndex(self, i):
+        return (self._start + i) % self.maxSamples
+
+    def getUtimeRange(self):
+        if not self._count:
+            return None
+        return self.utimes[self._start], self.utimes[self._getIndex(self._count - 1)]
+
+    def addSample(self, utime, pose):
+        '''
+        Append a sample.  A sample with the same utime as the newest sample
+        replaces it.  A sample older than the newest sample, for example
+        after a log player seeks backwards, clears the history.
+        '''
+        if self._count:
+            newestUtime = self.utimes[self._getIndex(self._count - 1)]
+            if utime < newestUtime:
+                self.clear()
+            elif utime == newestUtime:
+                self.poses[self._getIndex(self._count - 1)] = pose
+                return
+
+        if self._count < self.maxSamples:
+            index = self._getIndex(self._count)
+            self._count += 1
+        else:
+            index = self._start
+            self._start = self._getIndex(1)
+
+        self.utimes[index] = utime
+        self.poses[index] = pose
+
+    def findSample(self, utime):
+        '''
+        Returns the position in the history, from 0 for the oldest sample to
+        getNumberOfSamples() - 1 for the newest, of the last sample with a
+        utime less than or equal to utime.  Returns -1 if utime is before
+        the oldest sample.
+        '''
+        # the stored samples are sorted in two contiguous segments of the
+        # ring buffer, the first starting at _start.
+        firstSegment = self.utimes[self._start:min(self._start + self._count, self.maxSamples)]
+        secondSegment = self.utimes[:self._count - len(firstSegment)]
+
+        if len(secondSegment) and utime >= secondSegment[0]:
+            return len(firstSegment) + np.searchsorted(secondSegment, utime, side='right') - 1
+        return np.searchsorted(firstSegment, utime, side='right') - 1
+
+    def getSample(self, i):
+        '''
+        Returns the (utime, pose) of the sample at position i, see
+        findSample().  The pose is a copy.
+        '''
+        if not 0 <= i < self._count:
+            raise IndexError('sample index out of range: %d' % i)
+        index = self._getIndex(i)
+        return self.utimes[index], self.poses[index].copy()
+
+    def getPose(self, utime, interpolate=True):
+        '''
+        Returns the pose at utime.  Times outside of the stored range are
+        clamped to the oldest or newest sample.  With interpolate, poses
+        are linearly interpolated between the samples around utime and the
+        roll, pitch and yaw of the floating base are interpolated along the
+        shortest angle.  Returns None if the history is empty.
+        '''
+        if not self._count:
+            return None
+
+        i = self.findSample(utime)
+        if i < 0:
+            return self.getSample(0)[1]
+        if i == self._count - 1 or not interpolate:
+            return self.getSample(i)[1]
+
+        utime0, pose0 = self.getSample(i)
+        utime1, pose1 = self.getSample(i + 1)
+        alpha = float(utime - utime0) / (utime1 - utime0)
+
+        delta = pose1 - pose0
+        delta[3:6] = np.mod(delta[3:6] + np.pi, 2*np.pi) - np.pi
+        return pose0 + alpha*delta
+
+    def getSamples(self, startUtime=None, endUtime=None):
+        '''
+        Returns arrays (utimes, poses) of the samples in the time range,
+        ordered from oldest to newest.  The arrays are copies.
+        '''
+        first = 0 if startUtime is None else self.findSample(startUtime - 1) + 1
+        last = self._count - 1 if endUtime is None else self.findSample(endUtime)
+        indices = self._getIndex(np.arange(first, last + 1))
+        return self.utimes[indices], self.poses[indices]
@@ -0,0 +1,131 @@
+from PythonQt import QtCore, QtGui
+from director import applogic as app
+from director import roboturdf
+from director.timercallback import TimerCallback
+
+
+class StateHistoryPanel(object):
+    '''
+    A scrub control for the robot state history.  While Live is unchecked,
+    the slider selects a time in the history and the pose at that time is
+    shown on a ghost robot model.  The selected time is kept when new
+    samples arrive, so the ghost stays in place until it is moved or the
+    sample is dropped from the history.
+    '''
+
+    def __init__(self, robotSystem):
+
+        self.robotSystem = robotSystem
+        self.history = robotSystem.robotStateJointController.enableStateHistory()
+        self.ghostModel = None
+        self.ghostJointController = None
+        self.utime = None
+
+        self.widget = QtGui.QWidget()
+        self.widget.setWindowTitle('State History')
+        l = QtGui.QVBoxLayout(self.widget)
+
+        self.slider = QtGui.QSlider(QtCore.Qt.Horizontal)
+        self.slider.setRange(0, 1000)
+        self.slider.setValue(1000)
+        self.slider.connect('valueChanged(int)', self.onSliderChanged)
+
+        self.liveCheck = QtGui.QCheckBox('Live')
+        self.liveCheck.checked = True
+        self.liveCheck.connect('toggled(bool)', self.onLiveToggled)
+
+        self.timeLabel = QtGui.QLabel()
+
+        hl = QtGui.QHBoxLayout()
+        hl.addWidget(self.liveCheck)
+        hl.addWidget(self.timeLabel)
+        hl.addStretch()
+        l.addLayout(hl)
+        l.addWidget(self.slider)
+        l.addStretch()
+
+        self.timer = TimerCallback(targetFps=10, callback=self.updatePanel)
+        self.timer.start()
+
+    def getGhostModel(self):
+        if self.ghostModel is None:
+            directorConfig = self.robotSystem.directorConfig
+            self.ghostModel, self.ghostJointController = roboturdf.loadRobotModel(
+                'state history model', self.robotSystem.view,
+                urdfFile=directorConfig['urdfConfig']['robotState'],
+                parent='sensors', color=roboturdf.getRobotBlueColor(),
+                colorMode=directorConfig['colorMode'], visible=False)
+            self.ghostModel.setProperty('Alpha', 0.5)
+        return self.ghostModel
+
+    def isLive(self):
+        return bool(self.liveCheck.checked)
+
+    def setUtime(self, utime):
+        '''
+        Show the pose of the history at utime on the ghost model.
+        '''
+        pose = self.history.getPose(utime)
+        if pose is None:
+            return
+
+        self.utime = utime
+        ghostModel = self.getGhostModel()
+        self.ghostJointController.setPose('state_history', pose)
+        ghostModel.setProperty('Visible', True)
+        self.updatePanel()
+
+    def onLiveToggled(self, live):
+        if live:
+            self.utime = None
+            if self.ghostModel is not None:
+                self.ghostModel.setProperty('Visible', False)
+        else:
+            utimeRange = self.history.getUtimeRange()
+            if utimeRange is not None:
+                self.setUtime(utimeRange[1])
+        self.updatePanel()
+
+    def onSliderChanged(self, value):
+        utimeRange = self.history.getUtimeRange()
+        if utimeRange is None:
+            return
+
+        if self.isLive():
+            self.liveCheck.blockSignals(True)
+            self.liveCheck.checked = False
+            self.liveCheck.blockSignals(False)
+
+        startUtime, endUtime = utimeRange
+        self.setUtime(startUtime + int((endUtime - startUtime)*value/1000.0))
+
+    def updatePanel(self):
+        if not self.widget.visible:
+            return
+
+        utimeRange = self.history.getUtimeRange()
+        if utimeRange is None:
+            self.timeLabel.text = 'no samples'
+            return
+
+        startUtime, endUtime = utimeRange
+        utime = endUtime if self.utime is None else min(max(self.utime, startUtime), endUtime)
+
+        value = 1000 if endUtime == startUtime else int(1000.0*(utime - startUtime)/(endUtime - startUtime))
+        self.slider.blockSignals(True)
+        self.slider.setValue(value)
+        self.slider.blockSignals(False)
+
+        self.timeLabel.text = '%.2f s of %.1f s' % ((utime - endUtime)*1e-6, (endUtime - startUtime)*1e-6)
+
+
+def init(robotSystem):
+
+    global panel
+    global dock
+
+    panel = StateHistoryPanel(robotSystem)
+    dock = app.addWidgetToDock(panel.widget, dockArea=QtCore.Qt.BottomDockWidgetArea)
+    dock.hide()
+
+    return panel
@@ -173,6 +173,37 @@ def transformFromPose(position, quaternion):
     return getTransformFromNumpy(mat)
 
 
+def matricesFromPoses(positions, quaternions):
+    '''
+    Given an Nx3 array of positions and an Nx4 array of (w, x, y, z)
+    quaternions, returns an Nx4x4 array of homogeneous transform matrices.
+    This is the vectorized equivalent of transformFromPose.  Quaternions
+    are normalized and zero length quaternions give the identity rotation.
+    '''
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    quaternions = np.asarray(quaternions, dtype=float).reshape(-1, 4)
+
+    norms = np.sum(quaternions*quaternions, axis=1)
+    valid = norms > transformations._EPS
+    scale = np.zeros(len(norms))
+    scale[valid] = np.sqrt(2.0 / norms[valid])
+    w, x, y, z = (quaternions * scale[:,None]).T
+
+    mats = np.zeros((len(positions), 4, 4))
+    mats[:,0,0] = 1.0 - (y*y + z*z)
+    mats[:,0,1] = x*y - z*w
+    mats[:,0,2] = x*z + y*w
+    mats[:,1,0] = x*y + z*w
+    mats[:,1,1] = 1.0 - (x*x + z*z)
+    mats[:,1,2] = y*z - x*w
+    mats[:,2,0] = x*z - y*w
+    mats[:,2,1] = y*z + x*w
+    mats[:,2,2] = 1.0 - (x*x + y*y)
+    mats[:,:3,3] = positions
+    mats[:,3,3] = 1.0
+    return mats
+
+
 def poseFromTransform(transform):
     '''
     Returns position, quaternion
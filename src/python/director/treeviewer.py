@@ -2,6 +2,7 @@ import math
 import os
 import json
 import time
+import struct
 import numpy as np
 from collections import namedtuple
 from director import lcmUtils
@@ -17,6 +18,7 @@ from director import vtkAll as vtk
 from director import vtkNumpy as vnp
 from director import visualization as vis
 from director import packagepath
+from director import meshcache
 
 import robotlocomotion as lcmrl
 
@@ -40,6 +42,96 @@ class ViewerResponse(namedtuple("ViewerResponse", ["status", "data"])):
         return dict(status=self.status, **self.data)
 
 
+# Version 1.0 of the treeviewer_json format is a JSON document.  Version 1.1
+# is a JSON header followed by binary array buffers, so that bulk data such
+# as point clouds, mesh vertices and lidar ranges can be decoded without
+# parsing lists of numbers.  The layout of a version 1.1 payload is:
+#
+#     uint32       header length n, little endian
+#     n bytes      JSON header
+#     padding      to a multiple of 8 bytes
+#     buffers      array data
+#
+# Anywhere in the header an object {"__ndarray__": {"dtype": ..., "shape":
+# ..., "offset": ...}} stands for an array whose data starts at the given
+# offset into the buffers, where dtype is a numpy dtype string such as "<f4".
+SUPPORTED_FORMATS = {"treeviewer_json": ["1.0", "1.1"]}
+
+_headerLengthStruct = struct.Struct("<I")
+_bufferAlignment = 8
+
+
+def _alignedSize(size):
+    return -(-size // _bufferAlignment) * _bufferAlignment
+
+
+def encodeBinaryPayload(data):
+    '''
+    Encode data as a treeviewer_json version 1.1 payload.  numpy arrays in
+    data are written to the binary buffers, everything else to the header.
+    '''
+    buffers = []
+    bufferOffset = [0]
+
+    def replaceArrays(obj):
+        if isinstance(obj, np.ndarray):
+            array = np.ascontiguousarray(obj)
+            if array.dtype.byteorder == '>' or (array.dtype.byteorder == '=' and not np.little_endian):
+                array = array.byteswap().newbyteorder()
+            ref = {"dtype": array.dtype.newbyteorder('<').str,
+                   "shape": list(array.shape),
+                   "offset": bufferOffset[0]}
+            raw = array.tostring()
+            padding = _alignedSize(len(raw)) - len(raw)
+            buffers.append(raw + '\0' * padding)
+            bufferOffset[0] += len(raw) + padding
+            return {"__ndarray__": ref}
+        elif isinstance(obj, dict):
+            return dict((key, replaceArrays(value)) for key, value in obj.iteritems())
+        elif isinstance(obj, (list, tuple)):
+            return [replaceArrays(value) for value in obj]
+        return obj
+
+    header = json.dumps(replaceArrays(data))
+    headerSize = _headerLengthStruct.size + len(header)
+    padding = _alignedSize(headerSize) - headerSize
+    return _headerLengthStruct.pack(len(header)) + header + '\0' * padding + ''.join(buffers)
+
+
+def decodeBinaryPayload(payload):
+    '''
+    Decode a treeviewer_json version 1.1 payload.  Arrays are returned as
+    read-only numpy arrays that reference the payload without copying it.
+    '''
+    if len(payload) < _headerLengthStruct.size:
+        raise ValueError("truncated treeviewer payload header")
+    headerLength, = _headerLengthStruct.unpack_from(payload, 0)
+    headerEnd = _headerLengthStruct.size + headerLength
+    if headerEnd > len(payload):
+        raise ValueError("truncated treeviewer payload header")
+    header = json.loads(payload[_headerLengthStruct.size:headerEnd])
+    bufferStart = _alignedSize(headerEnd)
+
+    def replaceRefs(obj):
+        if isinstance(obj, dict):
+            ref = obj.get("__ndarray__")
+            if ref is not None:
+                dtype = np.dtype(str(ref["dtype"]))
+                shape = tuple(ref["shape"])
+                count = int(np.prod(shape))
+                offset = bufferStart + ref["offset"]
+                if offset + count * dtype.itemsize > len(payload):
+                    raise ValueError("treeviewer array buffer out of range")
+                array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+                return array.reshape(shape)
+            return dict((key, replaceRefs(value)) for key, value in obj.iteritems())
+        elif isinstance(obj, list):
+            return [replaceRefs(value) for value in obj]
+        return obj
+
+    return replaceRefs(header)
+
+
 def transformFromDict(pose_data):
     return transformUtils.transformFromPose(
         pose_data.get("translation", [0, 0, 0]),
@@ -47,7 +139,6 @@ def transformFromDict(pose_data):
 
 
 class Geometry(object):
-    TextureCache = {}
     PackageMap = None
 
     @staticmethod
@@ -93,11 +184,8 @@ class Geometry(object):
 
     @staticmethod
     def createMeshFromFile(params):
-        polyDataList = Geometry.loadPolyDataMeshes(params["filename"])
-        if "scale" in params:
-            polyDataList = Geometry.scaleGeometry(polyDataList,
-                                                  params["scale"])
-        return polyDataList
+        return Geometry.loadPolyDataMeshes(params["filename"],
+                                           params.get("scale"))
 
     @staticmethod
     def createMeshFromData(params):
@@ -162,34 +250,20 @@ class Geometry(object):
     def createPolyDataFromMeshArrays(pts, faces):
         pd = vtk.vtkPolyData()
         pd.SetPoints(vtk.vtkPoints())
-        pd.GetPoints().SetData(vnp.getVtkFromNumpy(pts.copy()))
+        pd.GetPoints().SetData(vnp.getVtkFromNumpy(np.array(pts, dtype=float).reshape(-1, 3)))
 
+        faces = np.asarray(faces)
+        assert faces.ndim == 2 and faces.shape[1] == 3, "Non-triangular faces are not supported."
+
+        cellIds = np.empty((len(faces), 4), dtype=vnp.numpy_support.ID_TYPE_CODE)
+        cellIds[:, 0] = 3
+        cellIds[:, 1:] = faces
         cells = vtk.vtkCellArray()
-        for face in faces:
-            assert len(face) == 3, "Non-triangular faces are not supported."
-            tri = vtk.vtkTriangle()
-            tri.GetPointIds().SetId(0, face[0])
-            tri.GetPointIds().SetId(1, face[1])
-            tri.GetPointIds().SetId(2, face[2])
-            cells.InsertNextCell(tri)
+        cells.SetCells(len(faces), vnp.numpy_support.numpy_to_vtkIdTypeArray(cellIds.ravel(), deep=True))
 
         pd.SetPolys(cells)
         return pd
 
-    @staticmethod
-    def scaleGeometry(polyDataList, scale):
-        if len(scale) == 1:
-            scale_x = scale_y = scale_z = scale
-        elif len(geom.float_data) == 3:
-            scale_x, scale_y, scale_z = scale
-
-        if scale_x != 1.0 or scale_y != 1.0 or scale_z != 1.0:
-            t = vtk.vtkTransform()
-            t.Scale(scale_x, scale_y, scale_z)
-            polyDataList = [filterUtils.transformPolyData(polyData, t) for polyData in polyDataList]
-
-        return polyDataList
-
     @staticmethod
     def transformGeometry(polyDataList, geom):
         if "transform" in geom:
@@ -215,10 +289,21 @@ class Geometry(object):
         return textureArray.GetValue(0)
 
     @staticmethod
-    def loadTextureForMesh(polyData, meshFileName):
+    def getTextureFile(polyData):
+        textureArray = vtk.vtkStringArray.SafeDownCast(polyData.GetFieldData().GetAbstractArray('texture_file'))
+        if not textureArray:
+            return None
+        return textureArray.GetValue(0)
 
+    @staticmethod
+    def resolveTextureFile(polyData, meshFileName):
+        '''
+        Resolves the texture_filename of a mesh relative to the mesh file and
+        stores the path in the texture_file field of polyData.  The texture
+        is loaded through meshcache when the geometry item is created.
+        '''
         textureFileName = Geometry.getTextureFileName(polyData)
-        if textureFileName in Geometry.TextureCache or textureFileName is None:
+        if textureFileName is None:
             return
 
         if not os.path.isabs(textureFileName):
@@ -231,17 +316,21 @@ class Geometry(object):
             print 'cannot find texture file:', textureFileName
             return
 
-        image = ioUtils.readImage(imageFile)
-        if not image:
-            print 'failed to load image file:', imageFile
-            return
+        textureArray = vtk.vtkStringArray()
+        textureArray.SetName('texture_file')
+        textureArray.InsertNextValue(os.path.abspath(imageFile))
+        polyData.GetFieldData().AddArray(textureArray)
 
-        texture = vtk.vtkTexture()
-        texture.SetInput(image)
-        texture.EdgeClampOn()
-        texture.RepeatOn()
+    @staticmethod
+    def loadTexture(polyData):
+        imageFile = Geometry.getTextureFile(polyData)
+        if imageFile is None:
+            return None
 
-        Geometry.TextureCache[textureFileName] = texture
+        texture = meshcache.loadTexture(imageFile)
+        if not texture:
+            print 'failed to load image file:', imageFile
+        return texture
 
     @staticmethod
     def resolvePackageFilename(filename):
@@ -259,7 +348,7 @@ class Geometry(object):
         return Geometry.PackageMap.resolveFilename(filename) or filename
 
     @staticmethod
-    def loadPolyDataMeshes(filename):
+    def loadPolyDataMeshes(filename, scale=None):
 
         filename = Geometry.resolvePackageFilename(filename)
         basename, ext = os.path.splitext(filename)
@@ -275,14 +364,11 @@ class Geometry(object):
             print 'warning, cannot find file:', filename
             return []
 
-        if filename.endswith('vtm'):
-            polyDataList = ioUtils.readMultiBlock(filename)
-        else:
-            polyDataList = [ioUtils.readPolyData(filename)]
+        polyDataList = meshcache.loadMeshes(filename, scale)
 
         if USE_TEXTURE_MESHES:
             for polyData in polyDataList:
-                Geometry.loadTextureForMesh(polyData, filename)
+                Geometry.resolveTextureFile(polyData, filename)
 
         return polyDataList
 
@@ -316,6 +402,44 @@ class Geometry(object):
             colorArray = np.asarray(channels["rgb"]) * 255
             vnp.addNumpyToVtk(polyData, colorArray.astype(np.uint8), "rgb")
 
+    @staticmethod
+    def hasSameTopology(polyData, newPolyData):
+        if polyData.GetNumberOfPoints() != newPolyData.GetNumberOfPoints():
+            return False
+        for cellType in ("Verts", "Lines", "Polys", "Strips"):
+            cells = getattr(polyData, "Get" + cellType)().GetData()
+            newCells = getattr(newPolyData, "Get" + cellType)().GetData()
+            if cells.GetNumberOfTuples() != newCells.GetNumberOfTuples():
+                return False
+            if cells.GetNumberOfTuples() and not np.array_equal(
+                    vnp.numpy_support.vtk_to_numpy(cells),
+                    vnp.numpy_support.vtk_to_numpy(newCells)):
+                return False
+        return True
+
+    @staticmethod
+    def updateItem(item, geomData, polyData):
+        '''
+        Update an existing PolyDataItem with new geometry data.  If the
+        topology of polyData matches the item's polyData, its points and
+        point data arrays are replaced in place, otherwise polyData replaces
+        the item's polyData.  The item keeps its properties either way.
+        '''
+        if "channels" in geomData:
+            Geometry.addColorChannels(polyData, geomData["channels"])
+
+        if not Geometry.hasSameTopology(item.polyData, polyData):
+            item.setPolyData(polyData)
+            return
+
+        arrayNames = item.getArrayNames()
+        item.polyData.SetPoints(polyData.GetPoints())
+        item.polyData.GetPointData().ShallowCopy(polyData.GetPointData())
+        item.polyData.Modified()
+        if item.getArrayNames() != arrayNames:
+            item._updateColorByProperty()
+        item._updateColorBy(retainColorMap=True)
+
     def __init__(self, geomData, polyData):
         if "channels" in geomData:
             Geometry.addColorChannels(polyData, geomData["channels"])
@@ -324,9 +448,7 @@ class Geometry(object):
 
         color = geomData.get("color", [1, 0, 0, 0.5])
         self.polyDataItem.setProperty('Alpha', color[3])
-        self.polyDataItem.actor.SetTexture(
-            Geometry.TextureCache.get(
-                Geometry.getTextureFileName(polyData)))
+        self.polyDataItem.actor.SetTexture(Geometry.loadTexture(polyData))
 
         if self.polyDataItem.actor.GetTexture():
             self.polyDataItem.setProperty('Color',
@@ -363,7 +485,9 @@ class TreeViewer(object):
         self.pathToItemCache = {}
         self.enable()
         self.sendStatusMessage(
-            0, ViewerResponse(ViewerStatus.OK, {"ready": True}))
+            0, ViewerResponse(ViewerStatus.OK,
+                              {"ready": True,
+                               "supported_formats": SUPPORTED_FORMATS}))
 
     def _addSubscribers(self):
         self.subscribers.append(lcmUtils.addSubscriber(
@@ -403,30 +527,30 @@ class TreeViewer(object):
 
     def decodeCommsMsg(self, msg):
         if msg.format == "treeviewer_json":
-            if msg.format_version_major == 1 and msg.format_version_minor == 0:
+            version = (msg.format_version_major, msg.format_version_minor)
+            if version == (1, 0):
                 data = json.loads(msg.data)
                 return data, ViewerResponse(ViewerStatus.OK, {})
+            elif version == (1, 1):
+                data = decodeBinaryPayload(msg.data)
+                return data, ViewerResponse(ViewerStatus.OK, {})
             else:
                 return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT_VERSION,
-                                            {"supported_formats": {
-                                                 "treeviewer_json": ["1.0"]
-                                            }})
+                                            {"supported_formats": SUPPORTED_FORMATS})
         else:
             return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT,
-                                        {"supported_formats": {
-                                             "treeviewer_json": ["1.0"]
-                                        }})
+                                        {"supported_formats": SUPPORTED_FORMATS})
 
     def onViewerRequest(self, msg):
-        tic = time.time()
-        data, response = self.decodeCommsMsg(msg)
+        try:
+            data, response = self.decodeCommsMsg(msg)
+        except ValueError as e:
+            data, response = None, ViewerResponse(ViewerStatus.ERROR_HANDLING_REQUEST,
+                                                  {"error": str(e)})
         if data is None:
-            self.sendStatusMessage(msg.utime,
-                                   [responses])
+            self.sendStatusMessage(msg.utime, response)
         else:
-            tic = time.time()
             responses = self.handleViewerRequest(data)
-            tic = time.time()
             self.sendStatusMessage(msg.utime,
                                    responses)
 
@@ -435,12 +559,12 @@ class TreeViewer(object):
         addedGeometries = set()
         setTransforms = set()
         missingPaths = set()
-        for command in data["delete"]:
-            deletedPaths.add(tuple(self.handleDeletePath(command)))
-        for command in data["load"]:
-            addedGeometries.add(tuple(self.handleAddGeometry(command)))
-        for command in data["draw"]:
-            path, missingGeometry = self.handleSetTransform(command)
+        with om.bulkUpdate():
+            for command in data["delete"]:
+                deletedPaths.add(tuple(self.handleDeletePath(command)))
+            for command in data["load"]:
+                addedGeometries.add(tuple(self.handleAddGeometry(command)))
+        for path, missingGeometry in self.handleSetTransforms(data["draw"]):
             setTransforms.add(tuple(path))
             if missingGeometry:
                 missingPaths.add(tuple(path))
@@ -457,9 +581,24 @@ class TreeViewer(object):
         else:
             return ViewerResponse(ViewerStatus.MISSING_PATHS, result)
 
+    def getGeometryItems(self, folder):
+        return [child for child in folder.children()
+                if isinstance(child, vis.PolyDataItem) and
+                child.getProperty("Name") == "geometry"]
+
     def handleAddGeometry(self, command):
         path = command["path"]
-        vtkGeoms = Geometry.createGeometry(command["geometry"])
+        geomData = command["geometry"]
+        polyDataList = Geometry.createPolyDataForGeometry(geomData)
+
+        # update existing geometry in place when the number of items matches
+        existingItems = self.getGeometryItems(self.getPathFolder(path))
+        if existingItems and len(existingItems) == len(polyDataList):
+            for item, polyData in zip(existingItems, polyDataList):
+                Geometry.updateItem(item, geomData, polyData)
+            return path
+
+        vtkGeoms = [Geometry(geomData, polyData) for polyData in polyDataList]
         return self.addGeometry(path, vtkGeoms)
 
     def addGeometry(self, path, geomItems):
@@ -472,13 +611,12 @@ class TreeViewer(object):
                 item.transform.PostMultiply()
             geomTransform.Concatenate(item.transform)
 
+        existingItems = self.getGeometryItems(folder)
         for geom in geomItems:
-            existing_item = folder.findChild("geometry")
             item = geom.polyDataItem
-            if existing_item is not None:
-                for prop in existing_item.propertyNames():
-                    item.setProperty(prop, existing_item.getProperty(prop))
-                om.removeFromObjectModel(existing_item)
+            if existingItems:
+                for prop in existingItems[0].propertyNames():
+                    item.setProperty(prop, existingItems[0].getProperty(prop))
             else:
                 item.setProperty("Point Size", 2)
                 availableColorModes = set(
@@ -492,6 +630,7 @@ class TreeViewer(object):
             om.addToObjectModel(item, parentObj=folder)
             item.actor.SetUserTransform(geomTransform)
 
+        om.removeObjects(existingItems)
         return path
 
     def getPathForItem(self, item):
@@ -499,20 +638,37 @@ class TreeViewer(object):
             item, self.getRootFolder())[:-1])]
 
     def handleSetTransform(self, command):
-        return self._setTransform(command["path"],
-                                  transformFromDict(command["transform"]))
+        return self.handleSetTransforms([command])[0]
+
+    def handleSetTransforms(self, commands):
+        '''
+        Apply a list of draw commands.  The poses of all commands are
+        converted to matrices in one pass and written into the existing
+        transforms of the path folders.  Returns a list of (path,
+        missingGeometry) pairs.
+        '''
+        if not commands:
+            return []
+
+        transforms = [command["transform"] for command in commands]
+        matrices = transformUtils.matricesFromPoses(
+            [t.get("translation", [0, 0, 0]) for t in transforms],
+            [t.get("quaternion", [1, 0, 0, 0]) for t in transforms])
+
+        return [self._setTransform(command["path"], mat)
+                for command, mat in zip(commands, matrices)]
 
-    def _setTransform(self, path, transform):
+    def _setTransform(self, path, mat):
         folder = self.getPathFolder(path)
         if not hasattr(folder, "transform"):
-            folder.transform = transform
-        else:
-            folder.transform.SetMatrix(transform.GetMatrix())
+            folder.transform = vtk.vtkTransform()
+            folder.transform.PostMultiply()
+        folder.transform.SetMatrix(mat.ravel().tolist())
         return path, len(folder.children()) == 0
 
     def handleDeletePath(self, command):
         path = command["path"]
-        item = self.getPathFolder(path)
+        item = self.getPathFolder(path, create=False)
         if item is not None:
             om.removeFromObjectModel(item)
         return path
@@ -537,17 +693,30 @@ class TreeViewer(object):
             if path in self.pathToItemCache:
                 del self.pathToItemCache[path]
 
-    def getPathFolder(self, path):
+    def getPathFolder(self, path, create=True):
+        '''
+        Returns the folder for path.  Folders of all the prefixes of path
+        are cached.  If create is False None is returned for a path that
+        does not exist.
+        '''
         path = tuple(path)
-        if path in self.pathToItemCache:
-            # print "hit for path:", path
-            return self.pathToItemCache[path]
-        else:
-            # print "miss for path:", path
-            folder = self.getRootFolder()
-            for element in path:
-                folder = om.getOrCreateContainer(element, parentObj=folder)
-                folder.connectRemovedFromObjectModel(self.onItemRemoved)
-            self.pathToItemCache[path] = folder
-            self.itemToPathCache[folder] = path
+        folder = self.pathToItemCache.get(path)
+        if folder is not None:
             return folder
+        if not path:
+            return self.getRootFolder()
+
+        parent = self.getPathFolder(path[:-1], create)
+        if parent is None:
+            return None
+
+        folder = parent.findChild(path[-1])
+        if folder is None:
+            if not create:
+                return None
+            folder = om.getOrCreateContainer(path[-1], parentObj=parent)
+
+        folder.connectRemovedFromObjectModel(self.onItemRemoved)
+        self.pathToItemCache[path] = folder
+        self.itemToPathCache[folder] = path
+        return folder
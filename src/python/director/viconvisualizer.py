@@ -22,6 +22,12 @@ class ViconVisualizer(object):
 
       viconVis.drawEdges = True
 
+      # By default the markers of a model are drawn as a single object.
+      # To draw each marker as its own object with a selectable child
+      # frame, as in earlier versions:
+
+      viconVis.drawMarkerFrames = True
+
       # By default the lcm update rate is throttled to 10 hz.
       # To increase the update rate:
 
@@ -42,6 +48,7 @@ class ViconVisualizer(object):
         self.models = {}
         self.markerGeometry = None
         self.drawEdges = False
+        self.drawMarkerFrames = False
         self.initSubscriber()
 
     def initSubscriber(self):
@@ -84,6 +91,14 @@ class ViconVisualizer(object):
         elapsed = time.time() - tNow
         #print 'rate:', 1/elapsed
 
+    def getMarkerPositions(self, model):
+        if not model.nummarkers:
+            return np.zeros((0, 3))
+        return np.array([marker.xyz for marker in model.markers])*self.unitConversion
+
+    def createMarkerObject(self, transforms, modelFolder, modelName, modelColor):
+        return vis.showInstances(self.getMarkerGeometry(), transforms, modelName + ' markers', color=modelColor, parent=modelFolder)
+
     def createMarkerObjects(self, numberOfMarkers, modelFolder, modelName, modelColor):
 
         geom = self.getMarkerGeometry()
@@ -95,38 +110,64 @@ class ViconVisualizer(object):
 
         return [makeMarker(i) for i in xrange(numberOfMarkers)]
 
-    def drawModel(self, model):
+    def drawMarkerInstances(self, modelFolder, modelName, markerPositions):
+        '''
+        Draw the markers of a model as one InstancedPolyDataItem.  Returns
+        the color of the markers.
+        '''
+        om.removeFromObjectModel(modelFolder.findChild('markers'))
 
-        modelFolder = om.getOrCreateContainer(model.name, parentObj=self.getRootFolder())
-        markerFolder = om.getOrCreateContainer('markers', parentObj=modelFolder)
-        modelName = model.name
+        markerTransforms = np.tile(np.eye(4), (len(markerPositions), 1, 1))
+        markerTransforms[:,:3,3] = markerPositions
+
+        markerObject = self.models.get(modelName)
+        if not om.hasObject(markerObject):
+            markerObject = self.createMarkerObject(markerTransforms, modelFolder, modelName, vis.getRandomColor())
+            self.models[modelName] = markerObject
+        else:
+            markerObject.setInstanceTransforms(markerTransforms)
+
+        return markerObject.getProperty('Color')
+
+    def drawMarkerObjects(self, modelFolder, modelName, markerPositions):
+        '''
+        Draw each marker of a model as a PolyDataItem with a child frame in
+        a markers folder.  Returns the color of the markers.
+        '''
+        om.removeFromObjectModel(self.models.pop(modelName, None))
 
+        markerFolder = om.getOrCreateContainer('markers', parentObj=modelFolder)
         markerObjects = markerFolder.children()
 
-        if len(markerObjects) != model.nummarkers:
+        if len(markerObjects) != len(markerPositions):
             for obj in markerObjects:
                 om.removeFromObjectModel(obj)
+            markerObjects = self.createMarkerObjects(len(markerPositions), markerFolder, modelName, vis.getRandomColor())
 
-            modelColor = vis.getRandomColor()
-            markerObjects = self.createMarkerObjects(model.nummarkers, markerFolder, modelName, modelColor)
-            self.models[modelName] = markerObjects
-
-        if len(markerObjects):
-            modelColor = markerObjects[0].getProperty('Color')
-
-        for i, marker in enumerate(model.markers):
-            xyz = np.array(marker.xyz)*self.unitConversion
+        for markerObject, xyz in zip(markerObjects, markerPositions):
             markerFrame = vtk.vtkTransform()
             markerFrame.Translate(xyz)
-            markerObjects[i].getChildFrame().copyFrame(markerFrame)
+            markerObject.getChildFrame().copyFrame(markerFrame)
+
+        return markerObjects[0].getProperty('Color') if markerObjects else vis.getRandomColor()
+
+    def drawModel(self, model):
+
+        modelFolder = om.getOrCreateContainer(model.name, parentObj=self.getRootFolder())
+        modelName = model.name
+
+        markerPositions = self.getMarkerPositions(model)
+
+        if self.drawMarkerFrames:
+            modelColor = self.drawMarkerObjects(modelFolder, modelName, markerPositions)
+        else:
+            modelColor = self.drawMarkerInstances(modelFolder, modelName, markerPositions)
 
         if self.drawEdges:
+            # one edge between each pair of markers
+            i, j = np.triu_indices(len(markerPositions), 1)
             d = DebugData()
-            for m1 in model.markers:
-                xyz = np.array(m1.xyz)*self.unitConversion
-                for m2 in model.markers:
-                    xyz2 = np.array(m2.xyz)*self.unitConversion
-                    d.addLine(xyz, xyz2)
+            d.addLines(markerPositions[i], markerPositions[j])
             edges = shallowCopy(d.getPolyData())
             vis.updatePolyData(edges, modelName + ' edges', color=modelColor, parent=modelFolder)
         else:
@@ -5,6 +5,9 @@ import director.vtkAll as vtk
 from director import transformUtils
 from director import callbacks
 from director import frameupdater
+from director import pointcloudlod
+from director import filterUtils
+import director.vtkNumpy as vnp
 from PythonQt import QtCore, QtGui
 
 import os
@@ -12,6 +15,89 @@ import colorsys
 import weakref
 import itertools
 import numpy as np
+from collections import OrderedDict
+
+
+class PickRegistry(object):
+    '''
+    Maps VTK datasets and props to the object model items that own them, so
+    that getObjectByDataSet() and getObjectByProp() do not need to search
+    every object in the object model.  Items register their VTK objects
+    when they create or replace them.  Entries are removed when an item
+    unregisters them or when the item is deleted.
+
+    A VTK object may be shared by several items, for example one polyData
+    shown by two PolyDataItems.  Its owners are kept in registration order
+    and lookups return the first owner that is still in the object model.
+
+    Items that override hasDataSet() to match datasets they have not
+    registered, such as robot models, are tracked separately and are still
+    tested with hasDataSet() on lookup.
+    '''
+
+    def __init__(self):
+        self._owners = {}
+        self._registered = {}
+        self._customObjects = weakref.WeakValueDictionary()
+
+    def register(self, obj, vtkObject):
+        if vtkObject is None:
+            return
+
+        objId = id(obj)
+        if objId not in self._registered:
+            objRef = weakref.ref(obj, lambda ref: self._removeObjectId(objId))
+            self._registered[objId] = (objRef, set())
+
+        objRef, vtkObjects = self._registered[objId]
+        vtkObjects.add(vtkObject)
+        self._owners.setdefault(vtkObject, OrderedDict())[objId] = objRef
+
+    def unregister(self, obj, vtkObject):
+        entry = self._registered.get(id(obj))
+        if entry is None or vtkObject not in entry[1]:
+            return
+        entry[1].discard(vtkObject)
+        self._removeOwner(vtkObject, id(obj))
+
+    def _removeOwner(self, vtkObject, objId):
+        owners = self._owners.get(vtkObject)
+        if owners is None:
+            return
+        owners.pop(objId, None)
+        if not owners:
+            del self._owners[vtkObject]
+
+    def _removeObjectId(self, objId):
+        objRef, vtkObjects = self._registered.pop(objId, (None, ()))
+        for vtkObject in vtkObjects:
+            self._removeOwner(vtkObject, objId)
+
+    def addCustomObject(self, obj):
+        self._customObjects[id(obj)] = obj
+
+    def getOwner(self, vtkObject, tree=None):
+        '''
+        Returns the first item that registered vtkObject and is in the given
+        object model tree, which defaults to the default object model.
+        '''
+        tree = tree or om.getDefaultObjectModel()
+        for objRef in self._owners.get(vtkObject, {}).values():
+            obj = objRef()
+            if obj is not None and obj.getObjectTree() is tree:
+                return obj
+
+    def findCustomOwner(self, dataSet, tree=None):
+        tree = tree or om.getDefaultObjectModel()
+        for obj in self._customObjects.values():
+            if obj.getObjectTree() is tree and obj.hasDataSet(dataSet):
+                return obj
+
+
+_pickRegistry = PickRegistry()
+
+def getPickRegistry():
+    return _pickRegistry
 
 
 class PolyDataItem(om.ObjectModelItem):
@@ -38,6 +124,10 @@ class PolyDataItem(om.ObjectModelItem):
         self.shadowActor = None
         self.scalarBarWidget = None
         self.extraViewRenderers = {}
+        self.lod = None
+
+        _pickRegistry.register(self, self.actor)
+        _pickRegistry.register(self, self.polyData)
 
         self.rangeMap = dict(PolyDataItem.defaultScalarRangeMap)
 
@@ -61,14 +151,16 @@ class PolyDataItem(om.ObjectModelItem):
             self.addToView(view)
 
     def _renderAllViews(self):
-        for view in self.views:
-            view.render()
+        om.renderViews(self.views)
 
     def hasDataSet(self, dataSet):
         return dataSet == self.polyData
 
     def setPolyData(self, polyData):
 
+        _pickRegistry.unregister(self, self.polyData)
+        _pickRegistry.register(self, polyData)
+
         self.polyData = polyData
         self.mapper.SetInput(polyData)
 
@@ -82,6 +174,23 @@ class PolyDataItem(om.ObjectModelItem):
     def setRangeMap(self, key, value):
         self.rangeMap[key] = value
 
+    def setLevelOfDetailEnabled(self, enabled, **kwargs):
+        '''
+        Draw a voxel decimated level of detail of the point cloud that is
+        selected per frame from the camera distance and the render time of
+        the view.  kwargs are passed to pointcloudlod.PointCloudLOD.
+        '''
+        if self.lod:
+            self.lod.close()
+            self.lod = None
+
+        if enabled:
+            self.lod = pointcloudlod.PointCloudLOD(self, **kwargs)
+            for view in self.views:
+                self.lod.addView(view)
+
+        self._renderAllViews()
+
     def getArrayNames(self):
         pointData = self.polyData.GetPointData()
         return [pointData.GetArrayName(i) for i in xrange(pointData.GetNumberOfArrays())]
@@ -134,6 +243,8 @@ class PolyDataItem(om.ObjectModelItem):
         view.renderer().AddActor(self.actor)
         if self.shadowActor:
             view.renderer().AddActor(self.shadowActor)
+        if self.lod:
+            self.lod.addView(view)
         view.render()
 
     def _onPropertyChanged(self, propertySet, propertyName):
@@ -318,7 +429,9 @@ class PolyDataItem(om.ObjectModelItem):
             view.renderer().RemoveActor(self.shadowActor)
         for renderer in self.extraViewRenderers.get(view, []):
             renderer.RemoveActor(self.actor)
-        view.render()
+        if self.lod:
+            self.lod.removeView(view)
+        om.renderViews([view])
 
 
 class TextItem(om.ObjectModelItem):
@@ -354,8 +467,7 @@ class TextItem(om.ObjectModelItem):
         view.render()
 
     def _renderAllViews(self):
-        for view in self.views:
-            view.render()
+        om.renderViews(self.views)
 
     def onRemoveFromObjectModel(self):
         om.ObjectModelItem.onRemoveFromObjectModel(self)
@@ -369,7 +481,7 @@ class TextItem(om.ObjectModelItem):
         assert view in self.views
         self.views.remove(view)
         view.renderer().RemoveActor(self.actor)
-        view.render()
+        om.renderViews([view])
 
     def _onPropertyChanged(self, propertySet, propertyName):
 
@@ -455,6 +567,7 @@ class FrameItem(PolyDataItem):
         self.widget.EnabledOff()
         self.rep = self.widget.GetRepresentation()
         self.rep.SetTransform(transform)
+        _pickRegistry.register(self, self.rep)
         self.traceData = None
         self._frameSync = None
 
@@ -492,8 +605,12 @@ class FrameItem(PolyDataItem):
         PolyDataItem.addToView(self, view)
 
     def copyFrame(self, transform):
+        '''
+        Set the frame's transform from a vtkTransform, or from a sequence
+        of 16 matrix elements in row major order.
+        '''
         self._blockSignals = True
-        self.transform.SetMatrix(transform.GetMatrix())
+        self.transform.SetMatrix(transform.GetMatrix() if hasattr(transform, 'GetMatrix') else transform)
         self._blockSignals = False
         self.transform.Modified()
         parent = self.parent()
@@ -550,6 +667,154 @@ class FrameItem(PolyDataItem):
             view.render()
 
 
+class InstancedPolyDataItem(PolyDataItem):
+    '''
+    Draws many copies of one source mesh with a single actor.  Each instance
+    has a 4x4 transform and an optional rgb color.  The instances are
+    written into one triangle mesh with numpy, so a scene with thousands of
+    copies costs one actor and one mapper instead of one per copy.
+
+    The point data arrays 'instance_id' and 'rgb' hold the instance index
+    and color of each point.  Use getInstanceIdForCell() or pickInstance()
+    to find the instance under a pick.
+
+    Usage:
+
+        item = showInstances(sphere, transforms, 'markers', colors=colors)
+        item.setInstanceTransforms(newTransforms)
+    '''
+
+    def __init__(self, name, polyData, view):
+
+        source = filterUtils.triangulatePolyData(filterUtils.computeNormals(polyData))
+        self.sourcePoints = vnp.getNumpyFromVtk(source, 'Points').copy()
+        self.sourceNormals = vnp.getNumpyFromVtk(source, 'Normals').copy()
+        self.sourceTriangles = vnp.numpy_support.vtk_to_numpy(source.GetPolys().GetData()).reshape(-1, 4)[:,1:].copy()
+
+        self.transforms = np.zeros((0, 4, 4))
+        self.colors = None
+
+        PolyDataItem.__init__(self, name, vtk.vtkPolyData(), view)
+
+    def getNumberOfInstances(self):
+        return len(self.transforms)
+
+    @staticmethod
+    def _getTransformArray(transforms):
+        if len(transforms) and not isinstance(transforms, np.ndarray) and isinstance(transforms[0], vtk.vtkTransform):
+            transforms = [transformUtils.getNumpyFromTransform(t) for t in transforms]
+        return np.array(transforms, dtype=float).reshape(-1, 4, 4)
+
+    def _computeInstancePoints(self):
+        rotations = self.transforms[:,:3,:3]
+        points = np.einsum('nij,mj->nmi', rotations, self.sourcePoints) + self.transforms[:,None,:3,3]
+        normals = np.einsum('nij,mj->nmi', rotations, self.sourceNormals)
+        return points.reshape(-1, 3), normals.reshape(-1, 3)
+
+    def _setNormals(self, polyData, normals):
+        normalsArray = vnp.getVtkFromNumpy(normals)
+        normalsArray.SetName('Normals')
+        polyData.GetPointData().SetNormals(normalsArray)
+
+    def _setColors(self, polyData):
+        if self.colors is None:
+            polyData.GetPointData().RemoveArray('rgb')
+            return
+        colors = np.repeat(self.colors, len(self.sourcePoints), axis=0)
+        polyData.GetPointData().RemoveArray('rgb')
+        vnp.addNumpyToVtk(polyData, colors, 'rgb')
+
+    def _getColorArray(self, colors):
+        '''
+        Converts colors given as floats in [0, 1] to uint8 rgb.
+        '''
+        colors = np.array(colors).reshape(-1, 3)
+        if colors.dtype != np.uint8:
+            colors = np.clip(colors*255, 0, 255).astype(np.uint8)
+        if len(colors) == 1:
+            colors = np.repeat(colors, self.getNumberOfInstances(), axis=0)
+        assert len(colors) == self.getNumberOfInstances()
+        return colors
+
+    def setInstances(self, transforms, colors=None):
+        '''
+        Set the instances from a list of vtkTransforms or an Nx4x4 array of
+        matrices.  colors may be None, one color, or one color per instance.
+        '''
+        self.transforms = self._getTransformArray(transforms)
+        self.colors = self._getColorArray(colors) if colors is not None else None
+
+        numberOfInstances = self.getNumberOfInstances()
+        pointsPerInstance = len(self.sourcePoints)
+        points, normals = self._computeInstancePoints()
+
+        offsets = np.arange(numberOfInstances)*pointsPerInstance
+        triangles = (self.sourceTriangles[None,:,:] + offsets[:,None,None]).reshape(-1, 3)
+        cells = np.empty((len(triangles), 4), dtype=vnp.numpy_support.ID_TYPE_CODE)
+        cells[:,0] = 3
+        cells[:,1:] = triangles
+
+        polyData = vtk.vtkPolyData()
+        polyData.SetPoints(vnp.getVtkPointsFromNumpy(points))
+        polys = vtk.vtkCellArray()
+        polys.SetCells(len(cells), vnp.numpy_support.numpy_to_vtkIdTypeArray(cells.ravel(), deep=True))
+        polyData.SetPolys(polys)
+
+        self._setNormals(polyData, normals)
+        vnp.addNumpyToVtk(polyData, np.repeat(np.arange(numberOfInstances, dtype=np.int32), pointsPerInstance), 'instance_id')
+        self._setColors(polyData)
+
+        self.setPolyData(polyData)
+
+    def setInstanceTransforms(self, transforms):
+        '''
+        Move the instances.  If the number of instances is unchanged only the
+        points and normals are rewritten.
+        '''
+        transforms = self._getTransformArray(transforms)
+        if len(transforms) != self.getNumberOfInstances():
+            colors = self.colors if self.colors is not None and len(self.colors) == len(transforms) else None
+            self.setInstances(transforms, colors)
+            return
+
+        self.transforms = transforms
+        points, normals = self._computeInstancePoints()
+        self.polyData.SetPoints(vnp.getVtkPointsFromNumpy(points))
+        self._setNormals(self.polyData, normals)
+        self.polyData.Modified()
+
+        if self.getProperty('Visible'):
+            self._renderAllViews()
+
+    def setInstanceColors(self, colors):
+        self.colors = self._getColorArray(colors) if colors is not None else None
+        self._setColors(self.polyData)
+        self._updateColorByProperty()
+        self._updateColorBy(retainColorMap=True)
+        self.polyData.Modified()
+
+        if self.getProperty('Visible'):
+            self._renderAllViews()
+
+    def getInstanceIdForPoint(self, pointId):
+        return pointId // len(self.sourcePoints)
+
+    def getInstanceIdForCell(self, cellId):
+        return cellId // len(self.sourceTriangles)
+
+    def pickInstance(self, displayPoint, view=None):
+        '''
+        Returns the index of the instance at the display point, or None.
+        '''
+        view = view or self.views[0]
+        picker = vtk.vtkCellPicker()
+        picker.AddPickList(self.actor)
+        picker.PickFromListOn()
+        picker.Pick(displayPoint[0], displayPoint[1], 0, view.renderer())
+        cellId = picker.GetCellId()
+        return self.getInstanceIdForCell(cellId) if cellId >= 0 else None
+
+
 class FrameTraceVisualizer(object):
 
     def __init__(self, frame):
@@ -593,6 +858,16 @@ class FrameTraceVisualizer(object):
 
 
 class FrameSync(object):
+    '''
+    Keeps a set of frames rigidly attached to each other.  When one frame is
+    modified the others are moved by the same relative motion.
+
+    Each frame has a base pose, its pose in a common reference when the
+    frame was added.  The relative transform from a modified frame to every
+    other frame is computed from the base poses as a numpy matrix and cached
+    until the base poses change, so propagating a modification costs one
+    matrix product and one SetMatrix() per synced frame.
+    '''
 
     class FrameData(object):
         def __init__(self, **kwargs):
@@ -600,6 +875,8 @@ class FrameSync(object):
 
     def __init__(self):
         self.frames = {}
+        self._frameIds = {}
+        self._relativeTransforms = {}
         self._blockCallbacks = False
         self._ids = itertools.count()
 
@@ -618,7 +895,10 @@ class FrameSync(object):
             ref=weakref.ref(frame),
             baseTransform=self._computeBaseTransform(frame),
             callbackId=callbackId,
-            ignoreIncoming=ignoreIncoming)
+            ignoreIncoming=ignoreIncoming,
+            frameKey=id(frame))
+        self._frameIds[id(frame)] = frameId
+        self._relativeTransforms.clear()
 
     def removeFrame(self, frame):
 
@@ -629,50 +909,61 @@ class FrameSync(object):
         frame.disconnectFrameModified(self.frames[frameId].callbackId)
         self._removeFrameId(frameId)
 
+    @staticmethod
+    def _getNumpyFromTransform(transform):
+        matrix = transform.GetMatrix()
+        return np.array([[matrix.GetElement(r, c) for c in xrange(4)] for r in xrange(4)])
+
     def _computeBaseTransform(self, frame):
+        '''
+        Returns the base pose of frame as a 4x4 numpy matrix, relative to
+        the current pose of any other live frame.
+        '''
+        frameTransform = self._getNumpyFromTransform(frame.transform)
 
-        currentDelta = None
         for frameId, frameData in self.frames.items():
 
-            if frameData.ref() is None:
+            otherFrame = frameData.ref()
+            if otherFrame is None:
                 self._removeFrameId(frameId)
-            elif frameData.ref() is frame:
-                continue
-            else:
-                currentDelta = transformUtils.copyFrame(frameData.baseTransform.GetLinearInverse())
-                currentDelta.Concatenate(transformUtils.copyFrame(frameData.ref().transform))
-                break
-
-        t = transformUtils.copyFrame(frame.transform)
-        t.PostMultiply()
-        if currentDelta:
-            t.Concatenate(currentDelta.GetLinearInverse())
+            elif otherFrame is not frame:
+                otherTransform = self._getNumpyFromTransform(otherFrame.transform)
+                return frameData.baseTransform.dot(np.linalg.inv(otherTransform)).dot(frameTransform)
 
-        return t
+        return frameTransform
 
     def _removeFrameId(self, frameId):
-        del self.frames[frameId]
+        frameData = self.frames.pop(frameId)
+        if self._frameIds.get(frameData.frameKey) == frameId:
+            del self._frameIds[frameData.frameKey]
+        self._relativeTransforms.clear()
 
     def _findFrameId(self, frame):
 
-        for frameId, frameData in self.frames.items():
-
-            if frameData.ref() is None:
-                self._removeFrameId(frameId)
-            elif frameData.ref() is frame:
-                return frameId
-
-    def _moveFrame(self, frameId, modifiedFrameId):
+        frameId = self._frameIds.get(id(frame))
+        if frameId is None:
+            return None
 
         frameData = self.frames[frameId]
-        modifiedFrameData = self.frames[modifiedFrameId]
+        if frameData.ref() is frame:
+            return frameId
 
-        t = vtk.vtkTransform()
-        t.PostMultiply()
-        t.Concatenate(frameData.baseTransform)
-        t.Concatenate(modifiedFrameData.baseTransform.GetLinearInverse())
-        t.Concatenate(modifiedFrameData.ref().transform)
-        frameData.ref().copyFrame(t)
+        # the id belonged to a frame that has been deleted
+        self._removeFrameId(frameId)
+
+    def _getRelativeTransforms(self, modifiedFrameId):
+        '''
+        Returns a list of (frameData, relativeTransform) for the frames that
+        follow the modified frame, where the new pose of each frame is
+        modifiedFramePose * relativeTransform.
+        '''
+        relativeTransforms = self._relativeTransforms.get(modifiedFrameId)
+        if relativeTransforms is None:
+            baseInverse = np.linalg.inv(self.frames[modifiedFrameId].baseTransform)
+            relativeTransforms = [(frameData, baseInverse.dot(frameData.baseTransform))
+                                   for frameId, frameData in sorted(self.frames.items()) if frameId != modifiedFrameId]
+            self._relativeTransforms[modifiedFrameId] = relativeTransforms
+        return relativeTransforms
 
     def _onFrameModified(self, frame):
 
@@ -686,19 +977,29 @@ class FrameSync(object):
 
         if self.frames[modifiedFrameId].ignoreIncoming:
             self.frames[modifiedFrameId].baseTransform = self._computeBaseTransform(frame)
+            self._relativeTransforms.clear()
             return
 
+        modifiedTransform = self._getNumpyFromTransform(frame.transform)
+        deadFrames = []
+
         self._blockCallbacks = True
 
-        for frameId, frameData in self.frames.items():
-            if frameData.ref() is None:
-                self._removeFrameId(frameId)
-            elif frameId != modifiedFrameId:
+        try:
+            for frameData, relativeTransform in self._getRelativeTransforms(modifiedFrameId):
+                syncedFrame = frameData.ref()
+                if syncedFrame is None:
+                    deadFrames.append(frameData)
+                    continue
 
-                #print '  ', self, 'moving:', self.frames[frameId].ref().getProperty('Name')
-                self._moveFrame(frameId, modifiedFrameId)
+                #print '  ', self, 'moving:', syncedFrame.getProperty('Name')
+                syncedFrame.copyFrame(modifiedTransform.dot(relativeTransform).ravel().tolist())
+        finally:
+            self._blockCallbacks = False
 
-        self._blockCallbacks = False
+        for frameId, frameData in self.frames.items():
+            if frameData in deadFrames:
+                self._removeFrameId(frameId)
 
 
 class ViewOptionsItem(om.ObjectModelItem):
@@ -894,6 +1195,18 @@ def showPolyData(polyData, name, color=None, colorByName=None, colorByRange=None
     return item
 
 
+def showInstances(polyData, transforms, name, colors=None, **kwargs):
+    '''
+    Show copies of polyData at each of the given transforms as a single
+    InstancedPolyDataItem.  kwargs are passed to showPolyData().
+    '''
+    item = showPolyData(polyData, name, cls=InstancedPolyDataItem, **kwargs)
+    item.setInstances(transforms, colors)
+    if colors is not None:
+        item.setProperty('Color By', 'rgb')
+    return item
+
+
 def addChildFrame(obj, initialTransform=None):
     '''
     Adds a child frame to the given PolyDataItem.  If initialTransform is given,
@@ -1097,10 +1410,12 @@ def pickPoint(displayPoint, view, obj=None, pickType='points', tolerance=0.01, r
             picker.AddPickList(obj.actor)
         picker.PickFromListOn()
 
-    picker.Pick(displayPoint[0], displayPoint[1], 0, view.renderer())
-    pickedProp = picker.GetViewProp()
-    pickedPoint = np.array(picker.GetPickPosition())
-    pickedDataset = pickedProp.GetMapper().GetInput() if isinstance(pickedProp, vtk.vtkActor) else None
+    # level of detail point clouds are picked at full resolution
+    with pointcloudlod.fullResolution():
+        picker.Pick(displayPoint[0], displayPoint[1], 0, view.renderer())
+        pickedProp = picker.GetViewProp()
+        pickedPoint = np.array(picker.GetPickPosition())
+        pickedDataset = pickedProp.GetMapper().GetInput() if isinstance(pickedProp, vtk.vtkActor) else None
 
     pickedNormal = np.zeros(3)
 
@@ -1132,17 +1447,31 @@ def mapMousePosition(widget, mouseEvent):
     return mousePosition.x(), widget.height - mousePosition.y()
 
 
+def _hasCustomDataSetTest(obj):
+    hasDataSet = getattr(type(obj).hasDataSet, 'im_func', None)
+    return hasDataSet not in (om.ObjectModelItem.hasDataSet.im_func, PolyDataItem.hasDataSet.im_func)
+
+
+def _onObjectAdded(objectModel, obj):
+    if _hasCustomDataSetTest(obj):
+        _pickRegistry.addCustomObject(obj)
+
+om.getDefaultObjectModel().connectObjectAdded(_onObjectAdded)
+for _obj in om.getObjects():
+    _onObjectAdded(om.getDefaultObjectModel(), _obj)
+
+
 def getObjectByDataSet(polyData):
-    for obj in om.getObjects():
-        if obj.hasDataSet(polyData):
-            return obj
+    if polyData is None:
+        return None
+    return _pickRegistry.getOwner(polyData) or _pickRegistry.findCustomOwner(polyData)
 
 def getObjectByProp(prop):
     if not prop:
         return None
-    for obj in om.getObjects():
-        if isinstance(obj, FrameItem) and obj.widget.GetRepresentation() == prop:
-            return obj
+    obj = _pickRegistry.getOwner(prop)
+    if obj is not None:
+        return obj
     if isinstance(prop, vtk.vtkActor):
         return getObjectByDataSet(prop.GetMapper().GetInput())
 
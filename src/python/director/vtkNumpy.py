@@ -18,12 +18,13 @@ def numpyToPolyData(pts, pointData=None, createVertexCells=False):
             addNumpyToVtk(pd, value.copy(), key)
 
     if createVertexCells:
-        cellIds = vtk.vtkIdList()
-        cellIds.SetNumberOfIds(pd.GetNumberOfPoints())
-        for i in range(pd.GetNumberOfPoints()):
-            cellIds.SetId(i, i)
+        # a single poly vertex cell with the ids of all the points
+        numberOfPoints = pd.GetNumberOfPoints()
+        cellIds = np.empty(numberOfPoints + 1, dtype=numpy_support.ID_TYPE_CODE)
+        cellIds[0] = numberOfPoints
+        cellIds[1:] = np.arange(numberOfPoints)
         cells = vtk.vtkCellArray()
-        cells.InsertNextCell(cellIds)
+        cells.SetCells(1, numpy_support.numpy_to_vtkIdTypeArray(cellIds, deep=True))
         pd.SetVerts(cells)
 
     return pd
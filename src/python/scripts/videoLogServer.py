@@ -8,9 +8,13 @@ import glob
 import json
 import re
 import select
+import hashlib
+import zipfile
 import numpy as np
+from collections import OrderedDict
 
 from director import lcmspy as spy
+from director import lcmlog
 
 
 VIDEO_LCM_URL = 'udpm://239.255.76.50:7650?ttl=1'
@@ -26,22 +30,59 @@ class FieldData(object):
         return 'FieldData(%s)' % ', '.join(['%s=%r' % (k,v) for k, v in self.__dict__.iteritems()])
 
 
-def getRecentUtimes(utimeMap, seconds):
-
-    utimes = np.array(utimeMap.keys())
-    if not len(utimes):
-        return None
-
-    utimes.sort()
-    endTime = utimes[-1]
-    startTime = max(0, endTime - seconds*1e6)
-    startIndex = utimes.searchsorted(startTime)
-    utimes = utimes[startIndex:]
-
-    if not len(utimes):
-        return None
-
-    return utimes
+class UtimeCatalog(object):
+    '''
+    A snapshot of the cataloged video frames.  Frames are stored as arrays
+    sorted by utime, with the index of the log file and the file position
+    of each frame.  Lookups use binary search on the utimes array.
+    '''
+
+    def __init__(self, utimes=None, fileIndices=None, filePositions=None, filenames=None):
+        self.utimes = utimes if utimes is not None else np.zeros(0, dtype=np.int64)
+        self.fileIndices = fileIndices if fileIndices is not None else np.zeros(0, dtype=np.int32)
+        self.filePositions = filePositions if filePositions is not None else np.zeros(0, dtype=np.int64)
+        self.filenames = filenames or []
+
+    def __len__(self):
+        return len(self.utimes)
+
+    def findIndex(self, utime):
+        '''
+        Returns the index of the first frame with utime >= the given utime,
+        clipped to the last frame.
+        '''
+        index = self.utimes.searchsorted(utime)
+        return min(index, len(self.utimes)-1)
+
+    def findPlaybackIndex(self, utime, direction):
+        '''
+        Returns the index of the frame to show at utime during playback.
+        Forward playback uses the first frame with utime >= the given utime
+        and reverse playback uses the last frame with utime <= the given
+        utime.  Returns None past the end of the catalog.
+        '''
+        if direction > 0:
+            index = self.utimes.searchsorted(utime)
+        else:
+            index = self.utimes.searchsorted(utime, side='right') - 1
+
+        if index < 0 or index == len(self.utimes):
+            return None
+        return index
+
+    def getLocation(self, index):
+        return self.filenames[self.fileIndices[index]], int(self.filePositions[index])
+
+    def getRecent(self, seconds):
+        '''
+        Returns a new catalog containing only the frames in the last
+        given number of seconds.
+        '''
+        if not len(self.utimes):
+            return self
+        startIndex = self.utimes.searchsorted(self.utimes[-1] - seconds*1e6)
+        return UtimeCatalog(self.utimes[startIndex:], self.fileIndices[startIndex:],
+                            self.filePositions[startIndex:], self.filenames)
 
 
 class LCMPoller(object):
@@ -57,25 +98,46 @@ class LCMPoller(object):
 
 
 class LogLookup(object):
-
-    def __init__(self):
-        self.utimeMap = None
+    '''
+    Loads video frames from the log files of a UtimeCatalog.  By default the
+    log files are memory mapped.  With mapped=False regular file reads are
+    used instead, which is better for the prefetch thread because file reads
+    release the GIL.
+    '''
+
+    def __init__(self, mapped=True):
+        self.catalog = None
+        self.mapped = mapped
         self.logs = {}
 
-    def setUtimeMap(self, utimeMap):
-        self.utimeMap = utimeMap
-
-    def getImage(self, utime):
-        filename, filepos = self.utimeMap[utime]
+    def setCatalog(self, catalog):
+        self.catalog = catalog
 
+    def getLog(self, filename):
         log = self.logs.get(filename)
         if log is None:
-            log = lcm.EventLog(filename, 'r')
+            log = lcmlog.MappedEventLog(filename) if self.mapped else open(filename, 'rb')
             self.logs[filename] = log
+        return log
+
+    def readEvent(self, filename, filepos):
+        log = self.getLog(filename)
 
-        log.seek(filepos)
-        event = log.read_next_event()
-        msg = spy.decodeMessage(event.data)
+        if not self.mapped:
+            return lcmlog.readEvent(log, filepos)
+
+        event = log.readEventAt(filepos)
+
+        # the log may have grown since it was mapped
+        if event is None and log.refresh():
+            event = log.readEventAt(filepos)
+        return event
+
+    def getImage(self, utime):
+        filename, filepos = self.catalog.getLocation(self.catalog.findIndex(utime))
+
+        event = self.readEvent(filename, filepos)
+        msg = spy.decodeMessage(str(event.data))
 
         if hasattr(msg, 'images'):
             msg = msg.images[0]
@@ -87,18 +149,132 @@ class LogLookup(object):
         self.logs = {}
 
 
+class FrameCache(object):
+    '''
+    A thread safe LRU cache of loaded frames keyed by utime.
+    '''
+
+    def __init__(self, maxSize=300):
+        self.maxSize = maxSize
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, utime):
+        with self.lock:
+            return utime in self.frames
+
+    def get(self, utime):
+        with self.lock:
+            frame = self.frames.pop(utime, None)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames[utime] = frame
+            self.hits += 1
+            return frame
+
+    def add(self, utime, frame):
+        with self.lock:
+            self.frames.pop(utime, None)
+            self.frames[utime] = frame
+            while len(self.frames) > self.maxSize:
+                self.frames.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+
+    def resetStatistics(self):
+        self.hits = 0
+        self.misses = 0
+
+
+class PrefetchThread(object):
+    '''
+    Loads the frames ahead of the current playback position into a
+    FrameCache.  The playback thread calls setPosition() each time it
+    publishes a frame.  The direction is +1 for forward playback and -1 for
+    reverse playback.
+    '''
+
+    def __init__(self, catalog, frameCache, readAheadFrames, direction=1):
+        self.catalog = catalog
+        self.frameCache = frameCache
+        self.readAheadFrames = readAheadFrames
+        self.direction = direction
+        self.logLookup = LogLookup(mapped=False)
+        self.logLookup.setCatalog(catalog)
+        self.position = 0
+        self.condition = threading.Condition()
+        self.shouldStop = False
+
+    def start(self):
+        self.shouldStop = False
+        self.thread = threading.Thread(target=self.mainLoop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.shouldStop = True
+            self.condition.notify()
+        self.thread.join()
+        self.logLookup.closeLogs()
+
+    def setPosition(self, index):
+        with self.condition:
+            self.position = index
+            self.condition.notify()
+
+    def getNextIndexToLoad(self):
+        utimes = self.catalog.utimes
+        for i in xrange(1, self.readAheadFrames + 1):
+            index = self.position + i*self.direction
+            if index < 0 or index >= len(utimes):
+                return None
+            if utimes[index] not in self.frameCache:
+                return index
+        return None
+
+    def mainLoop(self):
+        while True:
+
+            with self.condition:
+                index = self.getNextIndexToLoad()
+                while index is None and not self.shouldStop:
+                    self.condition.wait(0.1)
+                    index = self.getNextIndexToLoad()
+                if self.shouldStop:
+                    break
+
+            utime = self.catalog.utimes[index]
+            self.frameCache.add(utime, self.logLookup.getImage(utime))
+
+
 class PlayThread(object):
 
-    def __init__(self, utimes, logLookup, speed):
+    def __init__(self, catalog, startIndex, logLookup, speed, frameCache, readAheadFrames=30):
         self.fps = 60
         self.shouldStop = False
-        self.utimes = utimes
+        self.catalog = catalog
+        self.utimes = catalog.utimes
+        self.startIndex = startIndex
         self.logLookup = logLookup
         self.speed = speed
+        self.frameCache = frameCache
+        self.direction = 1 if speed >= 0 else -1
+        self.prefetchThread = PrefetchThread(catalog, frameCache, readAheadFrames, self.direction)
+        self.framesPublished = 0
+        self.framesDropped = 0
         self.lc = lcm.LCM(VIDEO_LCM_URL)
 
     def start(self):
         self.shouldStop = False
+        self.frameCache.resetStatistics()
+        self.prefetchThread.setPosition(self.startIndex)
+        self.prefetchThread.start()
         self.thread = threading.Thread(target=self.mainLoop)
         self.thread.daemon = True
         self.thread.start()
@@ -106,38 +282,67 @@ class PlayThread(object):
     def stop(self):
         self.shouldStop = True
         self.thread.join()
+        self.prefetchThread.stop()
+
+    def getFrame(self, utime):
+        frame = self.frameCache.get(utime)
+        if frame is None:
+            frame = self.logLookup.getImage(utime)
+            self.frameCache.add(utime, frame)
+        return frame
+
+    def printStatistics(self):
+        print 'frames published: %d    dropped: %d    cache hits: %d    cache misses: %d' % (self.framesPublished, self.framesDropped, self.frameCache.hits, self.frameCache.misses)
 
     def mainLoop(self):
         startTime = time.time()
+        startUtime = self.utimes[self.startIndex]
+        lastIndex = None
 
         while not self.shouldStop:
 
             elapsedUtime = int(1e6 * (time.time() - startTime)*self.speed)
+            utimeTarget = startUtime + elapsedUtime
 
-            utimeIndex = self.utimes.searchsorted(self.utimes[0] + elapsedUtime)
-
-            if utimeIndex == len(self.utimes):
+            utimeIndex = self.catalog.findPlaybackIndex(utimeTarget, self.direction)
+            if utimeIndex is None:
                 break
 
+            # the video frame has not changed since the last publish
+            if utimeIndex == lastIndex:
+                time.sleep(1.0 / self.fps)
+                continue
+
+            if lastIndex is not None:
+                self.framesDropped += abs(utimeIndex - lastIndex) - 1
+            lastIndex = utimeIndex
+
+            self.prefetchThread.setPosition(utimeIndex)
+
             utimeRequest = self.utimes[utimeIndex]
-            image, filename = self.logLookup.getImage(utimeRequest)
+            image, filename = self.getFrame(utimeRequest)
 
-            print 'elapsed:  %.2f    index: %d    play jitter:  %.3f' % (elapsedUtime*1e-6, utimeIndex, (utimeRequest - (self.utimes[0] + elapsedUtime)  )*1e-6)
+            print 'elapsed:  %.2f    index: %d    play jitter:  %.3f' % (elapsedUtime*1e-6, utimeIndex, (utimeRequest - utimeTarget)*1e-6)
 
             self.lc.publish('VIDEO_PLAYBACK_IMAGE', image.encode())
+            self.framesPublished += 1
 
             time.sleep(1.0 / self.fps)
 
+        self.printStatistics()
+
 
 class ServerThread(object):
 
-    def __init__(self, sharedUtimeMap):
+    def __init__(self, catalogThread):
 
-        self.sharedUtimeMap = sharedUtimeMap
+        self.catalogThread = catalogThread
         self.utimes = None
         self.playbackThread = None
         self.syncThread = None
         self.timeWindow = 60
+        self.readAheadFrames = 30
+        self.frameCache = FrameCache(maxSize=300)
         self.logLookup = LogLookup()
         self.lc = lcm.LCM(VIDEO_LCM_URL)
         self.lc.subscribe('VIDEO_PLAYBACK_CONTROL', self.onControlMessage)
@@ -155,7 +360,7 @@ class ServerThread(object):
     def getUtimeIndex(self, data):
 
         assert 0.0 <= data.value <= 1.0
-        return (len(self.utimes)-1)*data.value
+        return int((len(self.utimes)-1)*data.value)
 
 
     def onFrameRequest(self, data):
@@ -164,19 +369,26 @@ class ServerThread(object):
 
         if self.utimes is None:
 
-            self.logLookup.setUtimeMap(dict(self.sharedUtimeMap))
-            self.utimes = getRecentUtimes(self.logLookup.utimeMap, seconds=self.timeWindow)
+            catalog = self.catalogThread.getCatalog().getRecent(self.timeWindow)
 
-            if self.utimes is None:
+            if not len(catalog):
                 print 'no utimes cataloged'
                 return
 
+            self.logLookup.setCatalog(catalog)
+            self.utimes = catalog.utimes
+
             print 'starting review with utimes %d %d' % (self.utimes[0], self.utimes[1])
 
 
         utimeIndex = self.getUtimeIndex(data)
         utimeRequest = self.utimes[utimeIndex]
-        image, filename = self.logLookup.getImage(utimeRequest)
+
+        frame = self.frameCache.get(utimeRequest)
+        if frame is None:
+            frame = self.logLookup.getImage(utimeRequest)
+            self.frameCache.add(utimeRequest, frame)
+        image, filename = frame
 
         print 'location: %.2f  index: %d  utime: %d   timeDelta:  %.3f    file: %s' % (data.value, utimeIndex, utimeRequest, (self.utimes[-1] - self.utimes[utimeIndex])*1e-6, os.path.basename(filename))
 
@@ -186,6 +398,7 @@ class ServerThread(object):
     def onResume(self, data):
         self.stopPlaybackThread()
         self.utimes = None
+        self.frameCache.clear()
         self.logLookup.closeLogs()
         return
 
@@ -199,8 +412,8 @@ class ServerThread(object):
             return
 
         startIndex = self.getUtimeIndex(data)
-        playbackUtimes = self.utimes[startIndex:]
-        self.playbackThread = PlayThread(playbackUtimes, self.logLookup, speed=data.speed)
+        self.playbackThread = PlayThread(self.logLookup.catalog, startIndex, self.logLookup, speed=data.speed,
+                                         frameCache=self.frameCache, readAheadFrames=self.readAheadFrames)
         self.playbackThread.start()
 
 
@@ -215,7 +428,7 @@ class ServerThread(object):
 
 
     def onLogSync(self):
-        self.syncThread = LogSyncThread(self.sharedUtimeMap)
+        self.syncThread = LogSyncThread(self.catalogThread)
         self.syncThread.start()
 
 
@@ -248,9 +461,9 @@ class ServerThread(object):
 
 class LogSyncThread(object):
 
-    def __init__(self, sharedUtimeMap):
+    def __init__(self, catalogThread):
 
-        self.sharedUtimeMap = sharedUtimeMap
+        self.catalogThread = catalogThread
         self.utimes = None
         self.logLookup = LogLookup()
         self.lastPublishTime = time.time()
@@ -282,20 +495,16 @@ class LogSyncThread(object):
 
     def onFrameRequest(self, utimeRequest):
 
-        if self.logLookup.utimeMap is None:
-
-            self.logLookup.setUtimeMap(dict(self.sharedUtimeMap))
-            assert len(self.logLookup.utimeMap)
+        if self.logLookup.catalog is None:
 
-            self.utimes = np.array(self.logLookup.utimeMap.keys())
-            self.utimes.sort()
+            catalog = self.catalogThread.getCatalog()
+            assert len(catalog)
 
+            self.logLookup.setCatalog(catalog)
+            self.utimes = catalog.utimes
 
-        requestIndex = self.utimes.searchsorted(utimeRequest)
-
-        if requestIndex >= len(self.utimes):
-            requestIndex = len(self.utimes)-1
 
+        requestIndex = self.logLookup.catalog.findIndex(utimeRequest)
         utimeFrame =  self.utimes[requestIndex]
 
 
@@ -320,6 +529,137 @@ class LogSyncThread(object):
           poll.handleLCM()
 
 
+class LogFileIndex(object):
+    '''
+    The utimes and file positions of the video frames in a single log file.
+    The index is extended incrementally as the log file grows, and it is
+    persisted to an npz file so that it does not need to be rebuilt when
+    the server restarts.
+
+    The persisted index records the inode of the log file and a hash of its
+    first signatureSize bytes.  A log file that was replaced or rewritten
+    under the same name does not match them and is indexed again.  The
+    modification time is not used because it changes while a log file is
+    still being written.
+    '''
+
+    signatureSize = 4096
+
+    def __init__(self, filename, channel, indexDir):
+        self.filename = filename
+        self.channel = channel
+        self.indexFile = os.path.join(indexDir, os.path.basename(filename) + '.npz')
+        self.utimes = np.zeros(0, dtype=np.int64)
+        self.filePositions = np.zeros(0, dtype=np.int64)
+        self.scanPosition = 0
+        self.lastSaveTime = 0.0
+        self.needsSave = False
+        self.log = None
+        self.load()
+
+    def load(self):
+
+        if not os.path.isfile(self.indexFile):
+            return
+
+        try:
+            with np.load(self.indexFile) as data:
+                channel = str(data['channel'])
+                scanPosition = int(data['scanPosition'])
+                signature = (int(data['inode']), str(data['headerHash']))
+                utimes = data['utimes'].astype(np.int64)
+                filePositions = data['filePositions'].astype(np.int64)
+        except (IOError, KeyError, ValueError, zipfile.BadZipfile) as e:
+            print 'discarding unreadable index file %s: %s' % (self.indexFile, e)
+            return
+
+        # the index is stale if it was built for another channel, if the
+        # log file is now smaller than the indexed part of it, or if the
+        # log file was replaced or rewritten
+        if (channel != self.channel or scanPosition > os.path.getsize(self.filename)
+            or signature != self.getFileSignature(scanPosition)):
+            print 'discarding stale index file:', self.indexFile
+            return
+
+        self.utimes = utimes
+        self.filePositions = filePositions
+        self.scanPosition = scanPosition
+
+    def getFileSignature(self, scanPosition):
+        '''
+        Returns the (inode, headerHash) of the log file, hashing at most
+        scanPosition bytes so that the signature of an index does not
+        depend on data that was written after it was saved.
+        '''
+        with open(self.filename, 'rb') as f:
+            header = f.read(min(self.signatureSize, scanPosition))
+            return os.fstat(f.fileno()).st_ino, hashlib.sha1(header).hexdigest()
+
+    def save(self):
+        indexDir = os.path.dirname(self.indexFile)
+        if not os.path.isdir(indexDir):
+            os.makedirs(indexDir)
+
+        # write to a temporary file first so that a partially written index
+        # is never loaded
+        inode, headerHash = self.getFileSignature(self.scanPosition)
+        tempFile = self.indexFile + '.tmp'
+        with open(tempFile, 'wb') as f:
+            np.savez(f, channel=self.channel, scanPosition=self.scanPosition,
+                     inode=inode, headerHash=headerHash,
+                     utimes=self.utimes, filePositions=self.filePositions)
+        os.rename(tempFile, self.indexFile)
+
+        self.lastSaveTime = time.time()
+        self.needsSave = False
+
+    def remove(self):
+        self.close()
+        if os.path.isfile(self.indexFile):
+            os.remove(self.indexFile)
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+
+    def update(self):
+        '''
+        Scan the part of the log file that has not been indexed yet.
+        Returns True if new frames were found.
+        '''
+        if os.path.getsize(self.filename) == self.scanPosition:
+            return False
+
+        if self.log is None:
+            self.log = lcmlog.MappedEventLog(self.filename)
+        else:
+            self.log.refresh()
+
+        utimes = []
+        filePositions = []
+
+        for event in self.log.iterEvents(self.scanPosition):
+            self.scanPosition = event.nextOffset
+            if event.channel == self.channel:
+                utimes.append(event.timestamp)
+                filePositions.append(event.offset)
+
+        if not utimes:
+            return False
+
+        self.utimes = np.concatenate([self.utimes, np.array(utimes, dtype=np.int64)])
+        self.filePositions = np.concatenate([self.filePositions, np.array(filePositions, dtype=np.int64)])
+
+        if np.any(np.diff(self.utimes) < 0):
+            order = np.argsort(self.utimes, kind='mergesort')
+            self.utimes = self.utimes[order]
+            self.filePositions = self.filePositions[order]
+
+        self.needsSave = True
+        return True
+
+
 class CatalogThread(object):
 
 
@@ -327,12 +667,15 @@ class CatalogThread(object):
 
         self.videoChannel = videoChannel
         self.logDir = logDir
+        self.indexDir = os.path.join(logDir, '.videoindex')
 
         self.pruneEnabled = True
         self.maxNumberOfFiles = 30
         self.cropTimeWindow = 60*30
-        self.utimeMap = {}
-        self.catalog = {}
+        self.indexSaveInterval = 10.0
+        self.fileIndexes = {}
+        self.catalog = UtimeCatalog()
+        self.lock = threading.Lock()
 
 
     def start(self):
@@ -344,6 +687,7 @@ class CatalogThread(object):
     def stop(self):
         self.shouldStop = True
         self.thread.join()
+        self.saveIndexes(force=True)
 
     def mainLoop(self):
         while not self.shouldStop:
@@ -351,6 +695,11 @@ class CatalogThread(object):
             time.sleep(0.3)
 
 
+    def getCatalog(self):
+        with self.lock:
+            return self.catalog
+
+
     def updateCatalog(self):
 
         logFiles = self.getExistingLogFiles(self.logDir)
@@ -358,59 +707,60 @@ class CatalogThread(object):
         if self.pruneEnabled:
             logFiles = self.pruneLogFiles(logFiles, self.maxNumberOfFiles)
 
-        for logFile in logFiles:
-            self.updateLogInfo(logFile)
+        modified = False
 
+        for filename in self.fileIndexes.keys():
+            if filename not in logFiles:
+                self.fileIndexes.pop(filename).remove()
+                modified = True
 
-    def updateLogInfo(self, filename):
+        for logFile in logFiles:
+            if self.updateLogInfo(logFile):
+                modified = True
 
-        fieldData = self.catalog.get(filename)
+        self.saveIndexes()
 
-        if not fieldData:
-            print 'discovered new file:', filename
-            fieldData = FieldData(filename=filename, fileSize=0, lastFilePos=0, channelTypes={})
-            self.catalog[filename] = fieldData
-            self.cropUtimeMap(self.utimeMap, self.cropTimeWindow)
+        if modified:
+            self.rebuildCatalog(logFiles)
 
 
-        log = lcm.EventLog(filename, 'r')
-        fileSize = log.size()
+    def updateLogInfo(self, filename):
 
-        # if the log file is the same size as the last time it was inspected
-        # then there is no more work to do, return.
-        if fileSize == fieldData.fileSize:
-            return
+        fileIndex = self.fileIndexes.get(filename)
 
-        fieldData.fileSize = fileSize
+        if not fileIndex:
+            print 'discovered new file:', filename
+            fileIndex = LogFileIndex(filename, self.videoChannel, self.indexDir)
+            self.fileIndexes[filename] = fileIndex
+            fileIndex.update()
+            return True
 
-        # seek to the last processed event, if one exists, then read past it
-        if fieldData.lastFilePos > 0:
-            log.seek(fieldData.lastFilePos)
-            event = log.read_next_event()
+        return fileIndex.update()
 
 
-        while True:
+    def saveIndexes(self, force=False):
+        now = time.time()
+        for fileIndex in self.fileIndexes.values():
+            if fileIndex.needsSave and (force or now - fileIndex.lastSaveTime > self.indexSaveInterval):
+                fileIndex.save()
 
-            filepos = log.tell()
-            event = log.read_next_event()
-            if not event:
-                break
 
-            fieldData.lastFilePos = filepos
-            timestamp = event.timestamp
-            channel = event.channel
+    def rebuildCatalog(self, logFiles):
 
-            if channel == self.videoChannel:
-                self.utimeMap[timestamp] = (filename, filepos)
+        fileIndexes = [self.fileIndexes[filename] for filename in logFiles]
 
+        utimes = np.concatenate([f.utimes for f in fileIndexes] or [np.zeros(0, dtype=np.int64)])
+        filePositions = np.concatenate([f.filePositions for f in fileIndexes] or [np.zeros(0, dtype=np.int64)])
+        fileIndices = np.concatenate([np.repeat(np.int32(i), len(f.utimes)) for i, f in enumerate(fileIndexes)] or [np.zeros(0, dtype=np.int32)])
 
-            # maintain a catalog of channelName->messageType
-            #if channel not in fieldData.channelTypes:
-            #    messageClass = spy.getMessageClass(event.data)
-            #    fieldData.channelTypes[channel] = messageClass
+        # log files are sorted by name, so the arrays are usually sorted
+        # already and the stable sort is cheap
+        order = np.argsort(utimes, kind='mergesort')
+        catalog = UtimeCatalog(utimes[order], fileIndices[order], filePositions[order], list(logFiles))
+        catalog = catalog.getRecent(self.cropTimeWindow)
 
-
-        log.close()
+        with self.lock:
+            self.catalog = catalog
 
 
     @staticmethod
@@ -444,20 +794,6 @@ class CatalogThread(object):
         return logFiles
 
 
-    @staticmethod
-    def cropUtimeMap(utimeMap, timeWindow):
-
-        if not len(utimeMap):
-            return
-
-        utimes = getRecentUtimes(utimeMap, timeWindow)
-        cropTime = utimes[0]
-
-        for utime in utimeMap.keys():
-            if utime < cropTime:
-                del utimeMap[utime]
-
-
 def main():
 
     try:
@@ -472,7 +808,7 @@ def main():
     catalogThread.start()
 
 
-    serverThread = ServerThread(catalogThread.utimeMap)
+    serverThread = ServerThread(catalogThread)
     serverThread.start()
 
     try:
@@ -481,6 +817,8 @@ def main():
     except KeyboardInterrupt:
         pass
 
+    catalogThread.stop()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,96 @@
+import time
+from director import callbacks
+
+
+class Listener(object):
+
+    def __init__(self):
+        self.values = []
+
+    def onValue(self, value):
+        self.values.append(value)
+
+
+def testConnectDisconnect():
+
+    registry = callbacks.CallbackRegistry(['value'])
+    listener = Listener()
+    values = []
+
+    cid = registry.connect('value', listener.onValue)
+    assert registry.connect('value', listener.onValue) == cid
+    otherCid = registry.connect('value', values.append)
+
+    registry.process('value', 1)
+    assert listener.values == [1]
+    assert values == [1]
+    assert len(registry.getCallbacks('value')) == 2
+
+    registry.disconnect(cid)
+    registry.process('value', 2)
+    assert listener.values == [1]
+    assert values == [1, 2]
+
+    # a callback may disconnect itself during dispatch
+    def disconnectSelf(value):
+        registry.disconnect(selfCid)
+    selfCid = registry.connect('value', disconnectSelf)
+    registry.process('value', 3)
+    registry.process('value', 4)
+    assert values == [1, 2, 3, 4]
+    assert len(registry.getCallbacks('value')) == 1
+
+    try:
+        registry.process('unknown signal')
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def testDeadReferences():
+
+    registry = callbacks.CallbackRegistry(['value'])
+    listener = Listener()
+    registry.connect('value', listener.onValue)
+    del listener
+
+    registry.process('value', 1)
+    assert registry.getCallbacks('value') == []
+    assert registry.callbacks['value'] == {}
+
+
+def testStatistics():
+
+    registry = callbacks.CallbackRegistry(['value'])
+    listener = Listener()
+    registry.connect('value', listener.onValue)
+    registry.connect('value', lambda value: time.sleep(0.01))
+
+    registry.process('value', 1)
+    assert registry.getStatistics() == []
+
+    registry.enableStatistics()
+    for i in xrange(3):
+        registry.process('value', i)
+
+    stats = dict((s['callback'].rsplit('.', 1)[-1], s) for s in registry.getStatistics())
+    assert sorted(stats.keys()) == ['<lambda>', 'onValue']
+    assert stats['<lambda>']['count'] == 3
+    assert stats['onValue']['count'] == 3
+    assert stats['<lambda>']['time'] > 0
+    assert registry.statistics['value']['count'] == 3
+    assert listener.values == [1, 0, 1, 2]
+
+    registry.enableStatistics(False)
+    assert registry.getStatistics() == []
+
+
+def main():
+    testConnectDisconnect()
+    testDeadReferences()
+    testStatistics()
+
+
+if __name__ == '__main__':
+    main()
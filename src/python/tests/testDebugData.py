@@ -0,0 +1,111 @@
+import numpy as np
+from director.debugVis import DebugData
+from director import vtkNumpy as vnp
+from director import transformUtils
+
+
+def testLines():
+
+    starts = np.random.rand(100, 3)
+    ends = starts + np.random.rand(100, 3)
+    colors = np.random.rand(100, 3)
+
+    d = DebugData()
+    d.addLines(starts, ends, color=colors)
+    polyData = d.getPolyData()
+    assert polyData.GetNumberOfPoints() == 200
+    assert polyData.GetNumberOfLines() == 100
+    points = vnp.getNumpyFromVtk(polyData, 'Points')
+    assert np.allclose(points[::2], starts)
+    assert np.allclose(points[1::2], ends)
+    rgb = vnp.getNumpyFromVtk(polyData, 'RGB255')
+    assert np.all(rgb[::2] == (colors*255).astype(np.uint8))
+
+    # tubes have the same bounds as with addLine
+    d = DebugData()
+    d.addLines(starts[:1], ends[:1], radius=0.05)
+    d2 = DebugData()
+    d2.addLine(starts[0], ends[0], radius=0.05)
+    assert np.allclose(d.getPolyData().GetBounds(), d2.getPolyData().GetBounds(), atol=1e-3)
+
+    # batched primitives can be mixed with single primitives
+    d = DebugData()
+    d.addLines(starts, ends, radius=0.01)
+    d.addSphere([0, 0, 0], radius=1.0)
+    assert d.getPolyData().GetPointData().GetArray('RGB255')
+
+
+def testSpheres():
+
+    centers = np.random.rand(50, 3)*10
+    radii = np.random.rand(50) + 0.1
+
+    d = DebugData()
+    d.addSpheres(centers, radii)
+    polyData = d.getPolyData()
+
+    points = vnp.getNumpyFromVtk(polyData, 'Points').reshape(50, -1, 3)
+    distances = np.linalg.norm(points - centers[:,None,:], axis=2)
+    assert np.allclose(distances, radii[:,None], atol=1e-5)
+
+
+def testFrames():
+
+    frames = [transformUtils.frameFromPositionAndRPY([i, 0, 0], [0, 0, 90]) for i in xrange(3)]
+    d = DebugData()
+    d.addFrames(frames, scale=0.5)
+    points = vnp.getNumpyFromVtk(d.getPolyData(), 'Points')
+
+    d2 = DebugData()
+    for frame in frames:
+        d2.addFrame(frame, scale=0.5)
+    points2 = vnp.getNumpyFromVtk(d2.getPolyData(), 'Points')
+    assert np.allclose(points, points2)
+
+
+def testTubes(numberOfLines=10, numberOfSides=24):
+
+    starts = np.random.rand(numberOfLines, 3)
+    ends = starts + np.random.rand(numberOfLines, 3) + 0.1
+    colors = np.random.rand(numberOfLines, 3)
+
+    d = DebugData()
+    d.addLines(starts, ends, radius=0.01, color=colors, numberOfSides=numberOfSides)
+    polyData = d.getPolyData()
+
+    # each tube has two rings for the side and two for the caps, with a
+    # quad per side and a polygon per cap
+    pointsPerTube = 4*numberOfSides
+    assert polyData.GetNumberOfPoints() == numberOfLines*pointsPerTube
+    assert polyData.GetNumberOfPolys() == numberOfLines*(numberOfSides + 2)
+    assert polyData.GetNumberOfLines() == 0
+
+    # the points of each tube are at the tube radius from its axis
+    points = vnp.getNumpyFromVtk(polyData, 'Points').reshape(numberOfLines, pointsPerTube, 3)
+    directions = (ends - starts) / np.linalg.norm(ends - starts, axis=1)[:,None]
+    offsets = points - starts[:,None,:]
+    radial = offsets - np.sum(offsets*directions[:,None,:], axis=2)[:,:,None]*directions[:,None,:]
+    assert np.allclose(np.linalg.norm(radial, axis=2), 0.01)
+
+    normals = vnp.getNumpyFromVtk(polyData, 'Normals')
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1.0, atol=1e-5)
+
+    rgb = vnp.getNumpyFromVtk(polyData, 'RGB255').reshape(numberOfLines, pointsPerTube, 3)
+    assert np.all(rgb == (colors*255).astype(np.uint8)[:,None,:])
+
+    # a single color is applied to every tube
+    d = DebugData()
+    d.addLines(starts, ends, radius=0.01, color=[1, 0, 0])
+    rgb = vnp.getNumpyFromVtk(d.getPolyData(), 'RGB255')
+    assert np.all(rgb == [255, 0, 0])
+
+
+def main():
+    testLines()
+    testSpheres()
+    testFrames()
+    testTubes()
+
+
+if __name__ == '__main__':
+    main()
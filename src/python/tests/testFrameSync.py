@@ -8,8 +8,81 @@ from director import applogic
 from director import vtkAll as vtk
 
 import weakref
+import numpy as np
+from director import transformUtils
 
 
+def testRelativeTransform():
+
+    t1 = transformUtils.frameFromPositionAndRPY([1, 2, 3], [10, 20, 30])
+    t2 = transformUtils.frameFromPositionAndRPY([-1, 0, 2], [0, 45, 90])
+    t3 = transformUtils.frameFromPositionAndRPY([0, 1, 0], [90, 0, 0])
+    f1 = vis.FrameItem('relative frame 1', t1, view=None)
+    f2 = vis.FrameItem('relative frame 2', t2, view=None)
+    f3 = vis.FrameItem('relative frame 3', t3, view=None)
+
+    frameSync = vis.FrameSync()
+    for f in (f1, f2, f3):
+        frameSync.addFrame(f)
+
+    def getRelative(a, b):
+        return np.linalg.inv(transformUtils.getNumpyFromTransform(a)).dot(transformUtils.getNumpyFromTransform(b))
+
+    relative12 = getRelative(t1, t2)
+    relative13 = getRelative(t1, t3)
+
+    for i in xrange(10):
+        t1.RotateZ(15)
+        t1.Translate(0.1, 0, 0)
+        t1.Modified()
+        assert np.allclose(getRelative(t1, t2), relative12)
+        assert np.allclose(getRelative(t1, t3), relative13)
+
+    t3.RotateX(30)
+    t3.Modified()
+    assert np.allclose(getRelative(t1, t2), relative12)
+    assert np.allclose(getRelative(t1, t3), relative13)
+
+
+def testAddFrameAfterMove():
+
+    t1 = transformUtils.frameFromPositionAndRPY([1, 2, 3], [10, 20, 30])
+    t2 = transformUtils.frameFromPositionAndRPY([-1, 0, 2], [0, 45, 90])
+    t3 = transformUtils.frameFromPositionAndRPY([0, 1, 0], [90, 0, 0])
+    f1 = vis.FrameItem('moved frame 1', t1, view=None)
+    f2 = vis.FrameItem('moved frame 2', t2, view=None)
+    f3 = vis.FrameItem('moved frame 3', t3, view=None)
+
+    frameSync = vis.FrameSync()
+    frameSync.addFrame(f1)
+    frameSync.addFrame(f2)
+
+    # move the synced frames away from their base poses before adding a
+    # frame, so the rotation of the move does not commute with the others
+    t1.RotateZ(60)
+    t1.Translate(1, 0, 0)
+    t1.Modified()
+
+    frameSync.addFrame(f3)
+
+    def getRelative(a, b):
+        return np.linalg.inv(transformUtils.getNumpyFromTransform(a)).dot(transformUtils.getNumpyFromTransform(b))
+
+    relative13 = getRelative(t1, t3)
+    relative23 = getRelative(t2, t3)
+
+    # the added frame keeps its pose relative to the frames it was added to
+    t1.RotateX(30)
+    t1.Translate(0, 1, 0)
+    t1.Modified()
+    assert np.allclose(getRelative(t1, t3), relative13)
+    assert np.allclose(getRelative(t2, t3), relative23)
+
+    t2.RotateY(45)
+    t2.Modified()
+    assert np.allclose(getRelative(t1, t3), relative13)
+    assert np.allclose(getRelative(t2, t3), relative23)
+
 
 def main():
 
@@ -25,6 +98,30 @@ def main():
     assert om.findObjectByName('frame 1')
     assert om.findObjectByName('frame 2') is None
 
+    # test pick lookup
+    assert vis.getObjectByProp(f1.rep) is f1
+    assert vis.getObjectByProp(f1.actor) is f1
+    assert vis.getObjectByDataSet(f1.polyData) is f1
+    f1.setProperty('Tube', True)
+    assert vis.getObjectByDataSet(f1.polyData) is f1
+
+    # test pick lookup of a dataset shared by two items
+    polyData = vtk.vtkPolyData()
+    a = vis.PolyDataItem('shared a', polyData, view=None)
+    b = vis.PolyDataItem('shared b', polyData, view=None)
+    om.addToObjectModel(a)
+    om.addToObjectModel(b)
+    assert vis.getObjectByDataSet(polyData) is a
+    om.removeFromObjectModel(a)
+    assert vis.getObjectByDataSet(polyData) is b
+    om.addToObjectModel(a)
+    om.removeFromObjectModel(b)
+    del b
+    assert vis.getObjectByDataSet(polyData) is a
+    om.removeFromObjectModel(a)
+    del a
+    assert vis.getObjectByDataSet(polyData) is None
+
 
     # test reference cleanup
     f1Ref = weakref.ref(f1)
@@ -138,6 +235,9 @@ def main():
     assert t2.GetPosition() == (20.0, 5.0, 10.0)
 
 
+    testRelativeTransform()
+    testAddFrameAfterMove()
+
     # verify FrameSync object can be deleted
     frameSyncRef = weakref.ref(frameSync)
     del frameSync
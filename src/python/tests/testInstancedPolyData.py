@@ -0,0 +1,57 @@
+import numpy as np
+import PythonQt
+from PythonQt import QtGui
+import director.objectmodel as om
+import director.visualization as vis
+from director import transformUtils
+from director.debugVis import DebugData
+
+
+def main():
+
+    om.init(QtGui.QTreeWidget(), PythonQt.dd.ddPropertiesPanel())
+
+    d = DebugData()
+    d.addSphere(np.zeros(3), radius=0.1, resolution=8)
+    sphere = d.getPolyData()
+
+    transforms = [transformUtils.frameFromPositionAndRPY([i, 0, 0], [0, 0, 10*i]) for i in xrange(100)]
+    item = vis.InstancedPolyDataItem('instances', sphere, view=None)
+    om.addToObjectModel(item)
+    item.setInstances(transforms, colors=[1, 0, 0])
+
+    pointsPerInstance = len(item.sourcePoints)
+    trianglesPerInstance = len(item.sourceTriangles)
+
+    assert item.getNumberOfInstances() == 100
+    assert item.polyData.GetNumberOfPoints() == 100*pointsPerInstance
+    assert item.polyData.GetNumberOfPolys() == 100*trianglesPerInstance
+    assert 'instance_id' in item.getArrayNames()
+    assert 'rgb' in item.getArrayNames()
+    assert vis.getObjectByDataSet(item.polyData) is item
+
+    points = item.polyData.GetPoints()
+    instanceIds = item.polyData.GetPointData().GetArray('instance_id')
+    for instanceId in (0, 42, 99):
+        pointId = instanceId*pointsPerInstance
+        assert item.getInstanceIdForPoint(pointId) == instanceId
+        assert item.getInstanceIdForCell(instanceId*trianglesPerInstance + 1) == instanceId
+        assert instanceIds.GetValue(pointId) == instanceId
+        expected = np.array(transforms[instanceId].TransformPoint(item.sourcePoints[0]))
+        assert np.allclose(points.GetPoint(pointId), expected)
+
+    # moving the instances keeps the mesh topology
+    polys = item.polyData.GetPolys()
+    matrices = np.tile(np.eye(4), (100, 1, 1))
+    matrices[:,2,3] = 1.0
+    item.setInstanceTransforms(matrices)
+    assert item.polyData.GetPolys() is polys
+    assert np.allclose(item.polyData.GetPoints().GetPoint(5*pointsPerInstance), item.sourcePoints[0] + [0, 0, 1])
+
+    # changing the number of instances rebuilds the mesh
+    item.setInstanceTransforms(matrices[:10])
+    assert item.polyData.GetNumberOfPolys() == 10*trianglesPerInstance
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import os
+import tempfile
+from director import lcmlog
+
+
+def writeTestLog(filename, numberOfEvents, garbage=''):
+
+    events = []
+    with open(filename, 'wb') as f:
+        for i in xrange(numberOfEvents):
+            channel = 'CHANNEL_%d' % (i % 3)
+            data = 'payload %d' % i
+            utime = 1000 + i*10
+            f.write(lcmlog.encodeEvent(i, utime, channel, data))
+            if i == numberOfEvents/2:
+                f.write(garbage)
+            events.append((i, utime, channel, data))
+    return events
+
+
+def testIterate(filename, events):
+
+    log = lcmlog.MappedEventLog(filename)
+    readEvents = [(e.eventnum, e.timestamp, e.channel, str(e.data)) for e in log]
+    assert readEvents == events
+    assert log.getNumberOfEvents() == len(events)
+    assert log.getUtimeRange() == (events[0][1], events[-1][1])
+
+    channelEvents = list(log.iterEvents(channels=['CHANNEL_1']))
+    assert [e.eventnum for e in channelEvents] == [e[0] for e in events if e[2] == 'CHANNEL_1']
+    log.close()
+
+
+def testSeek(filename, events):
+
+    log = lcmlog.MappedEventLog(filename)
+    offsets, utimes = log.getIndex()
+
+    log.seek(offsets[5])
+    event = log.readNextEvent()
+    assert event.eventnum == 5
+    assert log.tell() == offsets[6]
+    assert log.readNextEvent().eventnum == 6
+
+    # exact and in-between utimes
+    assert log.seekToUtime(events[7][1])
+    assert log.readNextEvent().eventnum == 7
+    assert log.seekToUtime(events[7][1] + 1)
+    assert log.readNextEvent().eventnum == 8
+    assert log.findOffsetByUtime(0) == offsets[0]
+    assert log.findOffsetByUtime(events[-1][1] + 1) is None
+    assert not log.seekToUtime(events[-1][1] + 1)
+    log.close()
+
+
+def testReadEvent(filename, events):
+
+    log = lcmlog.MappedEventLog(filename)
+    offsets, utimes = log.getIndex()
+
+    # file reads return the same events as the memory mapped reader
+    with open(filename, 'rb') as f:
+        readEvents = [lcmlog.readEvent(f, offset) for offset in reversed(offsets)]
+        readEvents.reverse()
+        assert [(e.eventnum, e.timestamp, e.channel, e.data) for e in readEvents] == events
+        assert [e.offset for e in readEvents] == offsets
+        assert [e.nextOffset for e in readEvents[:-1]] == offsets[1:]
+        assert readEvents[-1].nextOffset == log.size()
+
+        assert lcmlog.readEvent(f, log.size()) is None
+
+        try:
+            lcmlog.readEvent(f, offsets[1] + 1)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('expected ValueError')
+
+    log.close()
+
+    # an event that is still being written is not returned
+    with open(filename, 'ab') as f:
+        f.write(lcmlog.encodeEvent(100, 100000, 'CHANNEL_0', 'partial')[:-3])
+    with open(filename, 'rb') as f:
+        assert lcmlog.readEvent(f, readEvents[-1].nextOffset) is None
+
+
+def testGrowingLog(filename):
+
+    writeTestLog(filename, 10)
+    log = lcmlog.MappedEventLog(filename)
+    assert log.getNumberOfEvents() == 10
+
+    # append one complete event and a partial event
+    with open(filename, 'ab') as f:
+        f.write(lcmlog.encodeEvent(10, 5000, 'CHANNEL_0', 'new'))
+        f.write(lcmlog.encodeEvent(11, 6000, 'CHANNEL_0', 'partial')[:-3])
+
+    assert log.getNumberOfEvents() == 11
+    assert log.getUtimeRange()[1] == 5000
+    log.close()
+
+
+def testEmptyLog(filename):
+
+    open(filename, 'wb').close()
+    log = lcmlog.MappedEventLog(filename)
+    assert list(log) == []
+    assert log.readNextEvent() is None
+    assert log.getUtimeRange() is None
+    log.close()
+
+
+def main():
+
+    filename = tempfile.mktemp(suffix='.lcmlog')
+
+    try:
+        events = writeTestLog(filename, 20)
+        testIterate(filename, events)
+        testSeek(filename, events)
+        testReadEvent(filename, events)
+
+        # the reader should resync past corrupt bytes
+        events = writeTestLog(filename, 20, garbage='\x00\xed\xa1garbage')
+        testIterate(filename, events)
+
+        testGrowingLog(filename)
+        testEmptyLog(filename)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+from director import lcmlog
+from director.lcmlogplayer import LogPlayer
+
+
+class FakeLCM(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, channel, data):
+        self.messages.append((channel, data))
+
+
+def writeTestLog(filename):
+
+    channels = ['EST_ROBOT_STATE', 'EST_ROBOT_STATE_FOO', 'CAMERA', 'CAMERA_LEFT', 'POSE_BODY']
+    with open(filename, 'wb') as f:
+        for i in xrange(20):
+            f.write(lcmlog.encodeEvent(i, 1000 + i*100, channels[i % len(channels)], 'payload %d' % i))
+
+
+def testStep(filename):
+
+    lc = FakeLCM()
+    player = LogPlayer(filename, lcmHandle=lc)
+    assert player.getUtimeRange() == (1000, 2900)
+
+    assert player.step().eventnum == 0
+    assert player.step().eventnum == 1
+    assert player.getCurrentUtime() == 1200
+
+    # seek to an exact and an in-between utime
+    player.seekToUtime(1500)
+    assert player.step().eventnum == 5
+    player.seekToUtime(1550)
+    assert player.step().eventnum == 6
+
+    player.seekToIndex(19)
+    assert player.step().eventnum == 19
+    assert player.step() is None
+
+    assert lc.messages[0] == ('EST_ROBOT_STATE', 'payload 0')
+    assert len(lc.messages) == player.publishedCount == 5
+    player.close()
+
+
+def testChannelFilter(filename):
+
+    lc = FakeLCM()
+    player = LogPlayer(filename, lcmHandle=lc)
+
+    # every alternative must match the whole channel name
+    player.setChannelFilter('EST_ROBOT_STATE|CAMERA.*')
+    player.setChannelRemap({'CAMERA': 'CAMERA_REPLAY'})
+    while player.step():
+        pass
+
+    channels = set(channel for channel, data in lc.messages)
+    assert channels == set(['EST_ROBOT_STATE', 'CAMERA_REPLAY', 'CAMERA_LEFT'])
+    assert len(lc.messages) == 12
+
+    # removing the filter publishes every channel
+    lc.messages = []
+    player.setChannelFilter(None)
+    player.setChannelRemap({})
+    player.seekToIndex(0)
+    while player.step():
+        pass
+    assert len(lc.messages) == 20
+    player.close()
+
+
+def testPacing(filename):
+
+    player = LogPlayer(filename, lcmHandle=FakeLCM())
+
+    # one second of log time takes half a second at speed 2
+    player.setSpeed(2.0)
+    player._resetClock(1000)
+    waitTime = player._getWaitTime(1000 + 1000000)
+    assert 0.4 < waitTime <= 0.5
+
+    # speeds <= 0 play without waiting
+    player.setSpeed(0.0)
+    assert player._getWaitTime(1000 + 1000000) == 0.0
+
+    # gaps longer than maxGap restart the clock instead of being waited for
+    player.setSpeed(1.0)
+    player.maxGap = 0.5
+    player.seekToIndex(1)
+    player._resetClock(1000)
+    assert player._getWaitTime(1000 + 1000000) <= 0.0
+    player.close()
+
+
+def testPlay(filename):
+
+    lc = FakeLCM()
+    player = LogPlayer(filename, lcmHandle=lc)
+    player.setSpeed(0.0)
+    player.seekToUtime(2000)
+    player.play()
+
+    # the thread exits at the end of the log
+    player.thread.join(10.0)
+    assert not player.isPlaying()
+    assert [data for channel, data in lc.messages] == ['payload %d' % i for i in xrange(10, 20)]
+    player.close()
+
+
+def main():
+
+    filename = tempfile.mktemp(suffix='.lcmlog')
+
+    try:
+        writeTestLog(filename)
+        testStep(filename)
+        testChannelFilter(filename)
+        testPacing(filename)
+        testPlay(filename)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
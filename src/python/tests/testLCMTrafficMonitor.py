@@ -0,0 +1,69 @@
+import numpy as np
+from director.lcmtrafficmonitor import ChannelStatistics, TrafficMonitor
+
+
+def testPartialWindow():
+
+    stats = ChannelStatistics('CHANNEL', windowDuration=5.0)
+    summary = stats.getSummary(100.0)
+    assert summary['count'] == 0
+    assert summary['rate'] == 0.0
+
+    # 10 Hz of 1024 byte messages for one second
+    for i in xrange(10):
+        stats.addMessage(100.0 + i*0.1, 1024)
+
+    # before the window has filled, rates are computed over the time since
+    # the first message
+    summary = stats.getSummary(101.0)
+    assert np.isclose(summary['rate'], 10.0)
+    assert np.isclose(summary['bandwidth'], 10.0)
+    assert summary['sizeMin'] == summary['sizeMax'] == 1024
+    assert summary['totalMessages'] == 10
+
+
+def testFullWindow():
+
+    stats = ChannelStatistics('CHANNEL', windowDuration=2.0)
+    for i in xrange(100):
+        stats.addMessage(i*0.1, 100 + i)
+
+    # only the messages of the last two seconds are kept
+    summary = stats.getSummary(9.95)
+    assert summary['count'] == 20
+    assert np.isclose(summary['rate'], 10.0)
+    assert summary['sizeMin'] == 180
+    assert summary['sizeMax'] == 199
+    assert np.isclose(summary['jitter'], 0.0)
+    assert summary['totalMessages'] == 100
+    assert summary['totalBytes'] == sum(xrange(100, 200))
+
+    # the latency samples are windowed with the messages
+    stats.addLatency(9.0, 0.01)
+    stats.addLatency(9.9, 0.03)
+    summary = stats.getSummary(10.5)
+    assert np.isclose(summary['latencyMean'], 20.0)
+    assert np.isclose(summary['latencyMax'], 30.0)
+    summary = stats.getSummary(11.5)
+    assert np.isclose(summary['latencyMean'], 30.0)
+
+    summary = stats.getSummary(100.0)
+    assert summary['count'] == 0
+    assert summary['rate'] == 0.0
+    assert summary['latencyMean'] is None
+
+
+def testFormatValue():
+    assert TrafficMonitor.formatValue(None) == '-'
+    assert TrafficMonitor.formatValue(1.0/3.0) == '0.33'
+    assert TrafficMonitor.formatValue(12) == '12'
+
+
+def main():
+    testPartialWindow()
+    testFullWindow()
+    testFormatValue()
+
+
+if __name__ == '__main__':
+    main()
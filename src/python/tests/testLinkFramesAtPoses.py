@@ -0,0 +1,36 @@
+from director.consoleapp import ConsoleApp
+from director import roboturdf
+from director import transformUtils
+
+import numpy as np
+
+
+app = ConsoleApp()
+app.setupGlobals(globals())
+
+view = app.createView()
+
+robotModel, jointController = roboturdf.loadRobotModel('robot model', view)
+
+jointNames = jointController.jointNames
+linkNames = robotModel.model.getLinkNames()
+
+np.random.seed(1)
+poses = np.random.uniform(-0.5, 0.5, size=(5, len(jointNames)))
+
+currentPose = np.array(robotModel.model.getJointPositions())
+frames = robotModel.getLinkFramesAtPoses(poses, linkNames, jointNames)
+assert frames.shape == (len(poses), len(linkNames), 4, 4)
+
+# the batch computation does not change the model
+assert np.allclose(robotModel.model.getJointPositions(), currentPose)
+
+for pose, poseFrames in zip(poses, frames):
+    jointController.setPose('test_pose', pose)
+    for linkName, linkFrame in zip(linkNames, poseFrames):
+        expected = transformUtils.getNumpyFromTransform(robotModel.getLinkFrame(linkName))
+        assert np.allclose(linkFrame, expected)
+
+assert robotModel.getLinkFramesAtPoses(poses, ['not a link name'], jointNames) is None
+
+app.start()
@@ -0,0 +1,126 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+
+from director import meshcache
+from director import ioUtils
+from director.debugVis import DebugData
+import director.vtkNumpy as vnp
+
+
+def writeTestMesh(filename, radius):
+    d = DebugData()
+    d.addSphere((0, 0, 0), radius=radius)
+    ioUtils.writePolyData(d.getPolyData(), filename)
+
+
+def getBounds(polyData):
+    return np.array(polyData.GetBounds())
+
+
+def testLRUCache():
+
+    cache = meshcache.LRUCache(maxSize=2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.get('a') == 1
+    cache['c'] = 3
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.getStatistics()['hits'] == 1
+    assert cache.getStatistics()['misses'] == 1
+    cache.setMaxSize(1)
+    assert cache.keys() == ['c']
+
+
+def testMeshCache(testDir):
+
+    filename = os.path.join(testDir, 'sphere.vtp')
+    writeTestMesh(filename, radius=1.0)
+
+    meshcache.clear()
+    polyDataList = meshcache.loadMeshes(filename)
+    assert len(polyDataList) == 1
+    assert polyDataList[0].GetPointData().GetNormals()
+    assert np.allclose(getBounds(polyDataList[0]), [-1, 1, -1, 1, -1, 1], atol=1e-3)
+
+    # the second load is served from the cache and returns a copy
+    misses = meshcache.getStatistics()['meshes']['misses']
+    polyDataList2 = meshcache.loadMeshes(filename)
+    assert meshcache.getStatistics()['meshes']['misses'] == misses
+    assert polyDataList2[0] is not polyDataList[0]
+    assert polyDataList2[0].GetPoints().GetData() is polyDataList[0].GetPoints().GetData()
+
+    # scale is part of the key
+    scaled = meshcache.loadMeshes(filename, scale=[2.0, 1.0, 1.0])
+    assert np.allclose(getBounds(scaled[0]), [-2, 2, -1, 1, -1, 1], atol=1e-3)
+    assert meshcache.loadMeshes(filename, scale=2.0)[0].GetBounds()[1] > 1.99
+
+    # a modified file is loaded again
+    time.sleep(1.1)
+    writeTestMesh(filename, radius=3.0)
+    assert np.allclose(getBounds(meshcache.loadMeshes(filename)[0]), [-3, 3, -3, 3, -3, 3], atol=1e-3)
+
+
+def testDiskCache(testDir):
+
+    filename = os.path.join(testDir, 'sphere2.vtp')
+    writeTestMesh(filename, radius=0.5)
+
+    cacheDir = os.path.join(testDir, 'cache')
+    meshcache.setCacheDirectory(cacheDir)
+    try:
+        meshcache.clear()
+        polyDataList = meshcache.loadMeshes(filename, scale=2.0)
+        assert len(os.listdir(cacheDir)) == 2
+
+        # after clearing memory the mesh is read from the disk store
+        meshcache.clear()
+        polyDataList2 = meshcache.loadMeshes(filename, scale=2.0)
+        assert polyDataList2[0].GetPointData().GetNormals()
+        assert np.allclose(vnp.getNumpyFromVtk(polyDataList[0], 'Points'), vnp.getNumpyFromVtk(polyDataList2[0], 'Points'))
+    finally:
+        meshcache.setCacheDirectory(None)
+
+
+def testMeshLoader(testDir):
+
+    filenames = [os.path.join(testDir, 'loader%d.vtp' % i) for i in xrange(4)]
+    for i, filename in enumerate(filenames):
+        writeTestMesh(filename, radius=i + 1.0)
+
+    meshcache.clear()
+    requests = [(filename, None) for filename in filenames]
+    loader = meshcache.MeshLoader(requests + requests, numberOfThreads=2)
+    loader.wait()
+
+    assert loader.isFinished()
+    assert loader.getProgress() == (4, 4)
+    assert not loader.errors
+    for filename in filenames:
+        assert meshcache.isCached(filename)
+
+    # cached meshes are not loaded again
+    assert meshcache.MeshLoader(requests).getProgress() == (0, 0)
+
+    loader = meshcache.MeshLoader([(os.path.join(testDir, 'missing.vtp'), None)])
+    loader.wait()
+    assert len(loader.errors) == 1
+
+
+def main():
+    testLRUCache()
+
+    testDir = tempfile.mkdtemp()
+    try:
+        testMeshCache(testDir)
+        testDiskCache(testDir)
+        testMeshLoader(testDir)
+    finally:
+        shutil.rmtree(testDir)
+
+
+if __name__ == '__main__':
+    main()
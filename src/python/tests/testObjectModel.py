@@ -12,6 +12,189 @@ def startApplication(enableQuitTimer=False):
     appInstance.exec_()
 
 
+def testNameIndex(numberOfObjects=100):
+
+    tree = om.ObjectModelTree()
+    tree.init(QtGui.QTreeWidget(), PythonQt.dd.ddPropertiesPanel())
+
+    folder = tree.addContainer('folder')
+    otherFolder = tree.addContainer('other folder')
+    objs = [om.ObjectModelItem('item %d' % i) for i in xrange(numberOfObjects)]
+    for obj in objs:
+        tree.addToObjectModel(obj, folder)
+
+    for i, obj in enumerate(objs):
+        assert tree.findObjectByName('item %d' % i) is obj
+        assert tree._getItemForObject(obj) is not None
+
+    # duplicate names in another folder
+    duplicate = om.ObjectModelItem('item 1')
+    tree.addToObjectModel(duplicate, otherFolder)
+    assert tree.findObjectsByName('item 1') == [objs[1], duplicate]
+    assert tree.findObjectByName('item 1') is objs[1]
+
+    # findChildByName either walks the objects with the name or the
+    # children of the parent, whichever is shorter
+    assert tree.findChildByName(folder, 'item 1') is objs[1]
+    assert tree.findChildByName(otherFolder, 'item 1') is duplicate
+    assert tree.findObjectByName('item 2', parent=folder) is objs[2]
+    assert tree.findObjectByName('item 2', parent=otherFolder) is None
+    assert tree.findChildByName(folder, 'missing item') is None
+
+    # renames update the name index
+    objs[0].rename('renamed item')
+    assert tree.findObjectByName('item 0') is None
+    assert tree.findObjectByName('renamed item') is objs[0]
+    assert tree.findChildByName(folder, 'renamed item') is objs[0]
+    assert tree.findChildByName(folder, 'item 0') is None
+
+    objs[3].setProperty('Name', 'item 1')
+    assert tree.findObjectsByName('item 1') == [objs[1], duplicate, objs[3]]
+    assert tree.findObjectsByName('item 3') == []
+    assert tree.findChildByName(otherFolder, 'item 1') is duplicate
+
+    # renaming a folder renames the children that start with its name
+    child = om.ObjectModelItem('other folder child')
+    tree.addToObjectModel(child, otherFolder)
+    otherFolder.rename('moved folder')
+    assert tree.findObjectByName('moved folder child') is child
+    assert tree.findObjectByName('other folder child') is None
+    assert tree.findChildByName(otherFolder, 'moved folder child') is child
+
+    # removed objects are dropped from the name index
+    tree.removeFromObjectModel(objs[1])
+    assert tree.findObjectsByName('item 1') == [duplicate, objs[3]]
+    assert tree.findChildByName(folder, 'item 1') is objs[3]
+
+    tree.removeFromObjectModel(folder)
+    assert tree.findObjectByName('item 2') is None
+    assert tree.findObjectByName('renamed item') is None
+    assert tree.findObjectsByName('item 1') == [duplicate]
+    assert set(tree.getObjects()) == set([otherFolder, duplicate, child])
+
+    # a removed object can be added again
+    tree.addToObjectModel(objs[2], otherFolder)
+    assert tree.findChildByName(otherFolder, 'item 2') is objs[2]
+
+
+def testLargeTree(numberOfObjects=10000):
+    '''
+    Runs the indexed lookups and removals over a large tree.  Without the
+    name and item indexes every call below scans the whole tree.
+    '''
+    tree = om.ObjectModelTree()
+    tree.init(QtGui.QTreeWidget(), PythonQt.dd.ddPropertiesPanel())
+
+    folders = [tree.addContainer('folder %d' % i) for i in xrange(10)]
+    objs = []
+    with tree.bulkUpdate():
+        for i in xrange(numberOfObjects):
+            obj = om.ObjectModelItem('item %d' % i)
+            tree.addToObjectModel(obj, folders[i % len(folders)])
+            objs.append(obj)
+
+    for i, obj in enumerate(objs):
+        assert tree.findObjectByName('item %d' % i) is obj
+        assert tree.findChildByName(folders[i % len(folders)], 'item %d' % i) is obj
+        assert tree.findChildByName(folders[(i + 1) % len(folders)], 'item %d' % i) is None
+        assert tree._getItemForObject(obj) is not None
+
+    # remove every other object one at a time
+    for obj in objs[::2]:
+        tree.removeFromObjectModel(obj)
+
+    for i, obj in enumerate(objs):
+        if i % 2:
+            assert tree.findObjectByName('item %d' % i) is obj
+            assert tree._getItemForObject(obj) is not None
+        else:
+            assert tree.findObjectByName('item %d' % i) is None
+            assert tree._getItemForObject(obj) is None
+
+    assert len(tree.getObjects()) == len(folders) + numberOfObjects/2
+
+
+class FakeView(object):
+
+    def __init__(self):
+        self.renderCount = 0
+
+    def render(self):
+        self.renderCount += 1
+
+
+def testBatchChanges():
+
+    obj = om.ObjectModelItem('batch item')
+    obj.addProperty('Alpha', 1.0)
+    obj.addProperty('Visible', True)
+    view = FakeView()
+
+    changes = []
+    def onPropertyChanged(propertySet, propertyName):
+        changes.append((propertyName, propertySet.getProperty(propertyName)))
+        om.renderViews([view])
+    obj.properties.connectPropertyChanged(onPropertyChanged)
+
+    with obj.batchChanges():
+        for i in xrange(10):
+            obj.setProperty('Alpha', i/10.0)
+        obj.setProperty('Visible', False)
+        with obj.batchChanges():
+            obj.setProperty('Visible', True)
+        assert changes == []
+        assert view.renderCount == 0
+
+    assert changes == [('Alpha', 0.9), ('Visible', True)]
+    assert view.renderCount == 1
+
+    # outside of a batch every change is notified and rendered
+    obj.setProperty('Alpha', 0.5)
+    assert changes[-1] == ('Alpha', 0.5)
+    assert view.renderCount == 2
+
+    # alternate property names
+    assert obj.properties.alpha == 0.5
+    assert obj.properties.visible
+
+
+def testBulkUpdate(numberOfObjects=1000):
+
+    tree = om.ObjectModelTree()
+    tree.init(QtGui.QTreeWidget(), PythonQt.dd.ddPropertiesPanel())
+
+    addedObjects = []
+    tree.connectObjectAdded(lambda tree, obj: addedObjects.append(obj))
+
+    folder = tree.addContainer('bulk folder')
+    del addedObjects[:]
+
+    with tree.bulkUpdate():
+        objs = [om.ObjectModelItem('bulk item %d' % i) for i in xrange(numberOfObjects)]
+        for obj in objs:
+            tree.addToObjectModel(obj, folder)
+
+        # added signals are deferred
+        assert addedObjects == []
+        removed = objs.pop()
+        tree.removeFromObjectModel(removed)
+
+    assert addedObjects == objs
+    assert tree.getObjectChildren(folder) == objs
+
+    tree.setActiveObject(objs[0])
+    assert tree.getActiveObject() is objs[0]
+
+    selectionChanges = []
+    tree.connectSelectionChanged(lambda tree: selectionChanges.append(tree.getActiveObject()))
+
+    tree.removeChildren(folder)
+
+    assert tree.getObjectChildren(folder) == []
+    assert tree.getObjects() == [folder]
+    assert selectionChanges == [None]
+
+
 def main():
 
     objectTree = QtGui.QTreeWidget()
@@ -54,6 +237,11 @@ def main():
     objectTree2.show()
     propertiesPanel2.show()
 
+    testNameIndex()
+    testBatchChanges()
+    testBulkUpdate()
+    testLargeTree()
+
     startApplication(enableQuitTimer=True)
 
 
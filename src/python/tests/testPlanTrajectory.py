@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from director import robotstate
+from director import planplayback
+
+
+class RobotPlan(object):
+
+    def __init__(self, utimes, poses):
+        self.utime = 0
+        self.plan = []
+        for utime, pose in zip(utimes, poses):
+            state = robotstate.drakePoseToRobotState(pose)
+            state.utime = utime
+            self.plan.append(state)
+
+
+def setJointNames():
+    floatingBase = ['base_x', 'base_y', 'base_z', 'base_roll', 'base_pitch', 'base_yaw']
+    robotstate._drakePoseJointNames = floatingBase + ['a', 'b']
+    robotstate._robotStateJointNames = ['a', 'b']
+    robotstate._numPositions = None
+
+
+def makePose(x, a):
+    return [x, 0.0, 0.0, 0.0, 0.0, 0.0, a, 0.0]
+
+
+def testPlanTrajectory(testDir):
+
+    plan1 = RobotPlan([0, 1000000], [makePose(0.0, 0.0), makePose(1.0, 1.0)])
+    plan2 = RobotPlan([0, 1000000], [makePose(1.0, 1.0), makePose(2.0, 0.0)])
+
+    trajectory = planplayback.getPlanTrajectory([plan1, plan2])
+    assert np.allclose(trajectory.poseTimes, [0.0, 1.0, 2.0])
+    assert np.allclose(trajectory.poses[:,0], [0.0, 1.0, 2.0])
+    assert trajectory.getElapsedTime() == 2.0
+    assert list(trajectory.getMovingJointIds()) == [0, 6]
+
+    # the trajectory and its interpolators are cached
+    assert planplayback.getPlanTrajectory([plan1, plan2]) is trajectory
+    assert planplayback.getPlanTrajectory(plan1) is not trajectory
+    assert trajectory.getInterpolator('slinear') is trajectory.getInterpolator('slinear')
+
+    samples = trajectory.sample([-1.0, 0.5, 1.5, 3.0])
+    assert np.allclose(samples[:,0], [0.0, 0.5, 1.5, 2.0])
+    assert np.allclose(samples[:,6], [0.0, 0.5, 0.5, 0.0])
+
+    # getPlanPoses returns copies of the cached poses
+    poseTimes, poses = planplayback.PlanPlayback.getPlanPoses([plan1, plan2])
+    poses[0][0] = 10.0
+    assert trajectory.poses[0,0] == 0.0
+
+    filename = os.path.join(testDir, 'plan.npz')
+    trajectory.save(filename)
+    loaded = planplayback.PlanTrajectory.load(filename)
+    assert np.allclose(loaded.poseTimes, trajectory.poseTimes)
+    assert np.allclose(loaded.poses, trajectory.poses)
+
+
+def main():
+    setJointNames()
+
+    testDir = tempfile.mkdtemp()
+    try:
+        testPlanTrajectory(testDir)
+    finally:
+        shutil.rmtree(testDir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from director.drakevisualizer import PlanarLidarHistory
+import director.vtkNumpy as vnp
+
+
+def getShownPoints(history):
+    polyData = history.polyData
+    if not polyData.GetNumberOfCells():
+        return np.zeros((0, 3))
+    points = vnp.getNumpyFromVtk(polyData, 'Points')
+    ids = polyData.GetCell(0).GetPointIds()
+    return points[[ids.GetId(i) for i in xrange(ids.GetNumberOfIds())]]
+
+
+def testPlanarLidarHistory():
+
+    history = PlanarLidarHistory(numberOfScans=2)
+
+    pose = np.eye(4)
+    pose[:3,3] = [1.0, 2.0, 3.0]
+
+    # rays along +x, +y and -x, the second ray is invalid
+    history.addScan([1.0, -1.0, 2.0], 0.0, np.pi/2, 0, pose)
+    points = getShownPoints(history)
+    assert np.allclose(points, [[2.0, 2.0, 3.0], [-1.0, 2.0, 3.0]])
+
+    # scans are kept in world coordinates when the sensor moves
+    pose[:3,3] = [0.0, 0.0, 0.0]
+    history.addScan([1.0, 1.0, 1.0], 0.0, np.pi/2, 100000, pose)
+    assert len(getShownPoints(history)) == 5
+
+    # the oldest scan is replaced
+    history.addScan([1.0, 1.0, 1.0], 0.0, np.pi/2, 200000, pose)
+    points = getShownPoints(history)
+    assert len(points) == 6
+    assert np.allclose(points[:,2], 0.0)
+
+    age = vnp.getNumpyFromVtk(history.polyData, 'age')
+    assert np.allclose(sorted(set(age)), [0.0, 0.1])
+
+    # scans older than the decay time are hidden
+    history.setNumberOfScans(3, decayTime=0.15)
+    for i in xrange(3):
+        history.addScan([1.0, 1.0, 1.0], 0.0, np.pi/2, i*100000, pose)
+    assert len(getShownPoints(history)) == 6
+
+    # a change in the number of rays reallocates the history
+    history.addScan(np.ones(10), 0.0, 0.1, 300000, pose)
+    assert history.polyData.GetNumberOfPoints() == 30
+    assert len(getShownPoints(history)) == 10
+
+
+def main():
+    testPlanarLidarHistory()
+
+
+if __name__ == '__main__':
+    main()
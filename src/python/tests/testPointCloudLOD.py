@@ -0,0 +1,96 @@
+import numpy as np
+import director.vtkAll as vtk
+import director.vtkNumpy as vnp
+import director.visualization as vis
+from director import pointcloudlod
+
+
+def getTestPointCloud(numberOfPoints):
+    points = np.random.rand(numberOfPoints, 3)*10.0
+    polyData = vnp.numpyToPolyData(points, pointData={'intensity': points[:,2].copy()})
+    polyData.SetVerts(pointcloudlod.createVertexCells(numberOfPoints))
+    return polyData
+
+
+def testVoxelIndices():
+
+    points = np.array([[0.0, 0.0, 0.0],
+                       [0.05, 0.05, 0.05],
+                       [np.nan, 0.0, 0.0],
+                       [1.0, 0.0, 0.0],
+                       [1.01, 0.0, 0.0]])
+
+    assert pointcloudlod.getVoxelIndices(points, 0.1).tolist() == [0, 3]
+    assert pointcloudlod.getVoxelIndices(points, 0.001).tolist() == [0, 1, 3, 4]
+
+
+def testPyramid():
+
+    polyData = getTestPointCloud(100000)
+    levels = pointcloudlod.buildVoxelPyramid(polyData, minPoints=1000, maxLevels=5)
+
+    assert len(levels) > 2
+    assert levels[0] == (0.0, polyData)
+
+    for (leafSize, level), (nextLeafSize, nextLevel) in zip(levels, levels[1:]):
+        assert nextLeafSize > leafSize
+        assert nextLevel.GetNumberOfPoints() <= level.GetNumberOfPoints() / 2
+        assert nextLevel.GetNumberOfVerts() == nextLevel.GetNumberOfPoints()
+        assert nextLevel.GetPointData().GetArray('intensity').GetNumberOfTuples() == nextLevel.GetNumberOfPoints()
+
+    # small clouds are not decimated
+    assert len(pointcloudlod.buildVoxelPyramid(getTestPointCloud(100), minPoints=1000)) == 1
+
+
+def getLevel(lod, renderer, position, focalPoint):
+    camera = renderer.GetActiveCamera()
+    camera.SetPosition(position)
+    camera.SetFocalPoint(focalPoint)
+    return lod.computeLevel(renderer)
+
+
+def testComputeLevel():
+
+    # a flat map of 1000 x 1000 meters
+    np.random.seed(1)
+    points = np.random.rand(200000, 3)*[1000.0, 1000.0, 1.0]
+    polyData = vnp.numpyToPolyData(points)
+    polyData.SetVerts(pointcloudlod.createVertexCells(len(points)))
+
+    item = vis.PolyDataItem('point cloud', polyData, view=None)
+    lod = pointcloudlod.PointCloudLOD(item, minPoints=1000)
+    lod._updatePyramid()
+    coarsestLevel = len(lod.levels) - 1
+    assert coarsestLevel > 1
+
+    renderWindow = vtk.vtkRenderWindow()
+    renderWindow.SetSize(100, 100)
+    renderer = vtk.vtkRenderer()
+    renderWindow.AddRenderer(renderer)
+
+    # camera inside the bounds of the cloud, looking near and far
+    assert getLevel(lod, renderer, [50.0, 500.0, 0.5], [60.0, 500.0, 0.5]) == 0
+    farLevel = getLevel(lod, renderer, [50.0, 500.0, 0.5], [1000.0, 500.0, 0.5])
+    assert 0 < farLevel <= coarsestLevel
+
+    # a focal point beyond the cloud is clamped to its bounds
+    assert getLevel(lod, renderer, [50.0, 500.0, 0.5], [5000.0, 500.0, 0.5]) == farLevel
+
+    # camera outside the bounds of the cloud, close and far
+    assert getLevel(lod, renderer, [500.0, 500.0, 3.0], [500.0, 500.0, 0.0]) == 0
+    assert getLevel(lod, renderer, [500.0, 500.0, 1e5], [500.0, 500.0, 0.0]) == coarsestLevel
+
+    # the load bias selects coarser levels
+    lod._loadBias = 1
+    assert getLevel(lod, renderer, [50.0, 500.0, 0.5], [60.0, 500.0, 0.5]) == 1
+    lod.close()
+
+
+def main():
+    testVoxelIndices()
+    testPyramid()
+    testComputeLevel()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+import bot_core
+
+from director import robotstate
+from director import transformUtils
+
+
+def setJointNames(drakePoseJointNames, robotStateJointNames):
+    robotstate._drakePoseJointNames = drakePoseJointNames
+    robotstate._robotStateJointNames = robotStateJointNames
+    robotstate._numPositions = None
+    robotstate._robotStateToDrakePoseJointMap = None
+    robotstate._drakePoseToRobotStateJointMap = None
+    robotstate._robotStateToDrakePoseIndices = None
+    robotstate._stateMessageJointIndices.clear()
+
+
+def makeStateMessage(jointNames, jointPositions, xyz, rpy):
+    msg = bot_core.robot_state_t()
+    msg.pose = robotstate.getPoseLCMFromXYZRPY(xyz, rpy)
+    msg.num_joints = len(jointNames)
+    msg.joint_name = list(jointNames)
+    msg.joint_position = list(jointPositions)
+    return msg
+
+
+def testConvertStateMessage():
+
+    floatingBase = ['base_x', 'base_y', 'base_z', 'base_roll', 'base_pitch', 'base_yaw']
+    jointNames = ['a', 'b', 'c', 'd']
+    setJointNames(floatingBase + jointNames, ['d', 'c', 'b', 'a'])
+
+    xyz = [1.0, 2.0, 3.0]
+    rpy = [0.1, 0.2, 0.3]
+
+    msg = makeStateMessage(['c', 'a', 'd', 'b'], [3.0, 1.0, 4.0, 2.0], xyz, rpy)
+    pose = robotstate.convertStateMessageToDrakePose(msg)
+    assert np.allclose(pose, xyz + rpy + [1.0, 2.0, 3.0, 4.0])
+
+    # the index mapping is computed once per joint name ordering
+    msg.joint_position = [30.0, 10.0, 40.0, 20.0]
+    assert len(robotstate._stateMessageJointIndices) == 1
+    assert np.allclose(robotstate.convertStateMessageToDrakePose(msg)[6:], [10.0, 20.0, 30.0, 40.0])
+    assert len(robotstate._stateMessageJointIndices) == 1
+
+    msg = makeStateMessage(['b', 'extra', 'a'], [2.0, 9.0, 1.0], xyz, rpy)
+    try:
+        robotstate.convertStateMessageToDrakePose(msg)
+    except KeyError:
+        pass
+    else:
+        raise Exception('expected KeyError for missing joints')
+
+    pose = robotstate.convertStateMessageToDrakePose(msg, strict=False)
+    assert np.allclose(pose[6:], [1.0, 2.0, 0.0, 0.0])
+
+
+def testRobotStateConversions():
+
+    floatingBase = ['base_x', 'base_y', 'base_z', 'base_roll', 'base_pitch', 'base_yaw']
+    setJointNames(floatingBase + ['a', 'b', 'c'], ['c', 'a', 'b'])
+
+    drakePose = [1.0, 2.0, 3.0, 0.1, 0.2, 0.3, 10.0, 20.0, 30.0]
+    msg = robotstate.drakePoseToRobotState(drakePose)
+    assert np.allclose(msg.joint_position, [30.0, 10.0, 20.0])
+    assert np.allclose(robotstate.convertStateMessageToDrakePose(msg), drakePose)
+
+    quat = transformUtils.rollPitchYawToQuaternion(drakePose[3:6])
+    robotState = np.hstack((drakePose[:3], quat, msg.joint_position))
+    assert np.allclose(robotstate.robotStateToDrakePose(robotState), drakePose)
+
+
+def main():
+    testConvertStateMessage()
+    testRobotStateConversions()
+
+
+if __name__ == '__main__':
+    main()
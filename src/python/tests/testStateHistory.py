@@ -0,0 +1,65 @@
+import numpy as np
+
+from director.statehistory import StateHistory
+
+
+def testRingBuffer():
+
+    history = StateHistory(numberOfPositions=7, maxSamples=4)
+    assert history.getPose(0) is None
+    assert history.getUtimeRange() is None
+
+    memoryUsage = history.getMemoryUsage()
+    for i in xrange(10):
+        history.addSample(i*100, np.ones(7)*i)
+
+    # only the newest samples are kept and no memory is allocated
+    assert history.getNumberOfSamples() == 4
+    assert history.getUtimeRange() == (600, 900)
+    assert history.getMemoryUsage() == memoryUsage
+
+    utimes, poses = history.getSamples()
+    assert np.all(utimes == [600, 700, 800, 900])
+    assert np.allclose(poses[:,0], [6, 7, 8, 9])
+
+    utimes, poses = history.getSamples(650, 800)
+    assert np.all(utimes == [700, 800])
+
+    assert history.findSample(599) == -1
+    assert history.findSample(600) == 0
+    assert history.findSample(899) == 2
+    assert history.findSample(1000) == 3
+
+
+def testGetPose():
+
+    history = StateHistory(numberOfPositions=7, maxSamples=3)
+    for i in xrange(5):
+        history.addSample(i*100, np.ones(7)*i)
+
+    assert np.allclose(history.getPose(250), 2.5)
+    assert np.allclose(history.getPose(250, interpolate=False), 2.0)
+    assert np.allclose(history.getPose(0), 2.0)
+    assert np.allclose(history.getPose(1000), 4.0)
+
+    # floating base angles are interpolated along the shortest angle
+    history = StateHistory(numberOfPositions=7)
+    pose = np.zeros(7)
+    pose[5] = np.pi - 0.1
+    history.addSample(0, pose)
+    pose[5] = -np.pi + 0.1
+    history.addSample(100, pose)
+    assert np.isclose(np.cos(history.getPose(50)[5]), -1.0)
+
+    # an older sample clears the history
+    history.addSample(10, np.zeros(7))
+    assert history.getNumberOfSamples() == 1
+
+
+def main():
+    testRingBuffer()
+    testGetPose()
+
+
+if __name__ == '__main__':
+    main()
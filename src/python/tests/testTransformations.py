@@ -125,9 +125,29 @@ def testEulerBotpy():
     assert np.allclose(rpy2, rpy3)
 
 
+def testMatricesFromPoses():
+    '''
+    test the vectorized matricesFromPoses agrees with transformFromPose
+    '''
+
+    quats = [transformations.random_quaternion() for i in xrange(10)]
+    positions = np.random.rand(10, 3)
+
+    # quaternions do not need to be normalized
+    quats[1] *= 3.0
+
+    mats = transformUtils.matricesFromPoses(positions, quats)
+    assert mats.shape == (10, 4, 4)
+
+    for pos, quat, mat in zip(positions, quats, mats):
+        mat2 = transformUtils.getNumpyFromTransform(transformUtils.transformFromPose(pos, quat))
+        assert np.allclose(mat, mat2)
+
+
 testTransform()
 testEuler()
 testEulerToFrame()
+testMatricesFromPoses()
 
 if botpy:
     testQuaternionInterpolate()
@@ -0,0 +1,103 @@
+from director.consoleapp import ConsoleApp
+from director import treeviewer
+from director import vtkNumpy as vnp
+
+import numpy as np
+
+
+def load(viewer, path, geometry):
+    return viewer.handleViewerRequest({'delete': [], 'draw': [],
+                                       'load': [{'path': path, 'geometry': geometry}]})
+
+
+def delete(viewer, path):
+    return viewer.handleViewerRequest({'delete': [{'path': path}], 'load': [], 'draw': []})
+
+
+def pointCloud(numberOfPoints):
+    return {'type': 'pointcloud',
+            'points': np.random.rand(numberOfPoints, 3),
+            'channels': {'rgb': np.random.rand(numberOfPoints, 3)}}
+
+
+def testUpdateInPlace(viewer):
+
+    path = ['robot', 'points']
+    geometry = pointCloud(100)
+    load(viewer, path, geometry)
+
+    folder = viewer.getPathFolder(path, create=False)
+    item, = viewer.getGeometryItems(folder)
+    item.setProperty('Point Size', 5)
+    item.setProperty('Alpha', 0.3)
+    polyData = item.polyData
+
+    # the same topology updates the points and arrays of the item in place
+    geometry = pointCloud(100)
+    load(viewer, path, geometry)
+    assert viewer.getGeometryItems(folder) == [item]
+    assert item.polyData is polyData
+    assert np.allclose(vnp.getNumpyFromVtk(item.polyData, 'Points'), geometry['points'])
+    assert np.all(vnp.getNumpyFromVtk(item.polyData, 'rgb') == (geometry['channels']['rgb']*255).astype(np.uint8))
+    assert item.getProperty('Point Size') == 5
+    assert item.getProperty('Alpha') == 0.3
+
+    # a topology change replaces the polyData of the item
+    geometry = pointCloud(50)
+    load(viewer, path, geometry)
+    assert viewer.getGeometryItems(folder) == [item]
+    assert item.polyData is not polyData
+    assert item.polyData.GetNumberOfPoints() == 50
+    assert np.allclose(vnp.getNumpyFromVtk(item.polyData, 'Points'), geometry['points'])
+    assert item.getProperty('Point Size') == 5
+    assert item.getProperty('Alpha') == 0.3
+
+    # a different number of geometry items replaces the items, and the new
+    # items copy the properties of the old ones
+    polyDataList = treeviewer.Geometry.createPolyDataForGeometry(geometry)*2
+    viewer.addGeometry(path, [treeviewer.Geometry(geometry, polyData) for polyData in polyDataList])
+    items = viewer.getGeometryItems(folder)
+    assert len(items) == 2 and item not in items
+    assert all(i.getProperty('Point Size') == 5 for i in items)
+
+    load(viewer, path, geometry)
+    newItem, = viewer.getGeometryItems(folder)
+    assert newItem not in items
+    assert newItem.getProperty('Point Size') == 5
+    assert newItem.getProperty('Alpha') == 0.3
+
+
+def testPathFolders(viewer):
+
+    rootFolder = viewer.getRootFolder()
+    numberOfChildren = len(rootFolder.children())
+
+    # missing paths are not created without create
+    assert viewer.getPathFolder(['missing'], create=False) is None
+    assert viewer.getPathFolder(['missing', 'child'], create=False) is None
+    assert len(rootFolder.children()) == numberOfChildren
+
+    delete(viewer, ['missing', 'child'])
+    assert viewer.getPathFolder(['missing'], create=False) is None
+
+    load(viewer, ['robot', 'link', 'box'], {'type': 'box', 'lengths': [1, 1, 1]})
+    folder = viewer.getPathFolder(['robot', 'link', 'box'], create=False)
+    assert folder is not None
+    assert viewer.getPathFolder(['robot', 'link'], create=False) is folder.parent()
+    assert viewer.getPathForItem(folder) == ['robot', 'link', 'box']
+
+    # deleted paths are dropped from the cache
+    delete(viewer, ['robot', 'link'])
+    assert viewer.getPathFolder(['robot', 'link', 'box'], create=False) is None
+    assert viewer.getPathFolder(['robot', 'link'], create=False) is None
+    assert viewer.getPathFolder(['robot'], create=False) is not None
+
+
+app = ConsoleApp()
+view = app.createView()
+
+viewer = treeviewer.TreeViewer(view)
+testUpdateInPlace(viewer)
+testPathFolders(viewer)
+
+app.start()
@@ -9,21 +9,27 @@ import sys
 import numpy as np
 import lcm
 import robotlocomotion as lcmrl
+from director import treeviewer
 
 
-def comms_msg(timestamp, data):
+def comms_msg(timestamp, data, binary=False):
     msg = lcmrl.viewer2_comms_t()
     msg.format = "treeviewer_json"
     msg.format_version_major = 1
-    msg.format_version_minor = 0
-    encoded = json.dumps(data)
+    if binary:
+        msg.format_version_minor = 1
+        encoded = treeviewer.encodeBinaryPayload(data)
+    else:
+        msg.format_version_minor = 0
+        encoded = json.dumps(data)
     msg.num_bytes = len(encoded)
     msg.data = encoded
     return msg
 
 
 class Visualizer:
-    def __init__(self, geometries={}):
+    def __init__(self, geometries={}, binary=False):
+        self.binary = binary
         self.geometries = {}
         self.poses = {}
         self.queue = {"load": [], "draw": [], "delete": []}
@@ -47,7 +53,7 @@ class Visualizer:
             "load": self.queue["load"],
             "draw": self.queue["draw"]
         }
-        msg = comms_msg(timestamp, data)
+        msg = comms_msg(timestamp, data, self.binary)
         self.lcm.publish("DIRECTOR_TREE_VIEWER_REQUEST", msg.encode())
         self.queue["load"] = []
         self.queue["delete"] = []
@@ -161,4 +167,34 @@ if __name__ == '__main__':
             vis.publish()
             time.sleep(0.001)
 
+    # large point clouds are sent with the binary payload format
+    numPoints = 100000
+    points = np.random.rand(numPoints, 3).astype(np.float32)
+    points[:,2] += 4
+    binaryVis = Visualizer({
+        "robot2/points": {
+            "type": "pointcloud",
+            "points": points,
+            "channels": {
+                "rgb": np.random.rand(numPoints, 3).astype(np.float32)
+            }
+        },
+        "robot2/mesh": {
+            "type": "mesh_data",
+            "vertices": np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float64),
+            "faces": np.array([[0, 1, 2]], dtype=np.int32),
+            "color": [1, 0, 0, 1]
+        }
+    }, binary=True)
+    binaryVis.publish()
+    for i in range(100):
+        # streamed point clouds with a fixed number of points are updated
+        # in place by the viewer
+        points[:,:2] = np.random.rand(numPoints, 2)
+        binaryVis.load("robot2/points", {"type": "pointcloud", "points": points})
+        binaryVis.draw("robot2", {"translation": [0, 0, math.sin(math.pi * 2 * i / 100.0)],
+                                  "quaternion": [1, 0, 0, 0]})
+        binaryVis.publish()
+        time.sleep(0.01)
+
     vis_process.terminate()
@@ -0,0 +1,98 @@
+import json
+import struct
+import numpy as np
+from director import treeviewer
+
+
+def getHeader(payload):
+    headerLength, = struct.unpack_from('<I', payload, 0)
+    return json.loads(payload[4:4 + headerLength])
+
+
+def makePayload(header, buffers):
+    headerString = json.dumps(header)
+    padding = -(4 + len(headerString)) % 8
+    return struct.pack('<I', len(headerString)) + headerString + '\0'*padding + buffers
+
+
+def assertRaisesValueError(payload):
+    try:
+        treeviewer.decodeBinaryPayload(payload)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('expected ValueError')
+
+
+def testRoundTrip():
+
+    data = {
+        'points': np.random.rand(7, 3).astype(np.float32),
+        'ranges': np.arange(5, dtype=np.float64),
+        'nested': [{'faces': np.arange(12, dtype=np.int32).reshape(4, 3)}, 'text', 1.5],
+        'colors': np.arange(9, dtype=np.uint8).reshape(3, 3),
+        'bigEndian': np.arange(4, dtype='>f8'),
+        'empty': np.zeros((0, 3)),
+        'transposed': np.arange(6, dtype=np.int64).reshape(2, 3).T,
+        'name': 'robot',
+    }
+
+    payload = treeviewer.encodeBinaryPayload(data)
+    decoded = treeviewer.decodeBinaryPayload(payload)
+
+    for key in ['points', 'ranges', 'colors', 'empty', 'transposed']:
+        assert decoded[key].dtype == data[key].dtype.newbyteorder('<')
+        assert decoded[key].shape == data[key].shape
+        assert np.array_equal(decoded[key], data[key])
+
+    faces = decoded['nested'][0]['faces']
+    assert faces.dtype == np.int32 and faces.shape == (4, 3)
+    assert np.array_equal(faces, data['nested'][0]['faces'])
+    assert decoded['nested'][1:] == ['text', 1.5]
+    assert decoded['name'] == 'robot'
+
+    # big endian arrays are sent as little endian
+    assert decoded['bigEndian'].dtype.str == '<f8'
+    assert np.array_equal(decoded['bigEndian'], data['bigEndian'])
+
+    # decoded arrays are read-only views of the payload
+    assert not decoded['points'].flags.writeable
+
+    # the buffers and every array in them are 8 byte aligned
+    header = getHeader(payload)
+    keys = ['points', 'ranges', 'colors', 'bigEndian', 'empty', 'transposed']
+    arrays = [decoded[key] for key in keys] + [faces]
+    refs = [header[key]['__ndarray__'] for key in keys] + [header['nested'][0]['faces']['__ndarray__']]
+    assert all(ref['offset'] % 8 == 0 for ref in refs)
+    alignedSizes = [-(-array.nbytes // 8) * 8 for array in arrays]
+    assert len(payload) == len(makePayload(header, '')) + sum(alignedSizes)
+    assert len(payload) % 8 == 0
+
+def testInvalidPayloads():
+
+    payload = treeviewer.encodeBinaryPayload({'ranges': np.arange(4, dtype=np.float64)})
+
+    # truncated header length, header and buffers
+    assertRaisesValueError(payload[:2])
+    assertRaisesValueError(payload[:8])
+    assertRaisesValueError(payload[:-8])
+
+    # an array that does not fit in the buffers
+    header = getHeader(payload)
+    assert makePayload(header, payload[-32:]) == payload
+
+    header['ranges']['__ndarray__']['offset'] = 8
+    assertRaisesValueError(makePayload(header, payload[-32:]))
+
+    header['ranges']['__ndarray__']['offset'] = 0
+    header['ranges']['__ndarray__']['shape'] = [5]
+    assertRaisesValueError(makePayload(header, payload[-32:]))
+
+
+def main():
+    testRoundTrip()
+    testInvalidPayloads()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import os
+import imp
+import shutil
+import tempfile
+import numpy as np
+from director import lcmlog
+
+
+videoLogServer = imp.load_source('videoLogServer',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../scripts/videoLogServer.py'))
+
+
+def writeEvents(filename, utimes, mode='wb'):
+    '''
+    Write a video frame and a robot state message for each utime.  Returns
+    the file positions of the video frames.
+    '''
+    filePositions = []
+    with open(filename, mode) as f:
+        for utime in utimes:
+            filePositions.append(f.tell())
+            f.write(lcmlog.encodeEvent(0, utime, 'VIDEO', 'frame %d' % utime))
+            f.write(lcmlog.encodeEvent(0, utime, 'EST_ROBOT_STATE', 'state %d' % utime))
+    return filePositions
+
+
+def testLogFileIndex(testDir):
+
+    filename = os.path.join(testDir, 'lcmlog-2016-01-01.00')
+    indexDir = os.path.join(testDir, '.videoindex')
+
+    filePositions = writeEvents(filename, [100, 200, 300])
+    index = videoLogServer.LogFileIndex(filename, 'VIDEO', indexDir)
+    assert index.update()
+    assert not index.update()
+    assert index.utimes.tolist() == [100, 200, 300]
+    assert index.filePositions.tolist() == filePositions
+    assert index.scanPosition == os.path.getsize(filename)
+    assert index.needsSave
+    index.save()
+    index.close()
+
+    # the saved index is loaded without scanning the log
+    index = videoLogServer.LogFileIndex(filename, 'VIDEO', indexDir)
+    assert index.utimes.tolist() == [100, 200, 300]
+    assert index.scanPosition == os.path.getsize(filename)
+    assert not index.update()
+
+    # frames appended to the log extend the index
+    filePositions += writeEvents(filename, [400, 500], mode='ab')
+    assert index.update()
+    assert index.utimes.tolist() == [100, 200, 300, 400, 500]
+    assert index.filePositions.tolist() == filePositions
+    index.save()
+    index.close()
+
+    # an index built for another channel is not used
+    index = videoLogServer.LogFileIndex(filename, 'OTHER_VIDEO', indexDir)
+    assert index.scanPosition == 0
+
+    # a log rewritten under the same name with at least as many bytes as
+    # the index covers does not reuse the index
+    writeEvents(filename, [1000, 1100, 1200, 1300, 1400, 1500])
+    index = videoLogServer.LogFileIndex(filename, 'VIDEO', indexDir)
+    assert index.scanPosition == 0
+    assert len(index.utimes) == 0
+    assert index.update()
+    assert index.utimes.tolist() == [1000, 1100, 1200, 1300, 1400, 1500]
+    index.close()
+
+    # a truncated index file is discarded and rebuilt
+    index.save()
+    with open(index.indexFile, 'rb') as f:
+        indexData = f.read()
+    with open(index.indexFile, 'wb') as f:
+        f.write(indexData[:len(indexData)/2])
+    index = videoLogServer.LogFileIndex(filename, 'VIDEO', indexDir)
+    assert index.scanPosition == 0
+    assert index.update()
+    assert index.utimes.tolist() == [1000, 1100, 1200, 1300, 1400, 1500]
+    index.close()
+
+    index.remove()
+    assert not os.path.exists(index.indexFile)
+
+
+def testCatalog(testDir):
+
+    filenames = [os.path.join(testDir, 'lcmlog-2016-01-01.%02d' % i) for i in xrange(1, 3)]
+    writeEvents(filenames[0], [100, 200, 300])
+    filePositions = writeEvents(filenames[1], [400, 500])
+
+    catalogThread = videoLogServer.CatalogThread(testDir, 'VIDEO')
+    catalogThread.pruneEnabled = False
+    catalogThread.updateCatalog()
+
+    catalog = catalogThread.getCatalog()
+    assert catalog.utimes.tolist() == [100, 200, 300, 400, 500]
+    assert catalog.filenames == filenames
+
+    assert catalog.findIndex(0) == 0
+    assert catalog.findIndex(200) == 1
+    assert catalog.findIndex(201) == 2
+    assert catalog.findIndex(1000) == 4
+    assert catalog.getLocation(3) == (filenames[1], filePositions[0])
+
+    recent = catalog.getRecent(200e-6)
+    assert recent.utimes.tolist() == [300, 400, 500]
+    assert recent.getLocation(1) == (filenames[1], filePositions[0])
+
+    # the indexes are saved when the catalog thread stops
+    catalogThread.saveIndexes(force=True)
+    assert all(os.path.isfile(catalogThread.fileIndexes[f].indexFile) for f in filenames)
+
+
+def testLogLookup(testDir):
+
+    filename = os.path.join(testDir, 'lcmlog-2016-01-01.00')
+    filePositions = writeEvents(filename, [100, 200, 300])
+
+    # file reads and the memory mapped log return the same events
+    for mapped in (True, False):
+        logLookup = videoLogServer.LogLookup(mapped=mapped)
+        events = [logLookup.readEvent(filename, filePosition) for filePosition in reversed(filePositions)]
+        assert [str(event.data) for event in events] == ['frame 300', 'frame 200', 'frame 100']
+        assert [event.channel for event in events] == ['VIDEO']*3
+        logLookup.closeLogs()
+        assert not logLookup.logs
+
+
+def testFrameCache():
+
+    cache = videoLogServer.FrameCache(maxSize=3)
+    for utime in [100, 200, 300]:
+        cache.add(utime, 'frame %d' % utime)
+
+    # a lookup makes a frame the most recently used
+    assert cache.get(100) == 'frame 100'
+    cache.add(400, 'frame 400')
+    assert 200 not in cache
+    assert 100 in cache
+
+    assert cache.get(200) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # adding a cached frame again does not evict another frame
+    cache.add(300, 'frame 300')
+    assert cache.frames.keys() == [100, 400, 300]
+
+    cache.add(500, 'frame 500')
+    assert cache.frames.keys() == [400, 300, 500]
+
+    cache.resetStatistics()
+    cache.clear()
+    assert 500 not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def testPlaybackIndex():
+
+    catalog = videoLogServer.UtimeCatalog(np.array([100, 200, 300], dtype=np.int64))
+
+    assert catalog.findPlaybackIndex(50, 1) == 0
+    assert catalog.findPlaybackIndex(200, 1) == 1
+    assert catalog.findPlaybackIndex(250, 1) == 2
+    assert catalog.findPlaybackIndex(301, 1) is None
+
+    assert catalog.findPlaybackIndex(350, -1) == 2
+    assert catalog.findPlaybackIndex(200, -1) == 1
+    assert catalog.findPlaybackIndex(250, -1) == 1
+    assert catalog.findPlaybackIndex(99, -1) is None
+
+
+def testPrefetchOrder():
+
+    catalog = videoLogServer.UtimeCatalog(np.arange(10, dtype=np.int64)*100)
+    cache = videoLogServer.FrameCache()
+
+    prefetch = videoLogServer.PrefetchThread(catalog, cache, readAheadFrames=3)
+    prefetch.setPosition(4)
+    assert prefetch.getNextIndexToLoad() == 5
+    cache.add(500, 'frame')
+    assert prefetch.getNextIndexToLoad() == 6
+
+    # reverse playback reads ahead towards older frames
+    prefetch = videoLogServer.PrefetchThread(catalog, cache, readAheadFrames=3, direction=-1)
+    prefetch.setPosition(4)
+    assert prefetch.getNextIndexToLoad() == 3
+    for utime in [300, 200, 100]:
+        cache.add(utime, 'frame')
+    assert prefetch.getNextIndexToLoad() is None
+
+    # read ahead stops at the ends of the catalog
+    prefetch.setPosition(0)
+    assert prefetch.getNextIndexToLoad() is None
+
+
+def main():
+
+    testFrameCache()
+    testPlaybackIndex()
+    testPrefetchOrder()
+
+    testDir = tempfile.mkdtemp()
+    try:
+        testLogFileIndex(testDir)
+        testLogLookup(testDir)
+    finally:
+        shutil.rmtree(testDir)
+
+    testDir = tempfile.mkdtemp()
+    try:
+        testCatalog(testDir)
+    finally:
+        shutil.rmtree(testDir)
+
+
+if __name__ == '__main__':
+    main()